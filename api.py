@@ -3,10 +3,13 @@ Flask API for Battery Valuator
 RESTful endpoints for Lovable frontend integration
 """
 
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
 from flask_cors import CORS
 import backend
+import price_history
+import json
 import logging
+import time
 
 app = Flask(__name__)
 CORS(app)  # Enable CORS for Lovable to call this API
@@ -15,6 +18,40 @@ CORS(app)  # Enable CORS for Lovable to call this API
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Quote book (created on first use, marked to market on every price snapshot)
+_quote_book = None
+
+def get_quote_book():
+    """Return the process-wide quote book."""
+    global _quote_book
+    if _quote_book is None:
+        from quote_book import QuoteBook
+        _quote_book = QuoteBook()
+    return _quote_book
+
+# Alert engine (created on first use, evaluated on every published snapshot and quote mark)
+_alert_engine = None
+
+def get_alert_engine():
+    """Return the process-wide alert engine."""
+    global _alert_engine
+    if _alert_engine is None:
+        from price_alerts import AlertEngine
+        _alert_engine = AlertEngine()
+    return _alert_engine
+
+def _mark_quotes_on_snapshot(market_data):
+    """Snapshot listener: re-price open quotes against new market data."""
+    result = get_quote_book().mark_to_market(market_data)
+    get_alert_engine().evaluate_quote_margins(result)
+
+def _evaluate_price_alerts(market_data):
+    """Snapshot listener: check price alerts against new market data."""
+    get_alert_engine().evaluate_snapshot(market_data)
+
+price_history.subscribe(_evaluate_price_alerts)
+price_history.subscribe(_mark_quotes_on_snapshot)
+
 @app.route('/api/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
@@ -49,6 +86,40 @@ def health_check():
         'metals_dev_sample': metals_dev_response
     })
 
+def _market_prices(market_prices=None, currency='USD'):
+    """
+    Live market data with request market_prices merged over it key by key.
+
+    Request prices are per kg in `currency`; keys they leave out come from the live
+    snapshot, which is fetched once from the USD base and converted to `currency`.
+    The fetch is skipped when the request prices every key.
+    """
+    from valuation_engine import PRICE_KEYS
+
+    overrides = {}
+    for key, value in (market_prices or {}).items():
+        if key not in PRICE_KEYS or value is None:
+            continue
+        try:
+            overrides[key] = float(value)
+        except (TypeError, ValueError):
+            raise ValueError(f"market_prices[{key!r}] must be a number, got {value!r}")
+
+    if set(PRICE_KEYS) <= set(overrides):
+        return overrides
+    market_data = dict(backend.get_market_data(currency))
+    market_data.update(overrides)
+    return market_data
+
+def _record_daily_history(currency, market_data):
+    """Keep one USD snapshot per day in the local price history (for backtests)."""
+    try:
+        if price_history.needs_daily_snapshot():
+            usd_data = market_data if currency == 'USD' else backend.get_market_data('USD')
+            price_history.record_snapshot(usd_data)
+    except Exception as e:
+        logger.error(f"Price history recording error: {str(e)}")
+
 @app.route('/api/market-data', methods=['GET'])
 def get_market_data():
     """
@@ -60,6 +131,7 @@ def get_market_data():
     try:
         currency = request.args.get('currency', 'USD')
         data = backend.get_market_data(currency)
+        _record_daily_history(currency, data)
         return jsonify({
             'success': True,
             'data': data
@@ -71,6 +143,27 @@ def get_market_data():
             'error': str(e)
         }), 500
 
+@app.route('/api/market-data/refresh', methods=['POST'])
+def refresh_market_data():
+    """
+    Fetch a USD market snapshot, store it in the price history and publish it
+    (re-marks the quote book and evaluates price alerts).
+    """
+    try:
+        data = backend.get_market_data('USD')
+        price_history.record_snapshot(data)
+        price_history.publish_snapshot(data)
+        return jsonify({
+            'success': True,
+            'data': data
+        })
+    except Exception as e:
+        logger.error(f"Market data refresh error: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
 @app.route('/api/parse-coa', methods=['POST'])
 def parse_coa():
     """
@@ -104,6 +197,220 @@ def parse_coa():
             'error': str(e)
         }), 500
 
+# Upper bound on documents per batch parse request
+MAX_BATCH_DOCUMENTS = 5000
+
+@app.route('/api/parse-coa/batch', methods=['POST'])
+def parse_coa_batch():
+    """
+    Parse many COA texts in parallel, streaming results as NDJSON
+
+    Request body:
+        {
+            "documents": [
+                {"id": "lab-1042", "coa_text": "Ni: 20.5%\nCo: 6.2%..."},
+                "Ni 2050\nCo 620",          // plain text also accepted
+                ...
+            ]
+        }
+
+    Response (application/x-ndjson), one line per document as it completes:
+        {"id": "lab-1042", "assays": {...}, "confidence": 0.86, "tokens": 6, "elapsed_ms": 0.21}
+    followed by a final summary line:
+        {"done": true, "documents": 120, "failed": 0, "elapsed_ms": 85.4}
+    """
+    try:
+        import coa_parser
+
+        data = request.get_json()
+        documents = data.get('documents')
+
+        if not isinstance(documents, list) or not documents:
+            return jsonify({
+                'success': False,
+                'error': 'Missing documents parameter'
+            }), 400
+        if len(documents) > MAX_BATCH_DOCUMENTS:
+            return jsonify({
+                'success': False,
+                'error': f'At most {MAX_BATCH_DOCUMENTS} documents per request'
+            }), 400
+
+        docs = []
+        for i, document in enumerate(documents):
+            if isinstance(document, str):
+                docs.append({'id': i, 'text': document})
+            elif isinstance(document, dict) and isinstance(document.get('coa_text'), str):
+                docs.append({'id': document.get('id', i), 'text': document['coa_text']})
+            else:
+                return jsonify({
+                    'success': False,
+                    'error': f'Document {i} must be a string or an object with coa_text'
+                }), 400
+
+        def generate():
+            start = time.perf_counter()
+            failed = 0
+            for result in coa_parser.parse_documents(docs):
+                failed += 'error' in result
+                yield json.dumps(result) + '\n'
+            yield json.dumps({
+                'done': True,
+                'documents': len(docs),
+                'failed': failed,
+                'elapsed_ms': round((time.perf_counter() - start) * 1000, 3)
+            }) + '\n'
+
+        logger.info(f"Streaming batch parse of {len(docs)} COA documents")
+        return Response(generate(), mimetype='application/x-ndjson')
+    except Exception as e:
+        logger.error(f"COA batch parsing error: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@app.route('/api/parse-coa/cache', methods=['GET'])
+def parse_coa_cache_stats():
+    """Hit rate and size of the parsed-COA cache (counters are per API process)"""
+    try:
+        from coa_cache import get_cache
+
+        return jsonify({
+            'success': True,
+            'data': get_cache().report()
+        })
+    except Exception as e:
+        logger.error(f"COA cache stats error: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@app.route('/api/parse-coa/table', methods=['POST'])
+def parse_coa_table():
+    """
+    Extract a multi-sample assay table from COA text, optionally valuing every sample
+
+    Request body:
+        {
+            "coa_text": "Sample\tNi (%)\tCo (%)\tLi (ppm)\nBM-001\t20.5\t6.2\t25000\n...",
+            "valuation_params": {            // optional, calculate parameters without assays
+                "gross_weight": 1000,
+                "metal_prices": {...},
+                "payables": {...},
+                ...
+            },
+            "market_prices": {...}           // optional, merged over live market data
+        }
+    """
+    try:
+        import coa_parser
+        from valuation_engine import build_exposures, value_exposures, valuation_prices
+
+        data = request.get_json()
+        coa_text = data.get('coa_text', '')
+
+        if not coa_text:
+            return jsonify({
+                'success': False,
+                'error': 'Missing coa_text parameter'
+            }), 400
+
+        table = coa_parser.extract_coa_table(coa_text)
+        result = {
+            'layout': table['layout'],
+            'samples': table['samples'],
+            'elements': table['elements'],
+            'assays': [dict(zip(table['elements'], row.tolist())) for row in table['matrix']]
+        }
+
+        base_params = data.get('valuation_params')
+        if base_params:
+            for param in ['gross_weight', 'metal_prices', 'payables']:
+                if param not in base_params:
+                    return jsonify({
+                        'success': False,
+                        'error': f'Missing required valuation parameter: {param}'
+                    }), 400
+
+            market_data = _market_prices(data.get('market_prices'), base_params.get('currency', 'USD'))
+            lots = coa_parser.table_to_lots(table, base_params)
+            values = value_exposures(build_exposures(lots), valuation_prices(base_params, market_data))
+            result['valuations'] = [
+                {
+                    'sample': sample,
+                    'total_revenue': round(float(values['total_revenue'][i]), 2),
+                    'material_cost': round(float(values['material_cost'][i]), 2),
+                    'net_profit': round(float(values['net_profit'][i]), 2),
+                    'margin_pct': round(float(values['margin_pct'][i]), 2)
+                }
+                for i, sample in enumerate(table['samples'])
+            ]
+
+        return jsonify({
+            'success': True,
+            'data': result
+        })
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    except Exception as e:
+        logger.error(f"COA table parsing error: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@app.route('/api/ingest/coa', methods=['POST'])
+def ingest_coa_files():
+    """
+    Extract assays from uploaded COA files (PDF, CSV, XLSX or TXT)
+
+    Request: multipart/form-data with one or more files in the "file" field
+
+    Response data: one entry per file with filename, format, chunks (pages or
+    row blocks), samples (multi-sample tables), assays, confidence, tokens and
+    elapsed_ms; files that fail carry an "error" instead
+    """
+    try:
+        import coa_ingest
+
+        uploads = request.files.getlist('file')
+        if not uploads:
+            return jsonify({
+                'success': False,
+                'error': 'Missing file upload (multipart field "file")'
+            }), 400
+
+        results = []
+        for upload in uploads:
+            try:
+                coa_ingest.detect_format(upload.filename)
+            except ValueError as e:
+                return jsonify({
+                    'success': False,
+                    'error': str(e)
+                }), 400
+            try:
+                results.append(coa_ingest.ingest_coa_file(upload.stream, upload.filename))
+            except Exception as e:
+                logger.error(f"COA ingestion failed for {upload.filename}: {str(e)}")
+                results.append({'filename': upload.filename, 'error': str(e)})
+
+        return jsonify({
+            'success': True,
+            'data': results
+        })
+    except Exception as e:
+        logger.error(f"COA ingestion error: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
 @app.route('/api/calculate', methods=['POST'])
 def calculate_valuation():
     """
@@ -293,7 +600,8 @@ def check_transport_route():
         {
             "origin": "US",
             "destination": "Canada",
-            "materialType": "black_mass"
+            "materialType": "black_mass",
+            "asOfDate": "2026-12-01"   // optional, evaluate dated rules at this date (default today)
         }
     
     Response:
@@ -320,12 +628,17 @@ def check_transport_route():
                 'error': 'origin and destination are required'
             }), 400
         
-        result = backend.check_route_feasibility(origin, destination, material_type)
+        result = backend.check_route_feasibility(origin, destination, material_type, data.get('asOfDate'))
         
         return jsonify({
             'success': True,
             'data': result
         })
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
     except Exception as e:
         logger.error(f"Route check error: {str(e)}")
         return jsonify({
@@ -334,6 +647,124 @@ def check_transport_route():
         }), 500
 
 
+# Upper bound on as-of dates per route timeline request
+MAX_TIMELINE_DATES = 1000
+
+
+@app.route('/api/transport/route-timeline', methods=['GET'])
+def get_route_timeline():
+    """
+    How a route's feasibility changes over time under effective-dated rules.
+    
+    Query params:
+        origin: Origin country code
+        destination: Destination country code
+        materialType: Material type (default black_mass)
+        dates: Optional comma-separated ISO dates to evaluate the route at
+    
+    Response:
+        {
+            "success": true,
+            "data": {
+                "timeline": [
+                    {"from": null, "until": "2026-11-09", "status": "allowed_until_nov_2026", "allowed": true, ...},
+                    {"from": "2026-11-09", "until": null, "status": "blocked", "allowed": false, ...}
+                ],
+                "evaluations": [{"as_of": "2026-12-01", "allowed": false, "status": "blocked", ...}]
+            }
+        }
+    """
+    try:
+        from route_decisions import decide_route_dates, route_timeline
+
+        origin = request.args.get('origin')
+        destination = request.args.get('destination')
+        material = request.args.get('materialType', 'black_mass')
+        if not origin or not destination:
+            return jsonify({
+                'success': False,
+                'error': 'origin and destination query parameters are required'
+            }), 400
+        dates = [d.strip() for d in request.args.get('dates', '').split(',') if d.strip()]
+        if len(dates) > MAX_TIMELINE_DATES:
+            return jsonify({
+                'success': False,
+                'error': f'At most {MAX_TIMELINE_DATES} dates per request'
+            }), 400
+
+        return jsonify({
+            'success': True,
+            'data': {
+                'timeline': route_timeline(origin, destination, material),
+                'evaluations': decide_route_dates(origin, destination, material, dates)
+            }
+        })
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    except Exception as e:
+        logger.error(f"Route timeline error: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+@app.route('/api/transport/route-matrix', methods=['GET'])
+def get_route_matrix():
+    """
+    Feasibility of every origin x destination pair for every material type.
+    
+    Cached per regulatory data version and as-of day, and served with an
+    ETag: send it back in If-None-Match to get 304 Not Modified. Cells where
+    origin and destination match have status 'domestic'.
+    
+    Query params:
+        asOfDate: Optional ISO date to evaluate dated rules at (default today)
+    
+    Response:
+        {
+            "success": true,
+            "data": {
+                "data_version": 1,
+                "as_of": "2026-10-18",
+                "countries": ["US", "Canada", ...],
+                "materials": ["whole_batteries", "black_mass", "processed"],
+                "matrix": {
+                    "black_mass": {
+                        "US": {"Canada": {"allowed": true, "status": "allowed", "processing_time": "60-90", "next_change": null, ...}}
+                    }
+                },
+                "etag": "..."
+            }
+        }
+    """
+    try:
+        from route_decisions import feasibility_matrix
+
+        matrix = feasibility_matrix(request.args.get('asOfDate'))
+        response = jsonify({
+            'success': True,
+            'data': matrix
+        })
+        response.set_etag(matrix['etag'])
+        response.headers['Cache-Control'] = 'no-cache'
+        return response.make_conditional(request)
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    except Exception as e:
+        logger.error(f"Route matrix error: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
 @app.route('/api/transport/estimate', methods=['POST'])
 def get_transport_estimate():
     """
@@ -347,7 +778,9 @@ def get_transport_estimate():
             "weightKg": 1000,
             "materialType": "black_mass",
             "isDDR": false,
-            "distanceMiles": null  // required for truck mode
+            "distanceMiles": null,  // required for truck mode, unless both locations are given
+            "originLocation": "plant_georgia",     // optional gazetteer id or name
+            "destinationLocation": "Toronto"
         }
     
     Response:
@@ -384,7 +817,8 @@ def get_transport_estimate():
         
         result = backend.get_transport_estimate(
             origin, destination, mode, weight_kg,
-            material_type, is_ddr, distance_miles
+            material_type, is_ddr, distance_miles,
+            data.get('originLocation'), data.get('destinationLocation')
         )
         
         # Check for errors in result
@@ -399,6 +833,11 @@ def get_transport_estimate():
             'success': True,
             'data': result
         })
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
     except Exception as e:
         logger.error(f"Transport estimate error: {str(e)}")
         return jsonify({
@@ -407,151 +846,1301 @@ def get_transport_estimate():
         }), 500
 
 
-@app.route('/api/regulatory/requirements', methods=['GET'])
-def get_regulatory_requirements():
+@app.route('/api/transport/compare', methods=['POST'])
+def compare_transport_modes():
     """
-    Get regulatory requirements for a specific route and material.
-    
-    Query params:
-        origin: Origin country code
-        destination: Destination country code
-        material: Material type (whole_batteries, black_mass, processed)
-    
+    Estimate all transport modes for a shipment in one call, ranked by cost.
+
+    Request body:
+        {
+            "origin": "US",
+            "destination": "Canada",
+            "weightKg": 1000,
+            "materialType": "black_mass",
+            "isDDR": false,
+            "distanceMiles": 500,  // truck is excluded without it or both locations
+            "originLocation": "plant_georgia",  // optional gazetteer id or name
+            "destinationLocation": "Toronto",
+            "modes": ["ocean", "truck", "air"]  // optional
+        }
+
     Response:
         {
             "success": true,
             "data": {
-                "permits": [...],
-                "basel_requirements": [...],
-                "packaging": {...},
-                "documentation": [...]
+                "route": {...},
+                "options": [{"rank": 1, "mode": "truck", "estimated_cost": ...}, ...],
+                "excluded": [{"mode": "air", "reason": "..."}],
+                "cheapest_mode": "truck"
             }
         }
     """
     try:
-        origin = request.args.get('origin')
-        destination = request.args.get('destination')
-        material = request.args.get('material', 'black_mass')
-        
+        data = request.get_json()
+        origin = data.get('origin')
+        destination = data.get('destination')
+        weight_kg = float(data.get('weightKg', 0))
+        material_type = data.get('materialType', 'black_mass')
+        is_ddr = data.get('isDDR', False)
+        distance_miles = data.get('distanceMiles')
+        modes = data.get('modes') or ['ocean', 'truck', 'air']
+
         if not origin or not destination:
             return jsonify({
                 'success': False,
-                'error': 'origin and destination query parameters are required'
+                'error': 'origin and destination are required'
             }), 400
-        
-        # Get permit checklist
-        checklist = backend.get_permit_checklist(origin, destination, material)
-        
-        # Get regulatory details
-        regulations = backend.get_waste_regulations(origin, destination, material)
-        
+
+        if weight_kg <= 0:
+            return jsonify({
+                'success': False,
+                'error': 'weightKg must be greater than 0'
+            }), 400
+
+        invalid = [m for m in modes if m not in ('ocean', 'truck', 'air')]
+        if invalid:
+            return jsonify({
+                'success': False,
+                'error': f"Invalid modes: {', '.join(map(str, invalid))} (expected ocean, truck or air)"
+            }), 400
+
+        result = backend.compare_transport_modes(
+            origin, destination, weight_kg,
+            material_type, is_ddr, distance_miles, tuple(dict.fromkeys(modes)),
+            data.get('originLocation'), data.get('destinationLocation')
+        )
+
+        return jsonify({
+            'success': True,
+            'data': result
+        })
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    except Exception as e:
+        logger.error(f"Transport comparison error: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+# Upper bound on points per cost curve request
+MAX_CURVE_POINTS = 100000
+
+@app.route('/api/transport/cost-curve', methods=['POST'])
+def get_transport_cost_curve():
+    """
+    Freight cost curve over a range of shipment weights, with the weights where
+    the next vehicle or container becomes necessary.
+
+    Request body:
+        {
+            "mode": "ocean",
+            "weightsKg": [1000, 5000, 20000],  // explicit weights, or a range:
+            "minKg": 500, "maxKg": 60000, "stepKg": 500,
+            "materialType": "black_mass",      // whole_batteries / black_mass are hazmat
+            "distanceMiles": 800,              // required for truck; scalar or one per weight
+            "origin": "US", "destination": "China"  // optional, prices at that lane's rates
+        }
+
+    Response data: arrays weight_kg, cost, cost_per_kg, num_vehicles,
+    vehicle_type, utilization_pct, plus breakpoints
+    """
+    try:
+        import numpy as np
+        from logistics_data import calculate_transport_costs, find_cost_breakpoints, get_route_key
+
+        data = request.get_json()
+        mode = data.get('mode', 'ocean')
+        material_type = data.get('materialType', 'black_mass')
+        distance_miles = data.get('distanceMiles')
+
+        if data.get('weightsKg') is not None:
+            weights_kg = np.sort(np.asarray(data['weightsKg'], dtype=float))
+        else:
+            step = float(data.get('stepKg', 500))
+            min_kg = float(data.get('minKg', step))
+            max_kg = float(data.get('maxKg', 60000))
+            if step <= 0 or max_kg < min_kg:
+                return jsonify({
+                    'success': False,
+                    'error': 'stepKg must be positive and maxKg at least minKg'
+                }), 400
+            weights_kg = np.arange(min_kg, max_kg + step / 2, step)
+
+        if len(weights_kg) == 0 or len(weights_kg) > MAX_CURVE_POINTS or weights_kg[0] <= 0:
+            return jsonify({
+                'success': False,
+                'error': f'Between 1 and {MAX_CURVE_POINTS} positive weights are required'
+            }), 400
+
+        if isinstance(distance_miles, list):
+            distance_miles = np.asarray(distance_miles, dtype=float)
+
+        is_hazmat = material_type in ['whole_batteries', 'black_mass']
+        lane = get_route_key(data['origin'], data['destination']) if data.get('origin') and data.get('destination') else None
+        curve = calculate_transport_costs(mode, weights_kg / 1000.0, is_hazmat, distance_miles, lane=lane)
+
+        def rounded(values, digits=2):
+            return [None if np.isnan(v) else round(float(v), digits) for v in values]
+
         return jsonify({
             'success': True,
             'data': {
-                'checklist': checklist,
-                'regulations': regulations
+                'mode': mode,
+                'weight_kg': rounded(curve['weight_kg']),
+                'cost': rounded(curve['cost']),
+                'cost_per_kg': rounded(curve['cost_per_kg'], 4),
+                'num_vehicles': curve['num_vehicles'].tolist(),
+                'vehicle_type': curve['vehicle_type'].tolist(),
+                'utilization_pct': rounded(curve['utilization_pct'], 1),
+                'breakpoints': find_cost_breakpoints(curve)
             }
         })
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
     except Exception as e:
-        logger.error(f"Regulatory requirements error: {str(e)}")
+        logger.error(f"Transport cost curve error: {str(e)}")
         return jsonify({
             'success': False,
             'error': str(e)
         }), 500
 
 
-@app.route('/api/regulatory/status', methods=['GET'])
-def get_regulatory_database_status():
+# Upper bound on weights per container mix request
+MAX_MIX_WEIGHTS = 10000
+
+@app.route('/api/transport/container-mix', methods=['POST'])
+def get_container_mix():
     """
-    Get status of regulatory database (last updated, freshness).
-    
-    Response:
+    Minimum-cost mix of container or truck types for one or more weights.
+
+    Request body:
         {
-            "success": true,
-            "data": {
-                "last_updated": "2026-01-27",
-                "next_refresh": "2027-01-27",
-                "age_days": 0,
-                "status": "fresh",
-                "sources": [...]
-            }
+            "mode": "ocean",                 // or "truck"
+            "weightKg": 40000,               // or "weightsKg": [40000, 52000]
+            "materialType": "black_mass",
+            "distanceMiles": 600,            // required for truck
+            "origin": "US", "destination": "China"  // optional, prices at that lane's rates
         }
+
+    Response data: vehicles (type, count, capacity_kg, cost_each), cost,
+    utilization_pct and the savings against calculate_transport_cost's
+    single-type sizing (a list when weightsKg is given)
     """
     try:
-        from logistics_data import get_full_database
-        import sys
-        import os
-        
-        # Import regulatory_refresh to check freshness
-        sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
-        import regulatory_refresh
-        
-        db = get_full_database()
-        metadata = db.get('metadata', {})
-        
-        freshness = regulatory_refresh.check_database_freshness()
-        
+        from container_mix import optimize_container_mix
+        from logistics_data import get_route_key
+
+        data = request.get_json()
+        mode = data.get('mode', 'ocean')
+        is_hazmat = data.get('materialType', 'black_mass') in ['whole_batteries', 'black_mass']
+        distance_miles = data.get('distanceMiles')
+        distance_miles = float(distance_miles) if distance_miles is not None else None
+        lane = get_route_key(data['origin'], data['destination']) if data.get('origin') and data.get('destination') else None
+
+        weights = data.get('weightsKg')
+        if weights is None:
+            result = optimize_container_mix(mode, float(data.get('weightKg', 0)), is_hazmat, distance_miles, lane)
+        else:
+            if not weights or len(weights) > MAX_MIX_WEIGHTS:
+                return jsonify({
+                    'success': False,
+                    'error': f'Between 1 and {MAX_MIX_WEIGHTS} weights are required'
+                }), 400
+            result = [optimize_container_mix(mode, float(w), is_hazmat, distance_miles, lane) for w in weights]
+
         return jsonify({
             'success': True,
-            'data': {
-                'last_updated': metadata.get('last_updated'),
-                'next_refresh': metadata.get('next_refresh'),
-                'version': metadata.get('version'),
-                'sources': metadata.get('sources', []),
-                'freshness': freshness
+            'data': result
+        })
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    except Exception as e:
+        logger.error(f"Container mix error: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+# Upper bound on pending shipments per consolidation request
+MAX_CONSOLIDATION_SHIPMENTS = 50000
+
+@app.route('/api/transport/consolidate', methods=['POST'])
+def plan_transport_consolidation():
+    """
+    Group pending shipments by lane and pickup window into consolidated loads.
+
+    Request body:
+        {
+            "shipments": [
+                {"id": "S1", "origin": "US", "destination": "Canada", "mode": "truck",
+                 "weightKg": 1200, "materialType": "black_mass", "isDDR": false,
+                 "distanceMiles": 500, "earliestPickup": "2026-11-02", "latestPickup": "2026-11-06"}
+            ],
+            "maxWaitDays": 7,           // window when latestPickup is missing
+            "maxConsolidatedKg": null   // optional cap per consolidated load
+        }
+
+    Response data: schedule (pickup date, shipment ids, consolidated vs
+    separate freight per pickup) and total savings
+    """
+    try:
+        from consolidation import plan_consolidation, DEFAULT_MAX_WAIT_DAYS
+
+        data = request.get_json()
+        lines = data.get('shipments') or []
+        if not lines or len(lines) > MAX_CONSOLIDATION_SHIPMENTS:
+            return jsonify({
+                'success': False,
+                'error': f'Between 1 and {MAX_CONSOLIDATION_SHIPMENTS} shipments are required'
+            }), 400
+
+        shipments = [
+            {
+                'id': line.get('id'),
+                'origin': line.get('origin'),
+                'destination': line.get('destination'),
+                'mode': line.get('mode', 'ocean'),
+                'weight_kg': line.get('weightKg', 0),
+                'material_type': line.get('materialType', 'black_mass'),
+                'is_ddr': line.get('isDDR', False),
+                'distance_miles': line.get('distanceMiles'),
+                'earliest_pickup': line.get('earliestPickup'),
+                'latest_pickup': line.get('latestPickup'),
+                'lane': line.get('lane')
             }
+            for line in lines
+        ]
+        max_consolidated_kg = data.get('maxConsolidatedKg')
+        result = plan_consolidation(
+            shipments,
+            max_wait_days=int(data.get('maxWaitDays', DEFAULT_MAX_WAIT_DAYS)),
+            max_consolidated_kg=float(max_consolidated_kg) if max_consolidated_kg else None
+        )
+
+        return jsonify({
+            'success': True,
+            'data': result
         })
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
     except Exception as e:
-        logger.error(f"Database status error: {str(e)}")
+        logger.error(f"Consolidation planning error: {str(e)}")
         return jsonify({
             'success': False,
             'error': str(e)
         }), 500
 
 
-@app.route('/api/admin/refresh-regulatory', methods=['POST'])
-def trigger_regulatory_refresh():
+# Upper bounds per throughput simulation request
+MAX_SIMULATION_LANES = 50
+MAX_SIMULATION_DAYS = 3650
+MAX_SIMULATION_RUNS = 200
+
+@app.route('/api/transport/simulate', methods=['POST'])
+def simulate_transport_throughput():
     """
-    Manually trigger regulatory database refresh (admin only).
-    
+    Discrete-event simulation of lot arrivals, permit approvals, container
+    fills and departures over a year, against a throughput target.
+
     Request body:
         {
-            "source": "epa_faqs"  // optional, refresh specific source only
+            "lanes": [
+                {"origin": "US", "destination": "China", "mode": "ocean",
+                 "annualTonnes": 9000, "materialType": "black_mass",
+                 "lotKg": 2000,                  // mean lot weight
+                 "fillKg": null,                 // defaults to the vehicle capacity
+                 "distanceMiles": null,          // required for truck
+                 "permitFiledDaysAgo": 0}
+            ],
+            "targetTonnes": 20000,      // defaults to the lanes' planned tonnage
+            "days": 365,
+            "startDate": "2026-01-01",  // defaults to today (route blocks are dated)
+            "seed": 42,
+            "runs": 1,                  // >1 adds percentiles across runs
+            "maxHoldDays": 14,
+            "sailingIntervalDays": 7
         }
-    
-    Response:
+
+    Response data: per-lane throughput, queues, departures and cost, totals,
+    whether the target is met, and simulation speed
+    """
+    try:
+        from datetime import date
+        from throughput_sim import simulate_throughput, DEFAULT_DAYS, DEFAULT_MAX_HOLD_DAYS, DEFAULT_SAILING_INTERVAL_DAYS
+
+        data = request.get_json()
+        lines = data.get('lanes') or []
+        days = int(data.get('days', DEFAULT_DAYS))
+        runs = int(data.get('runs', 1))
+        if not lines or len(lines) > MAX_SIMULATION_LANES:
+            return jsonify({
+                'success': False,
+                'error': f'Between 1 and {MAX_SIMULATION_LANES} lanes are required'
+            }), 400
+        if not 1 <= days <= MAX_SIMULATION_DAYS or not 1 <= runs <= MAX_SIMULATION_RUNS:
+            return jsonify({
+                'success': False,
+                'error': f'days must be 1-{MAX_SIMULATION_DAYS} and runs 1-{MAX_SIMULATION_RUNS}'
+            }), 400
+
+        lanes = [
+            {
+                'name': line.get('name'),
+                'origin': line.get('origin'),
+                'destination': line.get('destination'),
+                'mode': line.get('mode', 'ocean'),
+                'annual_t': line.get('annualTonnes', 0),
+                'material_type': line.get('materialType', 'black_mass'),
+                'is_ddr': line.get('isDDR', False),
+                'lot_kg': line.get('lotKg'),
+                'fill_kg': line.get('fillKg'),
+                'distance_miles': line.get('distanceMiles'),
+                'permit_filed_days_ago': line.get('permitFiledDaysAgo', 0)
+            }
+            for line in lines
+        ]
+        result = simulate_throughput(
+            lanes,
+            target_t=data.get('targetTonnes'),
+            days=days,
+            start_date=date.fromisoformat(data['startDate']) if data.get('startDate') else None,
+            seed=data.get('seed'),
+            runs=runs,
+            max_hold_days=float(data.get('maxHoldDays', DEFAULT_MAX_HOLD_DAYS)),
+            sailing_interval_days=float(data.get('sailingIntervalDays', DEFAULT_SAILING_INTERVAL_DAYS))
+        )
+
+        return jsonify({
+            'success': True,
+            'data': result
+        })
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    except Exception as e:
+        logger.error(f"Throughput simulation error: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+# Upper bound on packages per packing request (after expanding counts)
+MAX_PACK_PACKAGES = 50000
+
+@app.route('/api/transport/pack', methods=['POST'])
+def pack_transport_shipment():
+    """
+    Pack drums/IBCs of several lots into containers or trucks.
+
+    Request body:
         {
-            "success": true,
-            "message": "Refresh instructions returned",
-            "instructions": "..."
+            "mode": "ocean",                    // or "truck"
+            "packages": [
+                {"id": "L1-drums", "lot": "L1", "packageType": "drum", "weightKg": 350, "count": 60,
+                 "materialType": "black_mass", "isDDR": false},
+                {"id": "L2-ibc", "lot": "L2", "packageType": "ibc", "weightKg": 1100, "count": 9, "isDDR": true}
+            ],
+            "exact": false,                     // optional minimum-container search for small groups
+            "distanceMiles": 600                // prices trucks
         }
+
+    Response data: containers (manifest per container), groups, totals and
+    overall utilization_pct
     """
     try:
-        # For security, this should check authentication in production
-        # For now, just return refresh instructions
-        
-        import sys
-        import os
-        sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
-        import regulatory_refresh
-        
-        # Get manual refresh instructions
-        from io import StringIO
-        import contextlib
-        
-        f = StringIO()
-        with contextlib.redirect_stdout(f):
-            regulatory_refresh.manual_refresh_instructions()
-        instructions = f.getvalue()
-        
+        from container_packing import pack_shipment
+
+        data = request.get_json()
+        lines = data.get('packages') or []
+        if not lines:
+            return jsonify({
+                'success': False,
+                'error': 'packages are required'
+            }), 400
+
+        packages = [
+            {
+                'id': line.get('id'),
+                'lot': line.get('lot'),
+                'package_type': line.get('packageType', 'drum'),
+                'weight_kg': line.get('weightKg', 0),
+                'count': line.get('count', 1),
+                'material_type': line.get('materialType', 'black_mass'),
+                'is_ddr': line.get('isDDR', False),
+                'group': line.get('group')
+            }
+            for line in lines
+        ]
+        if sum(int(p['count']) for p in packages) > MAX_PACK_PACKAGES:
+            return jsonify({
+                'success': False,
+                'error': f'At most {MAX_PACK_PACKAGES} packages per request'
+            }), 400
+
+        distance_miles = data.get('distanceMiles')
+        result = pack_shipment(
+            packages,
+            mode=data.get('mode', 'ocean'),
+            exact=bool(data.get('exact', False)),
+            distance_miles=float(distance_miles) if distance_miles is not None else None
+        )
+
         return jsonify({
             'success': True,
-            'message': 'Manual refresh required - see instructions',
-            'instructions': instructions,
-            'note': 'Use Cursor with CallMcpTool and firecrawl_scrape to refresh data'
+            'data': result
         })
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
     except Exception as e:
-        logger.error(f"Refresh trigger error: {str(e)}")
+        logger.error(f"Container packing error: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+@app.route('/api/transport/locations', methods=['GET'])
+def get_transport_locations():
+    """
+    Gazetteer locations (plants, ports, border crossings, cities).
+
+    Query params: type (e.g. 'port'), country (e.g. 'US')
+    """
+    try:
+        from gazetteer import get_gazetteer
+        return jsonify({
+            'success': True,
+            'data': get_gazetteer().list_locations(request.args.get('type'), request.args.get('country'))
+        })
+    except Exception as e:
+        logger.error(f"Transport locations error: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+@app.route('/api/transport/distance', methods=['GET'])
+def get_transport_distance():
+    """
+    Offline distance between two gazetteer locations.
+
+    Query params: from, to (location ids, names or aliases)
+
+    Response data: great_circle_miles and road_miles (null when no road
+    connects the two locations)
+    """
+    try:
+        from gazetteer import get_gazetteer
+
+        origin = request.args.get('from')
+        destination = request.args.get('to')
+        if not origin or not destination:
+            return jsonify({
+                'success': False,
+                'error': 'from and to are required'
+            }), 400
+
+        gazetteer = get_gazetteer()
+        return jsonify({
+            'success': True,
+            'data': {
+                'from': gazetteer.resolve(origin),
+                'to': gazetteer.resolve(destination),
+                'great_circle_miles': round(gazetteer.great_circle_miles(origin, destination), 1),
+                'road_miles': gazetteer.road_miles(origin, destination)
+            }
+        })
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    except Exception as e:
+        logger.error(f"Transport distance error: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+@app.route('/api/transport/network', methods=['GET'])
+def get_route_network():
+    """Plants, ports, border crossings and legs of the multimodal route network."""
+    try:
+        from route_network import get_network
+        return jsonify({
+            'success': True,
+            'data': get_network().describe_network()
+        })
+    except Exception as e:
+        logger.error(f"Route network error: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+@app.route('/api/transport/rates', methods=['GET'])
+def get_freight_rates():
+    """Freight rate tables: weight tiers, vehicles and lane overrides per mode, with the loaded version and tier pricing memo stats."""
+    try:
+        from freight_rates import get_rate_table
+        from logistics_data import get_tier_pricing_cache_info
+        return jsonify({
+            'success': True,
+            'data': dict(get_rate_table().describe(), tier_pricing_cache=get_tier_pricing_cache_info())
+        })
+    except Exception as e:
+        logger.error(f"Freight rates error: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+@app.route('/api/transport/route', methods=['POST'])
+def find_transport_route():
+    """
+    Cheapest and fastest multimodal paths between two network nodes.
+
+    Request body:
+        {
+            "origin": "plant_nevada",          // node ids from /api/transport/network
+            "destination": "plant_ningde",
+            "weightKg": 12000,
+            "materialType": "black_mass",
+            "modes": ["truck", "rail", "ocean"],  // optional
+            "allowRestricted": true,           // optional, skip 'restricted' borders when false
+            "asOfDate": "2026-12-01"           // optional, evaluate dated rules at this date (default today)
+        }
+
+    Response data: cheapest and fastest paths (legs, total_cost, transit_days,
+    warnings), or null when no feasible path exists, plus blocked_borders
+    """
+    try:
+        from route_decisions import parse_as_of
+        from route_network import get_network
+
+        data = request.get_json()
+        origin = data.get('origin')
+        destination = data.get('destination')
+        weight_kg = float(data.get('weightKg', 0))
+
+        if not origin or not destination:
+            return jsonify({
+                'success': False,
+                'error': 'origin and destination are required'
+            }), 400
+
+        as_of = parse_as_of(data['asOfDate']).date() if data.get('asOfDate') is not None else None
+        result = get_network().find_routes(
+            origin, destination, weight_kg,
+            material_type=data.get('materialType', 'black_mass'),
+            modes=data.get('modes'),
+            allow_restricted=data.get('allowRestricted', True),
+            as_of=as_of
+        )
+
+        return jsonify({
+            'success': True,
+            'data': result
+        })
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    except Exception as e:
+        logger.error(f"Transport route error: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+@app.route('/api/regulatory/requirements', methods=['GET'])
+def get_regulatory_requirements():
+    """
+    Get regulatory requirements for a specific route and material.
+    
+    Query params:
+        origin: Origin country code
+        destination: Destination country code
+        material: Material type (whole_batteries, black_mass, processed)
+    
+    Response:
+        {
+            "success": true,
+            "data": {
+                "permits": [...],
+                "basel_requirements": [...],
+                "packaging": {...},
+                "documentation": [...]
+            }
+        }
+    """
+    try:
+        origin = request.args.get('origin')
+        destination = request.args.get('destination')
+        material = request.args.get('material', 'black_mass')
+        
+        if not origin or not destination:
+            return jsonify({
+                'success': False,
+                'error': 'origin and destination query parameters are required'
+            }), 400
+        
+        # Get permit checklist
+        checklist = backend.get_permit_checklist(origin, destination, material)
+        
+        # Get regulatory details
+        regulations = backend.get_waste_regulations(origin, destination, material)
+        
+        return jsonify({
+            'success': True,
+            'data': {
+                'checklist': checklist,
+                'regulations': regulations
+            }
+        })
+    except Exception as e:
+        logger.error(f"Regulatory requirements error: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+@app.route('/api/regulatory/status', methods=['GET'])
+def get_regulatory_database_status():
+    """
+    Get status of regulatory database (last updated, freshness).
+    
+    Response:
+        {
+            "success": true,
+            "data": {
+                "last_updated": "2026-01-27",
+                "next_refresh": "2027-01-27",
+                "age_days": 0,
+                "status": "fresh",
+                "sources": [...]
+            }
+        }
+    """
+    try:
+        from logistics_data import get_full_database
+        import sys
+        import os
+        
+        # Import regulatory_refresh to check freshness
+        sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+        import regulatory_refresh
+        
+        db = get_full_database()
+        metadata = db.get('metadata', {})
+        
+        freshness = regulatory_refresh.check_database_freshness()
+        
+        return jsonify({
+            'success': True,
+            'data': {
+                'last_updated': metadata.get('last_updated'),
+                'next_refresh': metadata.get('next_refresh'),
+                'version': metadata.get('version'),
+                'sources': metadata.get('sources', []),
+                'freshness': freshness
+            }
+        })
+    except Exception as e:
+        logger.error(f"Database status error: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+@app.route('/api/admin/refresh-regulatory', methods=['POST'])
+def trigger_regulatory_refresh():
+    """
+    Manually trigger regulatory database refresh (admin only).
+    
+    Request body:
+        {
+            "source": "epa_faqs"  // optional, refresh specific source only
+        }
+    
+    Response:
+        {
+            "success": true,
+            "message": "Refresh instructions returned",
+            "instructions": "..."
+        }
+    """
+    try:
+        # For security, this should check authentication in production
+        # For now, just return refresh instructions
+        
+        import sys
+        import os
+        sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+        import regulatory_refresh
+        
+        # Get manual refresh instructions
+        from io import StringIO
+        import contextlib
+        
+        f = StringIO()
+        with contextlib.redirect_stdout(f):
+            regulatory_refresh.manual_refresh_instructions()
+        instructions = f.getvalue()
+        
+        return jsonify({
+            'success': True,
+            'message': 'Manual refresh required - see instructions',
+            'instructions': instructions,
+            'note': 'Use Cursor with CallMcpTool and firecrawl_scrape to refresh data'
+        })
+    except Exception as e:
+        logger.error(f"Refresh trigger error: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+# ============================================================================
+# OPTIMIZATION ENDPOINTS
+# ============================================================================
+
+@app.route('/api/optimize/assignment', methods=['POST'])
+def optimize_assignment():
+    """
+    Assign lots to destination refineries, maximizing profit after freight.
+
+    Request body:
+        {
+            "currency": "USD",
+            "lots": [
+                {
+                    "id": "LOT-001",
+                    "origin": "US",
+                    "material_type": "black_mass",
+                    "is_ddr": false,
+                    "gross_weight": 12000,
+                    "feed_type": "Black Mass (Processed)",
+                    "yield_pct": 1.0,
+                    "assays": {...},
+                    "metal_prices": {...},
+                    "payables": {...}
+                }
+            ],
+            "destinations": [
+                {
+                    "id": "Refinery A",
+                    "country": "Canada",
+                    "mode": "truck",
+                    "distance_miles": {"US": 600},
+                    "capacity_kg": 50000,
+                    "refining_opex_base": 1400,
+                    "hydromet_recovery": 0.96
+                }
+            ],
+            "market_prices": {"NiSO4": 3.8, ...},  // optional, merged over live market data
+            "skip_unprofitable": false,
+            "include_matrix": false
+        }
+    """
+    try:
+        from lot_assignment import optimize_lot_assignment
+
+        data = request.get_json()
+        lots = data.get('lots', [])
+        destinations = data.get('destinations', [])
+
+        if not lots or not destinations:
+            return jsonify({
+                'success': False,
+                'error': 'lots and destinations are required'
+            }), 400
+
+        for i, lot in enumerate(lots):
+            for param in ['gross_weight', 'assays', 'metal_prices', 'payables']:
+                if param not in lot:
+                    return jsonify({
+                        'success': False,
+                        'error': f'Lot {i + 1} missing required parameter: {param}'
+                    }), 400
+
+        for j, dest in enumerate(destinations):
+            if not isinstance(dest, dict) or not isinstance(dest.get('country'), str) or not dest['country']:
+                return jsonify({
+                    'success': False,
+                    'error': f'Destination {j + 1} missing required parameter: country'
+                }), 400
+            if dest.get('mode', 'ocean') not in ('ocean', 'truck', 'air'):
+                return jsonify({
+                    'success': False,
+                    'error': f"Destination {j + 1} has invalid mode: {dest.get('mode')}"
+                }), 400
+
+        market_data = _market_prices(data.get('market_prices'), data.get('currency', 'USD'))
+
+        result = optimize_lot_assignment(
+            lots, destinations, market_data,
+            skip_unprofitable=data.get('skip_unprofitable', False),
+            include_matrix=data.get('include_matrix', False)
+        )
+
+        return jsonify({
+            'success': True,
+            'data': result
+        })
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    except Exception as e:
+        logger.error(f"Assignment optimization error: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+@app.route('/api/backtest', methods=['POST'])
+def backtest_valuation():
+    """
+    Revalue a lot over a historical price series.
+
+    Request body:
+        {
+            ...calculate parameters (gross_weight, assays, metal_prices, payables, ...),
+            "price_history_csv": "date,Ni,Co,LCE\\n2024-01-02,16.2,29.5,13.1\\n...",  // optional
+            "price_units": "per_kg",   // or "per_tonne"
+            "start": "2024-01-01",     // optional
+            "end": "2025-12-31",       // optional
+            "market_prices": {...}     // optional USD per kg, merged over live USD market data
+        }
+
+    Without price_history_csv the local history store is used.
+    """
+    try:
+        from backtest import run_backtest
+        from price_history import PriceHistory, load_history
+
+        input_params = request.get_json()
+
+        required_params = ['gross_weight', 'assays', 'metal_prices', 'payables']
+        for param in required_params:
+            if param not in input_params:
+                return jsonify({
+                    'success': False,
+                    'error': f'Missing required parameter: {param}'
+                }), 400
+
+        csv_text = input_params.get('price_history_csv')
+        if csv_text:
+            history = PriceHistory.from_csv(csv_text, input_params.get('price_units', 'per_kg'))
+        else:
+            history = load_history()
+
+        if len(history) == 0:
+            return jsonify({
+                'success': False,
+                'error': 'No price history available - upload price_history_csv'
+            }), 400
+
+        # The history store is USD per kg, so missing keys fall back to USD market data
+        market_data = _market_prices(input_params.get('market_prices'))
+        result = run_backtest(
+            input_params, history, market_data,
+            start=input_params.get('start'),
+            end=input_params.get('end')
+        )
+
+        if 'error' in result:
+            return jsonify({
+                'success': False,
+                'error': result['error']
+            }), 400
+
+        return jsonify({
+            'success': True,
+            'data': result
+        })
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    except Exception as e:
+        logger.error(f"Backtest error: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+@app.route('/api/qp/settlement', methods=['POST'])
+def qp_settlement():
+    """
+    Settle open contracts on quotational-period (QP) average prices.
+
+    Request body:
+        {
+            "contracts": [
+                {
+                    "id": "C-2026-014",
+                    "delivery_date": "2026-03-15",
+                    "qp": {"type": "month", "offset_months": 1},  // M+1 average
+                    "qp_keys": ["Ni", "Co"],                       // optional
+                    "provisional_value": 1250.0,                   // optional
+                    ...calculate parameters
+                }
+            ],
+            "as_of": "2026-04-30",          // optional, defaults to last history date
+            "price_history_csv": "...",     // optional, defaults to local store
+            "price_units": "per_kg",
+            "holidays": ["2026-12-25", "2026-12-28"],  // optional exchange holidays, not counted as gaps
+            "market_prices": {...}          // optional USD per kg, merged over live USD market data
+        }
+    """
+    try:
+        from qp_pricing import settle_contracts
+        from price_history import PriceHistory, load_history
+
+        data = request.get_json()
+        contracts = data.get('contracts', [])
+
+        if not contracts:
+            return jsonify({
+                'success': False,
+                'error': 'contracts are required'
+            }), 400
+
+        for i, contract in enumerate(contracts):
+            for param in ['delivery_date', 'gross_weight', 'assays', 'metal_prices', 'payables']:
+                if param not in contract:
+                    return jsonify({
+                        'success': False,
+                        'error': f'Contract {i + 1} missing required parameter: {param}'
+                    }), 400
+
+        csv_text = data.get('price_history_csv')
+        history = PriceHistory.from_csv(csv_text, data.get('price_units', 'per_kg')) if csv_text else load_history()
+        if len(history) == 0:
+            return jsonify({
+                'success': False,
+                'error': 'No price history available - upload price_history_csv'
+            }), 400
+
+        # The history store is USD per kg, so missing keys fall back to USD market data
+        market_data = _market_prices(data.get('market_prices'))
+        result = settle_contracts(contracts, history, market_data, as_of=data.get('as_of'), holidays=data.get('holidays'))
+
+        return jsonify({
+            'success': True,
+            'data': result
+        })
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    except Exception as e:
+        logger.error(f"QP settlement error: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+# ============================================================================
+# QUOTE BOOK ENDPOINTS
+# ============================================================================
+
+@app.route('/api/quotes', methods=['POST'])
+def create_quote():
+    """
+    Issue a quote and add it to the quote book.
+
+    Request body:
+        {
+            ...calculate parameters (gross_weight, assays, metal_prices, payables, ...),
+            "currency": "USD",          // optional, the book only holds USD quotes
+            "quote_id": "Q-2026-001",   // optional
+            "metadata": {"supplier": "Acme Recycling"},  // optional
+            "market_prices": {...}      // optional USD per kg, merged over live USD market data
+        }
+    """
+    try:
+        input_params = request.get_json()
+
+        required_params = ['gross_weight', 'assays', 'metal_prices', 'payables']
+        for param in required_params:
+            if param not in input_params:
+                return jsonify({
+                    'success': False,
+                    'error': f'Missing required parameter: {param}'
+                }), 400
+
+        from quote_book import BOOK_CURRENCY
+
+        currency = input_params.get('currency', BOOK_CURRENCY)
+        if currency != BOOK_CURRENCY:
+            return jsonify({
+                'success': False,
+                'error': f'Quotes are booked in {BOOK_CURRENCY}, got currency {currency}'
+            }), 400
+
+        quote_id = input_params.pop('quote_id', None)
+        metadata = input_params.pop('metadata', None)
+        market_data = _market_prices(input_params.pop('market_prices', None))
+
+        quote = get_quote_book().add_quote(input_params, market_data, quote_id, metadata)
+
+        return jsonify({
+            'success': True,
+            'data': quote
+        })
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    except Exception as e:
+        logger.error(f"Quote creation error: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+@app.route('/api/quotes', methods=['GET'])
+def list_quotes():
+    """
+    List quote positions.
+
+    Query params:
+        status: open (default), closed, or all
+    """
+    try:
+        status = request.args.get('status', 'open')
+        positions = get_quote_book().positions(None if status == 'all' else status)
+
+        return jsonify({
+            'success': True,
+            'data': {
+                'positions': positions,
+                'total_profit': round(sum(p['net_profit'] for p in positions), 2)
+            }
+        })
+    except Exception as e:
+        logger.error(f"Quote listing error: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+@app.route('/api/quotes/mark-to-market', methods=['POST'])
+def mark_quotes_to_market():
+    """
+    Re-price all open quotes and return position changes.
+
+    Request body (optional):
+        {
+            "market_prices": {"Ni": 17.1, "LCE": 12.8, ...},  // USD per kg, defaults to live market data
+            "currency": "USD"                                  // optional, only USD is accepted
+        }
+    """
+    try:
+        from quote_book import BOOK_CURRENCY
+
+        data = request.get_json(silent=True) or {}
+        currency = data.get('currency', BOOK_CURRENCY)
+        if currency != BOOK_CURRENCY:
+            return jsonify({
+                'success': False,
+                'error': f'Quotes are booked in {BOOK_CURRENCY}, got currency {currency}'
+            }), 400
+
+        snapshot = data.get('market_prices') or backend.get_market_data(BOOK_CURRENCY)
+        result = get_quote_book().mark_to_market(snapshot)
+        result['alerts'] = get_alert_engine().evaluate_quote_margins(result)
+
+        return jsonify({
+            'success': True,
+            'data': result
+        })
+    except Exception as e:
+        logger.error(f"Mark-to-market error: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+@app.route('/api/quotes/<quote_id>', methods=['DELETE'])
+def close_quote(quote_id):
+    """Close a quote so it is no longer marked to market."""
+    try:
+        quote = get_quote_book().close_quote(quote_id)
+        if quote is None:
+            return jsonify({
+                'success': False,
+                'error': f'Quote {quote_id} not found'
+            }), 404
+
+        return jsonify({
+            'success': True,
+            'data': {'quote_id': quote_id, 'status': quote['status']}
+        })
+    except Exception as e:
+        logger.error(f"Quote close error: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+# ============================================================================
+# ALERT ENDPOINTS
+# ============================================================================
+
+@app.route('/api/alerts', methods=['POST'])
+def create_alert():
+    """
+    Register a price or quote-margin alert.
+
+    Request body:
+        {
+            "kind": "price",            // or "quote_margin"
+            "target": "LCE",            // price key, or quote id for quote_margin
+            "direction": "below",       // or "above"
+            "threshold": 12.5,          // USD per kg, or margin %
+            "repeat": false,            // optional, keep active after triggering
+            "webhook_url": "https://...",  // optional, must be in ALERT_WEBHOOK_ALLOWED_URLS
+            "note": "LCE under 12.5"    // optional
+        }
+    """
+    try:
+        data = request.get_json()
+
+        required_params = ['kind', 'target', 'direction', 'threshold']
+        for param in required_params:
+            if param not in data:
+                return jsonify({
+                    'success': False,
+                    'error': f'Missing required parameter: {param}'
+                }), 400
+
+        alert = get_alert_engine().add_alert(
+            data['kind'],
+            data['target'],
+            data['direction'],
+            data['threshold'],
+            repeat=bool(data.get('repeat', False)),
+            webhook_url=data.get('webhook_url'),
+            note=data.get('note')
+        )
+
+        return jsonify({
+            'success': True,
+            'data': alert
+        })
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    except Exception as e:
+        logger.error(f"Alert creation error: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+@app.route('/api/alerts', methods=['GET'])
+def list_alerts():
+    """
+    List alerts.
+
+    Query params:
+        active: 'true' to return only active alerts
+    """
+    try:
+        active_only = request.args.get('active', 'false').lower() == 'true'
+
+        return jsonify({
+            'success': True,
+            'data': get_alert_engine().list_alerts(active_only)
+        })
+    except Exception as e:
+        logger.error(f"Alert listing error: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+@app.route('/api/alerts/triggered', methods=['GET'])
+def list_triggered_alerts():
+    """Recently triggered alerts (most recent last)."""
+    try:
+        return jsonify({
+            'success': True,
+            'data': list(get_alert_engine().recent)
+        })
+    except Exception as e:
+        logger.error(f"Triggered alert listing error: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+@app.route('/api/alerts/<alert_id>', methods=['DELETE'])
+def delete_alert(alert_id):
+    """Delete an alert."""
+    try:
+        if not get_alert_engine().remove_alert(alert_id):
+            return jsonify({
+                'success': False,
+                'error': f'Alert {alert_id} not found'
+            }), 404
+
+        return jsonify({
+            'success': True,
+            'data': {'alert_id': alert_id}
+        })
+    except Exception as e:
+        logger.error(f"Alert delete error: {str(e)}")
         return jsonify({
             'success': False,
             'error': str(e)
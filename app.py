@@ -1,5 +1,4 @@
 import streamlit as st
-import re
 import os
 import pandas as pd
 import yfinance as yf
@@ -7,6 +6,8 @@ import altair as alt
 import requests
 from datetime import datetime
 import logging
+import coa_parser
+import coa_ingest
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -325,7 +326,7 @@ def parse_coa_text(text):
     Handles various input formats:
     - Percentages (e.g., "Ni: 20.5%")
     - Basis points (e.g., "Ni 2050" → 20.5%)
-    - Decimal notation (e.g., "Ni 0.205" → 20.5%)
+    - Explicit units (e.g., "Co 6200 ppm", "Mn 41 g/t")
 
     Args:
         text: Raw text from COA (email, PDF, etc.)
@@ -333,34 +334,7 @@ def parse_coa_text(text):
     Returns:
         dict: Metal assays as decimals (e.g., 0.205 for 20.5%)
     """
-    assays = {"Nickel": 0.0, "Cobalt": 0.0, "Lithium": 0.0, "Copper": 0.0, "Aluminum": 0.0, "Manganese": 0.0}
-    text = text.lower().replace(",", "")
-
-    target_map = {
-        "Nickel": ["ni", "nickel"],
-        "Cobalt": ["co", "cobalt"],
-        "Lithium": ["li", "lithium"],
-        "Copper": ["cu", "copper"],
-        "Aluminum": ["al", "aluminum", "aluminium"],
-        "Manganese": ["mn", "manganese"]
-    }
-
-    for line in text.split('\n'):
-        for metal, keywords in target_map.items():
-            for kw in keywords:
-                if re.search(rf"\b{kw}", line):
-                    match = re.search(r"(\d+\.?\d*)", line.replace(kw, ""))
-                    if match:
-                        val = float(match.group(1))
-                        # Handle basis points (e.g., 2050 → 20.5%)
-                        if val > 100:
-                            assays[metal] = val / 10000.0
-                        # Handle percentages (e.g., 20.5 → 20.5%)
-                        else:
-                            assays[metal] = val / 100.0
-                        logger.info(f"Parsed {metal}: {assays[metal]*100:.2f}%")
-
-    return assays
+    return coa_parser.parse_coa_text(text)
 
 # --- 4. SIDEBAR ---
 with st.sidebar:
@@ -517,12 +491,19 @@ with col_input:
     
     default_text = "Ni: 20.5%\nCo: 6.2%\nLi: 2.5%\nCu: 3.5%\nAl: 1.2%\nMn: 4.8%"
     coa_text = st.text_area("Paste Results", height=200, value=default_text, help="Paste text from email/PDF")
+    coa_file = st.file_uploader("...or upload COA file", type=list(coa_ingest.SUPPORTED_FORMATS), help="PDF, CSV, XLSX or TXT; overrides the pasted text")
     
     calc_btn = st.button("RUN VALUATION ➤", type="primary")
 
 # LOGIC BLOCK
 if calc_btn:
-    assays = parse_coa_text(coa_text)
+    if coa_file is not None:
+        ingested = coa_ingest.ingest_coa_file(coa_file, coa_file.name)
+        assays = ingested['assays']
+        if len(ingested['samples']) > 1:
+            st.info(f"{coa_file.name} holds {len(ingested['samples'])} samples; valuing {ingested['samples'][0]['sample']}.")
+    else:
+        assays = parse_coa_text(coa_text)
 
     # VALIDATION: Check if assay values were successfully parsed
     if all(v == 0.0 for v in assays.values()):
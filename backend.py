@@ -8,6 +8,7 @@ import requests
 import yfinance as yf
 import logging
 from datetime import datetime, timedelta
+import coa_parser
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -303,7 +304,7 @@ def parse_coa_text(text):
     Handles various input formats:
     - Percentages (e.g., "Ni: 20.5%")
     - Basis points (e.g., "Ni 2050" → 20.5%)
-    - Decimal notation (e.g., "Ni 0.205" → 20.5%)
+    - Explicit units (e.g., "Co 6200 ppm", "Mn 41 g/t")
 
     Args:
         text: Raw text from COA (email, PDF, etc.)
@@ -311,36 +312,7 @@ def parse_coa_text(text):
     Returns:
         dict: Metal assays as decimals (e.g., 0.205 for 20.5%)
     """
-    import re
-
-    assays = {"Nickel": 0.0, "Cobalt": 0.0, "Lithium": 0.0, "Copper": 0.0, "Aluminum": 0.0, "Manganese": 0.0}
-    text = text.lower().replace(",", "")
-
-    target_map = {
-        "Nickel": ["ni", "nickel"],
-        "Cobalt": ["co", "cobalt"],
-        "Lithium": ["li", "lithium"],
-        "Copper": ["cu", "copper"],
-        "Aluminum": ["al", "aluminum", "aluminium"],
-        "Manganese": ["mn", "manganese"]
-    }
-
-    for line in text.split('\n'):
-        for metal, keywords in target_map.items():
-            for kw in keywords:
-                if re.search(rf"\b{kw}", line):
-                    match = re.search(r"(\d+\.?\d*)", line.replace(kw, ""))
-                    if match:
-                        val = float(match.group(1))
-                        # Handle basis points (e.g., 2050 → 20.5%)
-                        if val > 100:
-                            assays[metal] = val / 10000.0
-                        # Handle percentages (e.g., 20.5 → 20.5%)
-                        else:
-                            assays[metal] = val / 100.0
-                        logger.info(f"Parsed {metal}: {assays[metal]*100:.2f}%")
-
-    return assays
+    return coa_parser.parse_coa_text(text)
 
 def calculate_valuation(input_params):
     """
@@ -512,7 +484,7 @@ def calculate_valuation(input_params):
 # LOGISTICS AND REGULATORY FUNCTIONS
 # ============================================================================
 
-def check_route_feasibility(origin: str, destination: str, material_type: str) -> dict:
+def check_route_feasibility(origin: str, destination: str, material_type: str, as_of=None) -> dict:
     """
     Check if a shipping route is feasible based on regulations.
     
@@ -520,108 +492,17 @@ def check_route_feasibility(origin: str, destination: str, material_type: str) -
         origin: Origin country code (e.g., 'US', 'Canada')
         destination: Destination country code
         material_type: Type of material ('whole_batteries', 'black_mass', 'processed')
+        as_of: Date to evaluate time-sensitive rules at (date, datetime or
+            ISO string, e.g. the expected arrival date); defaults to now
     
     Returns:
         dict with status ('allowed', 'restricted', 'blocked'), requirements, warnings
     """
-    from logistics_data import get_route_status, get_country_regulations
-    
-    route_info = get_route_status(origin, destination)
-    status = route_info.get('status', 'unknown')
-    
-    # Get regulatory frameworks
-    origin_regs = get_country_regulations(origin)
-    dest_regs = get_country_regulations(destination)
-    
-    # Build requirements list and initialize warnings early
-    requirements = list(route_info.get('requirements', []))  # Copy to avoid modifying source
-    warnings = []
-    info_notes = []
-    
-    # Add material-specific requirements (avoid duplicates)
-    # Classification logic:
-    # - whole_batteries: ONLY assembled cells with electrolyte (energized batteries)
-    # - black_mass: Electrode scrap (foils, jelly rolls), shredded material, powders
-    # - processed: Refined metals/compounds (lowest hazard)
-    
-    if material_type in ['black_mass', 'whole_batteries']:
-        if "Material classified as hazardous waste" not in requirements:
-            requirements.append("Material classified as hazardous waste")
-        if origin == 'US' and "RCRA Part B permit required for storage" not in requirements:
-            requirements.append("RCRA Part B permit required for storage")
-    elif material_type == 'processed':
-        # Processed/refined metals have lower regulatory burden
-        if "Material may qualify for reduced hazmat classification" not in requirements:
-            requirements.append("Material may qualify for reduced hazmat classification")
-    
-    # Additional requirements for whole batteries ONLY (assembled cells with electrolyte)
-    if material_type == 'whole_batteries':
-        if "UN 3480/3481 packaging required (assembled cells only)" not in requirements:
-            requirements.append("UN 3480/3481 packaging required (assembled cells only)")
-        if "State of charge documentation required" not in requirements:
-            requirements.append("State of charge documentation required")
-        info_notes.append("Note: Dry electrode scrap (foils/jelly rolls without electrolyte) should be classified as Black Mass")
-        if origin in ['EU', 'Germany', 'France', 'Netherlands', 'Belgium', 'Italy', 'Spain']:
-            # Check if EU export restriction applies (effective Nov 9, 2026 per EU Decision 2025/934)
-            from datetime import datetime
-            eu_restriction_date = datetime(2026, 11, 9)
-            current_date = datetime.now()
-            
-            # Check if destination is non-OECD
-            from logistics_data import COUNTRIES
-            dest_country_info = COUNTRIES.get(destination, {})
-            dest_oecd = dest_country_info.get('oecd_member', False)
-            
-            if not dest_oecd:
-                if current_date >= eu_restriction_date:
-                    status = 'blocked'
-                    if "EU Commission Decision 2025/934 prohibits export to non-OECD countries" not in requirements:
-                        requirements.append("EU Commission Decision 2025/934 prohibits export to non-OECD countries")
-                else:
-                    # Restriction not yet in effect
-                    days_until = (eu_restriction_date - current_date).days
-                    warnings.append(f"EU export restriction to non-OECD takes effect Nov 9, 2026 ({days_until} days from now)")
-                    if "EU export to non-OECD allowed until Nov 9, 2026" not in requirements:
-                        requirements.append("EU export to non-OECD allowed until Nov 9, 2026")
+    from route_decisions import decide_route
     
-    # Add warnings based on status
-    if status == 'restricted':
-        warnings.append(f"Long processing time: {route_info.get('processing_time_days', 'varies')}")
-    
-    # Separate positive notes from warnings
-    if route_info.get('notes'):
-        note = route_info['notes']
-        # Positive/neutral notes go to info, negative ones to warnings
-        if any(positive in note.lower() for positive in ['common route', 'well-established', 'simplifies', 'strong infrastructure', 'easier']):
-            info_notes.append(note)
-        else:
-            warnings.append(note)
-    
-    # Add current_note if present (for time-sensitive regulations)
-    if route_info.get('current_note'):
-        warnings.append(route_info['current_note'])
-    
-    # Determine overall allowed status
-    allowed = status in ['allowed', 'allowed_until_nov_2026']
-    
-    return {
-        'allowed': allowed,
-        'status': status,
-        'requirements': requirements,
-        'warnings': warnings,
-        'info_notes': info_notes,
-        'processing_time': route_info.get('processing_time_days'),
-        'reason': route_info.get('reason'),
-        'effective_date': route_info.get('effective_date'),
-        'origin_regulations': {
-            'framework': origin_regs.get('framework'),
-            'authority': origin_regs.get('competent_authority')
-        },
-        'destination_regulations': {
-            'framework': dest_regs.get('framework'),
-            'authority': dest_regs.get('competent_authority')
-        }
-    }
+    # Static parts come precompiled from the decision table; dated rules
+    # resolve to the variant in force on the as-of date
+    return decide_route(origin, destination, material_type, as_of)
 
 
 def get_transport_estimate(
@@ -631,7 +512,9 @@ def get_transport_estimate(
     weight_kg: float,
     material_type: str = 'black_mass',
     is_ddr: bool = False,
-    distance_miles: float = None
+    distance_miles: float = None,
+    origin_location: str = None,
+    destination_location: str = None
 ) -> dict:
     """
     Calculate transportation cost estimate.
@@ -643,15 +526,31 @@ def get_transport_estimate(
         weight_kg: Material weight in kilograms
         material_type: Type of material
         is_ddr: Whether batteries are damaged/defective/recalled
-        distance_miles: Distance in miles (required for truck)
+        distance_miles: Distance in miles (required for truck unless both
+            locations are given)
+        origin_location: Gazetteer location (id or name) of the pickup
+        destination_location: Gazetteer location (id or name) of the delivery
     
     Returns:
         dict with cost estimate and breakdown
     """
-    from logistics_data import calculate_transport_cost
+    from logistics_data import calculate_transport_cost, get_route_key
     
     # Convert kg to metric tons
     weight_mt = weight_kg / 1000.0
+
+    # Truck distance from the offline gazetteer when the caller gives locations
+    distance_source = 'manual' if distance_miles is not None else None
+    if mode == 'truck' and distance_miles is None and origin_location and destination_location:
+        from gazetteer import get_gazetteer
+        distance_miles = get_gazetteer().road_miles(origin_location, destination_location)
+        if distance_miles is None:
+            return {
+                'error': f'No road connection between {origin_location} and {destination_location}',
+                'estimated_cost': 0,
+                'mode': mode
+            }
+        distance_source = 'gazetteer'
     
     # Check for DDR restrictions
     if is_ddr and mode == 'air':
@@ -662,9 +561,9 @@ def get_transport_estimate(
             'alternative': 'Use ocean or truck transport for DDR batteries'
         }
     
-    # Calculate cost with realistic container/vehicle sizing
+    # Calculate cost with realistic container/vehicle sizing at the lane's rates
     is_hazmat = material_type in ['whole_batteries', 'black_mass']
-    cost_result = calculate_transport_cost(mode, weight_mt, is_hazmat, distance_miles)
+    cost_result = calculate_transport_cost(mode, weight_mt, is_hazmat, distance_miles, lane=get_route_key(origin, destination))
     
     # Handle error cases
     if 'error' in cost_result:
@@ -697,10 +596,78 @@ def get_transport_estimate(
         'currency': 'USD',
         'note': cost_result.get('note', 'Actual costs vary by carrier, season, and volume'),
         'sizing_note': cost_result.get('note'),
+        'distance_miles': distance_miles if mode == 'truck' else None,
+        'distance_source': distance_source if mode == 'truck' else None,
         'manual_override_allowed': True
     }
 
 
+def compare_transport_modes(
+    origin: str,
+    destination: str,
+    weight_kg: float,
+    material_type: str = 'black_mass',
+    is_ddr: bool = False,
+    distance_miles: float = None,
+    modes: tuple = ('ocean', 'truck', 'air'),
+    origin_location: str = None,
+    destination_location: str = None
+) -> dict:
+    """
+    Estimate every transport mode for a shipment and rank the feasible ones.
+
+    Args:
+        origin: Origin country
+        destination: Destination country
+        weight_kg: Material weight in kilograms
+        material_type: Type of material
+        is_ddr: Whether batteries are damaged/defective/recalled
+        distance_miles: Distance in miles (truck is excluded without it or
+            gazetteer locations)
+        modes: Modes to compare
+        origin_location: Gazetteer location of the pickup (for truck distance)
+        destination_location: Gazetteer location of the delivery
+
+    Returns:
+        dict with route feasibility, feasible options ranked by total cost
+        (cost/kg ranks identically for a single shipment weight) and the
+        excluded modes with their reasons
+    """
+    route = check_route_feasibility(origin, destination, material_type)
+
+    options = []
+    excluded = []
+    for mode in modes:
+        # Restricted routes still get estimates; the route block carries their warnings
+        if route['status'] == 'blocked':
+            excluded.append({'mode': mode, 'reason': route.get('reason') or 'Route is blocked'})
+            continue
+        estimate = get_transport_estimate(
+            origin, destination, mode, weight_kg,
+            material_type, is_ddr, distance_miles,
+            origin_location, destination_location
+        )
+        if 'error' in estimate:
+            excluded.append({'mode': mode, 'reason': estimate['error'], 'alternative': estimate.get('alternative')})
+        else:
+            options.append(estimate)
+
+    options.sort(key=lambda o: (o['estimated_cost'], o['cost_per_kg']))
+    for rank, option in enumerate(options, start=1):
+        option['rank'] = rank
+        option['cost_vs_cheapest'] = round(option['estimated_cost'] - options[0]['estimated_cost'], 2)
+
+    return {
+        'origin': origin,
+        'destination': destination,
+        'weight_kg': weight_kg,
+        'route': route,
+        'options': options,
+        'excluded': excluded,
+        'cheapest_mode': options[0]['mode'] if options else None
+    }
+
+
 def get_permit_checklist(origin: str, destination: str, material_type: str) -> dict:
     """
     Get checklist of permits and documentation required for shipment.
@@ -0,0 +1,111 @@
+"""
+Historical backtest of a lot's valuation.
+Revalues a lot at every date of a price history in one vectorized pass and
+reports profit/margin series with drawdown statistics.
+"""
+
+import logging
+from typing import Dict, Any, Optional
+
+import numpy as np
+
+from price_history import PriceHistory
+from valuation_engine import build_exposures, value_exposures, valuation_prices
+
+logger = logging.getLogger(__name__)
+
+
+def drawdown_stats(dates: np.ndarray, series: np.ndarray) -> Dict[str, Any]:
+    """
+    Peak-to-trough statistics for a value series.
+
+    Returns:
+        dict with max drawdown (absolute and % of peak), peak/trough/recovery
+        dates and drawdown duration in days
+    """
+    if len(series) == 0:
+        return {'max_drawdown': 0.0, 'max_drawdown_pct': None, 'peak_date': None,
+                'trough_date': None, 'recovery_date': None, 'duration_days': 0}
+
+    running_peak = np.maximum.accumulate(series)
+    drawdown = series - running_peak
+    trough = int(np.argmin(drawdown))
+    peak = int(np.argmax(series[:trough + 1]))
+    peak_value = series[peak]
+
+    recovered = np.flatnonzero(series[trough:] >= peak_value)
+    recovery = trough + int(recovered[0]) if len(recovered) and drawdown[trough] < 0 else None
+    end = recovery if recovery is not None else len(series) - 1
+
+    return {
+        'max_drawdown': round(float(drawdown[trough]), 2),
+        'max_drawdown_pct': round(float(drawdown[trough] / peak_value * 100), 2) if peak_value > 0 else None,
+        'peak_date': str(dates[peak]),
+        'trough_date': str(dates[trough]),
+        'recovery_date': str(dates[recovery]) if recovery is not None else None,
+        'duration_days': int((dates[end] - dates[peak]).astype(int)) if drawdown[trough] < 0 else 0
+    }
+
+
+def run_backtest(
+    input_params: Dict[str, Any],
+    history: PriceHistory,
+    market_data: Optional[Dict[str, float]] = None,
+    start: Optional[str] = None,
+    end: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Revalue a lot at every timestamp of a price history.
+
+    Prices missing from the history (absent columns, leading gaps) are held at
+    the lot's own metal_prices and the given market product prices.
+
+    Args:
+        input_params: calculate_valuation input parameters (contract terms)
+        history: PriceHistory with prices per kg
+        market_data: Fallback prices for keys the history does not cover
+        start: Optional first date (YYYY-MM-DD)
+        end: Optional last date (YYYY-MM-DD)
+
+    Returns:
+        dict with date-aligned series, summary statistics and drawdown
+    """
+    window = history.between(start, end)
+    if len(window) == 0:
+        return {'error': 'No price history in the requested period'}
+
+    base = valuation_prices(input_params, market_data or {})
+    prices = window.filled(base)
+
+    exposures = build_exposures([input_params])
+    values = value_exposures(exposures, prices)
+    profit = values['net_profit'][:, 0]
+    margin = values['margin_pct'][:, 0]
+
+    dates = window.dates
+    logger.info(f"Backtested lot over {len(dates)} dates ({dates[0]} to {dates[-1]})")
+
+    return {
+        'dates': [str(d) for d in dates],
+        'series': {
+            'net_profit': np.round(profit, 2).tolist(),
+            'margin_pct': np.round(margin, 2).tolist(),
+            'total_revenue': np.round(values['total_revenue'][:, 0], 2).tolist(),
+            'material_cost': np.round(values['material_cost'][:, 0], 2).tolist()
+        },
+        'summary': {
+            'periods': len(dates),
+            'start_date': str(dates[0]),
+            'end_date': str(dates[-1]),
+            'mean_profit': round(float(profit.mean()), 2),
+            'std_profit': round(float(profit.std()), 2),
+            'min_profit': round(float(profit.min()), 2),
+            'max_profit': round(float(profit.max()), 2),
+            'final_profit': round(float(profit[-1]), 2),
+            'mean_margin_pct': round(float(margin.mean()), 2),
+            'min_margin_pct': round(float(margin.min()), 2),
+            'profitable_pct': round(float((profit > 0).mean() * 100), 1)
+        },
+        'drawdown': drawdown_stats(dates, profit),
+        'margin_drawdown': drawdown_stats(dates, margin)
+    }
@@ -0,0 +1,178 @@
+"""
+Content-hash cache for parsed COAs.
+Parse results are keyed by a SHA-256 of the normalized text and kept in a
+bounded in-process LRU, backed by a SQLite file that api.py and app.py share
+when they run on the same host.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+# Empty COA_CACHE_PATH disables the shared SQLite layer
+COA_CACHE_PATH = os.environ.get(
+    'COA_CACHE_PATH',
+    os.path.join(os.path.dirname(__file__), 'data', 'coa_cache.sqlite')
+)
+COA_CACHE_SIZE = int(os.environ.get('COA_CACHE_SIZE', 1024))
+COA_CACHE_MAX_ROWS = int(os.environ.get('COA_CACHE_MAX_ROWS', 100000))
+
+# Bump when parser output changes so stale entries are never served
+PARSER_VERSION = 1
+
+
+def normalize_text(text: str) -> str:
+    """
+    Normalize COA text for hashing without changing what the parser sees:
+    lower-case, thousands separators removed, line endings unified, blank
+    lines and surrounding whitespace dropped.
+    """
+    text = text.lower().replace(',', '').replace('\r\n', '\n').replace('\r', '\n')
+    return '\n'.join(line.strip() for line in text.split('\n') if line.strip())
+
+
+def content_key(text: str) -> str:
+    """Cache key for a COA text."""
+    return hashlib.sha256(f"v{PARSER_VERSION}\n{normalize_text(text)}".encode('utf-8')).hexdigest()
+
+
+class ParseCache:
+    """
+    Two-level parse cache: in-process LRU in front of a shared SQLite table.
+
+    SQLite failures are logged once and the cache falls back to memory only,
+    so caching never breaks parsing.
+    """
+
+    def __init__(self, path: Optional[str] = None, capacity: int = COA_CACHE_SIZE, max_rows: int = COA_CACHE_MAX_ROWS):
+        self.path = COA_CACHE_PATH if path is None else path
+        self.capacity = capacity
+        self.max_rows = max_rows
+        self._memory: 'OrderedDict[str, Dict[str, Any]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = None
+        self._writes = 0
+        self.stats = {'memory_hits': 0, 'shared_hits': 0, 'misses': 0}
+        if self.path:
+            self._connect()
+
+    def _connect(self):
+        try:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            self._conn = sqlite3.connect(self.path, timeout=5, check_same_thread=False)
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS coa_parse ('
+                'key TEXT PRIMARY KEY, result TEXT NOT NULL, created_at REAL NOT NULL)'
+            )
+            self._conn.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"COA cache at {self.path} unavailable, using memory only: {str(e)}")
+            self._conn = None
+
+    def _remember(self, key: str, result: Dict[str, Any]):
+        self._memory[key] = result
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.capacity:
+            self._memory.popitem(last=False)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Cached result for key, or None (counts a miss)."""
+        with self._lock:
+            result = self._memory.get(key)
+            if result is not None:
+                self._memory.move_to_end(key)
+                self.stats['memory_hits'] += 1
+                return result
+
+            if self._conn is not None:
+                try:
+                    row = self._conn.execute('SELECT result FROM coa_parse WHERE key = ?', (key,)).fetchone()
+                except sqlite3.Error as e:
+                    logger.warning(f"COA cache read failed: {str(e)}")
+                    row = None
+                if row is not None:
+                    result = json.loads(row[0])
+                    self._remember(key, result)
+                    self.stats['shared_hits'] += 1
+                    return result
+
+            self.stats['misses'] += 1
+            return None
+
+    def put(self, key: str, result: Dict[str, Any]):
+        """Store a parse result in both levels."""
+        with self._lock:
+            self._remember(key, result)
+            if self._conn is None:
+                return
+            try:
+                self._conn.execute(
+                    'INSERT OR REPLACE INTO coa_parse (key, result, created_at) VALUES (?, ?, ?)',
+                    (key, json.dumps(result), time.time())
+                )
+                self._writes += 1
+                # Trim the oldest rows now and then rather than on every write
+                if self._writes % 1000 == 0:
+                    self._conn.execute(
+                        'DELETE FROM coa_parse WHERE key IN ('
+                        'SELECT key FROM coa_parse ORDER BY created_at DESC LIMIT -1 OFFSET ?)',
+                        (self.max_rows,)
+                    )
+                self._conn.commit()
+            except sqlite3.Error as e:
+                logger.warning(f"COA cache write failed: {str(e)}")
+
+    def clear(self):
+        """Drop all entries from both levels and reset counters."""
+        with self._lock:
+            self._memory.clear()
+            self.stats = {'memory_hits': 0, 'shared_hits': 0, 'misses': 0}
+            if self._conn is not None:
+                try:
+                    self._conn.execute('DELETE FROM coa_parse')
+                    self._conn.commit()
+                except sqlite3.Error as e:
+                    logger.warning(f"COA cache clear failed: {str(e)}")
+
+    def report(self) -> Dict[str, Any]:
+        """Hit/miss counters for this process plus cache sizes."""
+        with self._lock:
+            hits = self.stats['memory_hits'] + self.stats['shared_hits']
+            lookups = hits + self.stats['misses']
+            shared_entries = None
+            if self._conn is not None:
+                try:
+                    shared_entries = self._conn.execute('SELECT COUNT(*) FROM coa_parse').fetchone()[0]
+                except sqlite3.Error:
+                    pass
+            return {
+                **self.stats,
+                'lookups': lookups,
+                'hit_rate': round(hits / lookups, 4) if lookups else 0.0,
+                'memory_entries': len(self._memory),
+                'memory_capacity': self.capacity,
+                'shared_entries': shared_entries,
+                'shared_path': self.path or None
+            }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache() -> ParseCache:
+    """Process-wide parse cache (created on first use)."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ParseCache()
+        return _cache
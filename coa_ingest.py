@@ -0,0 +1,210 @@
+"""
+COA file ingestion.
+Extracts text from uploaded PDF, CSV, XLSX and plain-text COAs one page (or
+block of rows) at a time and feeds it straight to the assay parser, so large
+lab bundles are processed in bounded memory. Everything runs offline with
+local libraries (pypdf, openpyxl).
+"""
+
+import csv
+import io
+import logging
+import os
+import time
+from typing import Dict, List, Any, Iterator, Tuple, Optional, Union, IO
+
+import coa_parser
+
+logger = logging.getLogger(__name__)
+
+SUPPORTED_FORMATS = ('pdf', 'csv', 'xlsx', 'txt')
+
+# Rows per text chunk for tabular formats
+ROWS_PER_CHUNK = 500
+
+
+def detect_format(filename: str) -> str:
+    """File format from the extension ('pdf', 'csv', 'xlsx' or 'txt')."""
+    ext = os.path.splitext(filename or '')[1].lower().lstrip('.')
+    fmt = {'xlsm': 'xlsx', 'text': 'txt', 'tsv': 'csv'}.get(ext, ext)
+    if fmt not in SUPPORTED_FORMATS:
+        raise ValueError(f"Unsupported COA file type: .{ext} (expected one of {', '.join(SUPPORTED_FORMATS)})")
+    return fmt
+
+
+def _pdf_chunks(source: Union[str, IO]) -> Iterator[Tuple[str, str]]:
+    try:
+        from pypdf import PdfReader
+    except ImportError:
+        raise ImportError("PDF ingestion requires pypdf (pip install pypdf)")
+
+    reader = PdfReader(source)
+    for number, page in enumerate(reader.pages, start=1):
+        yield f"page {number}", page.extract_text() or ''
+        # Drop parsed objects of finished pages; they are re-read on demand
+        reader.resolved_objects.clear()
+
+
+def _rows_to_chunks(rows: Iterator[List[Any]], label: str) -> Iterator[Tuple[str, str]]:
+    lines = []
+    first = 1
+    for number, row in enumerate(rows, start=1):
+        lines.append('\t'.join('' if cell is None else str(cell) for cell in row))
+        if len(lines) == ROWS_PER_CHUNK:
+            yield f"{label}rows {first}-{number}", '\n'.join(lines)
+            lines, first = [], number + 1
+    if lines:
+        yield f"{label}rows {first}-{first + len(lines) - 1}", '\n'.join(lines)
+
+
+def _text_stream(source: Union[str, IO]) -> IO:
+    if isinstance(source, str):
+        return open(source, 'r', newline='', encoding='utf-8', errors='replace')
+    if isinstance(source, io.TextIOBase):
+        return source
+    return io.TextIOWrapper(source, encoding='utf-8', errors='replace', newline='')
+
+
+def _csv_chunks(source: Union[str, IO]) -> Iterator[Tuple[str, str]]:
+    stream = _text_stream(source)
+    try:
+        sample = stream.read(4096)
+        stream.seek(0)
+        try:
+            dialect = csv.Sniffer().sniff(sample, delimiters=',;\t|')
+        except csv.Error:
+            dialect = csv.excel
+        yield from _rows_to_chunks(csv.reader(stream, dialect), '')
+    finally:
+        if isinstance(source, str):
+            stream.close()
+        elif isinstance(stream, io.TextIOWrapper) and stream is not source:
+            stream.detach()
+
+
+def _xlsx_chunks(source: Union[str, IO]) -> Iterator[Tuple[str, str]]:
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ImportError("XLSX ingestion requires openpyxl (pip install openpyxl)")
+
+    workbook = load_workbook(source, read_only=True, data_only=True)
+    try:
+        for sheet in workbook.worksheets:
+            yield from _rows_to_chunks(sheet.iter_rows(values_only=True), f"{sheet.title} ")
+    finally:
+        workbook.close()
+
+
+def _txt_chunks(source: Union[str, IO]) -> Iterator[Tuple[str, str]]:
+    stream = _text_stream(source)
+    try:
+        lines, first = [], 1
+        for number, line in enumerate(stream, start=1):
+            lines.append(line.rstrip('\r\n'))
+            if len(lines) == ROWS_PER_CHUNK:
+                yield f"lines {first}-{number}", '\n'.join(lines)
+                lines, first = [], number + 1
+        if lines:
+            yield f"lines {first}-{first + len(lines) - 1}", '\n'.join(lines)
+    finally:
+        if isinstance(source, str):
+            stream.close()
+        elif isinstance(stream, io.TextIOWrapper) and stream is not source:
+            stream.detach()
+
+
+_EXTRACTORS = {
+    'pdf': _pdf_chunks,
+    'csv': _csv_chunks,
+    'xlsx': _xlsx_chunks,
+    'txt': _txt_chunks
+}
+
+
+def iter_text_chunks(source: Union[str, IO], filename: Optional[str] = None) -> Iterator[Tuple[str, str]]:
+    """
+    Yield (label, text) chunks from a COA file: one per PDF page, or one per
+    ROWS_PER_CHUNK rows/lines for CSV, XLSX and text files.
+
+    Args:
+        source: File path or binary file object (e.g. an upload stream)
+        filename: Name used to detect the format (defaults to the path)
+    """
+    fmt = detect_format(filename or (source if isinstance(source, str) else getattr(source, 'name', '')))
+    return _EXTRACTORS[fmt](source)
+
+
+def ingest_coa_file(source: Union[str, IO], filename: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Extract assays from a COA file.
+
+    Chunks are tokenized (and checked for multi-sample tables) as they are
+    extracted and then discarded: tokens are folded into running totals, and
+    a table that runs to the end of a chunk carries its header into the next
+    one so rows on later pages or blocks are still read. Memory stays bounded
+    by one page or block of rows regardless of file size.
+
+    Args:
+        source: File path or binary file object
+        filename: Original file name (needed for uploads to detect the format)
+
+    Returns:
+        dict with 'filename', 'format', 'chunks', 'samples' (one entry per table
+        sample, with the chunk label where it starts), 'assays', 'confidence',
+        'tokens' and 'elapsed_ms'. 'assays' is the first table sample when the
+        file holds tables (confidence None), otherwise the line-by-line parse
+        of the text.
+    """
+    start = time.perf_counter()
+    name = filename or (source if isinstance(source, str) else getattr(source, 'name', ''))
+    fmt = detect_format(name)
+
+    summary = coa_parser.TokenSummary()
+    samples = []
+    # Samples of the table still open at the end of the last chunk, by name
+    open_samples: Dict[str, Dict[str, Any]] = {}
+    header = None
+    chunks = 0
+    for label, text in iter_text_chunks(source, name):
+        chunks += 1
+        summary.add(coa_parser.tokenize_coa(text))
+        table = coa_parser.extract_coa_table(text, header)
+        if table['layout'] == 'single':
+            header, open_samples = None, {}
+            continue
+
+        rows = [dict(zip(table['elements'], row.tolist())) for row in table['matrix']]
+        if not table['continued']:
+            open_samples = {}
+        for sample, assays in zip(table['samples'], rows):
+            if table['layout'] == 'samples_as_columns' and sample in open_samples:
+                # More element rows for a sample started in an earlier chunk
+                merged = open_samples[sample]['assays']
+                merged.update({metal: value for metal, value in assays.items() if value})
+                continue
+            entry = {'sample': sample, 'chunk': label, 'assays': assays}
+            samples.append(entry)
+            open_samples[sample] = entry
+        header = table['header'] if table['continues'] else None
+
+    if samples:
+        assays = samples[0]['assays']
+        confidence = None
+    else:
+        assays = dict(summary.assays)
+        confidence = summary.confidence()
+
+    elapsed_ms = round((time.perf_counter() - start) * 1000, 3)
+    logger.info(f"Ingested {name} ({fmt}, {chunks} chunks, {len(samples)} table samples) in {elapsed_ms} ms")
+
+    return {
+        'filename': os.path.basename(name),
+        'format': fmt,
+        'chunks': chunks,
+        'samples': samples,
+        'assays': assays,
+        'confidence': confidence,
+        'tokens': summary.count,
+        'elapsed_ms': elapsed_ms
+    }
@@ -0,0 +1,702 @@
+"""
+Certificate of analysis (COA) parser.
+A single precompiled pattern scans each line once and emits
+(element, value, unit) tokens; assays are built from those tokens.
+Multi-sample reports are read as tables into a sample × element matrix, and
+batches of documents are parsed across a process pool.
+
+Run `python coa_parser.py --check` to verify the correctness corpus and
+`python coa_parser.py --benchmark` to time the parser on a large synthetic report.
+"""
+
+import argparse
+import functools
+import itertools
+import json
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, List, Any, Iterator, Tuple, Optional
+
+import numpy as np
+
+from coa_cache import content_key, get_cache
+
+logger = logging.getLogger(__name__)
+
+CORPUS_PATH = os.path.join(os.path.dirname(__file__), 'data', 'coa_corpus.json')
+
+ASSAY_METALS = ("Nickel", "Cobalt", "Lithium", "Copper", "Aluminum", "Manganese")
+
+# Element keyword -> assay name
+ELEMENT_ALIASES = {
+    "ni": "Nickel", "nickel": "Nickel",
+    "co": "Cobalt", "cobalt": "Cobalt",
+    "li": "Lithium", "lithium": "Lithium",
+    "cu": "Copper", "copper": "Copper",
+    "al": "Aluminum", "aluminum": "Aluminum", "aluminium": "Aluminum",
+    "mn": "Manganese", "manganese": "Manganese"
+}
+
+# Unit -> divisor to a mass fraction (0.205 for 20.5%)
+UNIT_DIVISORS = {
+    "%": 100.0,
+    "wt%": 100.0,
+    "ppm": 1e6,
+    "mg/kg": 1e6,
+    "g/t": 1e6
+}
+
+# Longest aliases first so "cobalt" wins over "co"; the trailing \b stops
+# "co" from matching inside "copper" and "cobalt"
+_ALIAS_PATTERN = "|".join(sorted(map(re.escape, ELEMENT_ALIASES), key=len, reverse=True))
+_TOKEN_RE = re.compile(
+    rf"\b(?P<element>{_ALIAS_PATTERN})\b"
+    r"|(?P<value>\d+(?:\.\d+)?)\s*(?P<unit>wt\s?%|%|ppm|mg/kg|g/t)?"
+)
+
+
+def _normalize_unit(unit: Optional[str]) -> Optional[str]:
+    return unit.replace(" ", "") if unit else None
+
+
+def tokenize_line(line: str) -> Iterator[Tuple[str, float, Optional[str]]]:
+    """
+    Scan one lower-cased line and yield (element, value, unit) tokens.
+
+    Each number is paired with the oldest element keyword still waiting for a
+    value, so "ni co 20.5 3.1" yields Nickel 20.5 then Cobalt 3.1. Numbers with
+    no pending element (sample ids, dates) are skipped.
+    """
+    pending = []
+    for match in _TOKEN_RE.finditer(line):
+        element = match.group('element')
+        if element is not None:
+            metal = ELEMENT_ALIASES[element]
+            if metal not in pending:
+                pending.append(metal)
+        elif pending:
+            yield pending.pop(0), float(match.group('value')), _normalize_unit(match.group('unit'))
+
+
+def tokenize_coa(text: str) -> List[Tuple[str, float, Optional[str]]]:
+    """Tokenize a whole COA into (element, value, unit) tuples in document order."""
+    text = text.lower().replace(",", "")
+    tokens = []
+    for line in text.split('\n'):
+        tokens.extend(tokenize_line(line))
+    return tokens
+
+
+def to_fraction(value: float, unit: Optional[str]) -> float:
+    """
+    Convert a token value to a mass fraction.
+
+    Without an explicit unit, values over 100 are read as basis points
+    (2050 → 20.5%) and others as percentages.
+    """
+    if unit:
+        return value / UNIT_DIVISORS[unit]
+    if value > 100:
+        return value / 10000.0
+    return value / 100.0
+
+
+def assays_from_tokens(tokens: List[Tuple[str, float, Optional[str]]]) -> Dict[str, float]:
+    """Assay fractions from tokens; the last value reported for an element wins."""
+    assays = {metal: 0.0 for metal in ASSAY_METALS}
+    for metal, value, unit in tokens:
+        assays[metal] = to_fraction(value, unit)
+    return assays
+
+
+def _parse_entry(text: str) -> Dict[str, Any]:
+    """Assays plus parse metadata for one text (the unit stored in the parse cache)."""
+    tokens = tokenize_coa(text)
+    assays = assays_from_tokens(tokens)
+    return {'assays': assays, 'confidence': parse_confidence(tokens, assays), 'tokens': len(tokens)}
+
+
+def parse_coa_text(text: str, use_cache: bool = True) -> Dict[str, float]:
+    """
+    Parse certificate of analysis (COA) text to extract metal assay values.
+
+    Handles various input formats:
+    - Percentages (e.g., "Ni: 20.5%")
+    - Basis points (e.g., "Ni 2050" → 20.5%)
+    - Explicit units (e.g., "Co 6200 ppm", "Mn 41 g/t")
+
+    Args:
+        text: Raw text from COA (email, PDF, etc.)
+        use_cache: Look up and store the result in the content-hash parse cache
+
+    Returns:
+        dict: Metal assays as decimals (e.g., 0.205 for 20.5%); the last
+              value reported for an element wins
+    """
+    if use_cache:
+        cache = get_cache()
+        key = content_key(text)
+        entry = cache.get(key)
+        if entry is not None:
+            return dict(entry['assays'])
+
+    entry = _parse_entry(text)
+    for metal, value in entry['assays'].items():
+        if value:
+            logger.info(f"Parsed {metal}: {value*100:.2f}%")
+    if use_cache:
+        cache.put(key, entry)
+    return dict(entry['assays'])
+
+
+# ----------------------------------------------------------------------
+# Multi-sample tables
+# ----------------------------------------------------------------------
+
+_UNIT_PATTERN = r"wt\s?%|%|ppm|mg/kg|g/t"
+_DELIMITERS = ('\t', '|', ';', ',')
+_SPACE_SPLIT_RE = re.compile(r"\s{2,}")
+# Element header/label cell, optionally annotated with a unit: "Ni", "Ni (%)", "Cobalt [ppm]", "Li_ppm"
+_ELEMENT_CELL_RE = re.compile(
+    rf"^(?P<element>{_ALIAS_PATTERN})(?:\s*[\(\[_]?\s*(?P<unit>{_UNIT_PATTERN})\s*[\)\]]?)?$"
+)
+_UNIT_CELL_RE = re.compile(rf"^[\(\[]?\s*(?P<unit>{_UNIT_PATTERN})\s*[\)\]]?$")
+_UNIT_HEADER_RE = re.compile(r"^(units?|uom)$")
+# Numeric cell with optional unit suffix; '<' marks a below-detection-limit result
+_VALUE_CELL_RE = re.compile(rf"^(?P<lt><)?\s*(?P<value>\d+(?:\.\d+)?)\s*(?P<unit>{_UNIT_PATTERN})?$")
+_NOT_DETECTED = {'nd', 'n.d.', 'bdl', '-', '--'}
+
+
+def _split_cells(line: str, delimiter: Optional[str]) -> List[str]:
+    if delimiter is None:
+        cells = _SPACE_SPLIT_RE.split(line.strip())
+    else:
+        cells = line.split(delimiter)
+    return [cell.strip() for cell in cells]
+
+
+def _detect_delimiter(line: str) -> Optional[str]:
+    """Column delimiter for a header line; None means runs of 2+ spaces."""
+    for delimiter in _DELIMITERS:
+        if line.count(delimiter) >= 1 and len([c for c in line.split(delimiter) if c.strip()]) >= 2:
+            return delimiter
+    return None
+
+
+def _element_cell(cell: str) -> Optional[Tuple[str, Optional[str]]]:
+    match = _ELEMENT_CELL_RE.match(cell.lower())
+    if not match:
+        return None
+    return ELEMENT_ALIASES[match.group('element')], _normalize_unit(match.group('unit'))
+
+
+def _unit_cell(cell: str) -> Optional[str]:
+    match = _UNIT_CELL_RE.match(cell.lower())
+    return _normalize_unit(match.group('unit')) if match else None
+
+
+def _value_cell(cell: str, unit: Optional[str]) -> Optional[float]:
+    """Cell as a mass fraction; below-detection and 'nd' cells are 0, non-numeric cells None."""
+    cell = cell.lower()
+    if cell in _NOT_DETECTED:
+        return 0.0
+    match = _VALUE_CELL_RE.match(cell.replace(',', ''))
+    if not match:
+        return None
+    if match.group('lt'):
+        return 0.0
+    return to_fraction(float(match.group('value')), _normalize_unit(match.group('unit')) or unit)
+
+
+def _samples_as_rows(lines: List[str], start: int, delimiter: Optional[str]) -> Optional[Dict[str, Any]]:
+    """Samples as rows, elements as header columns: 'Sample | Ni (%) | Co (%) ...'."""
+    columns = {}
+    for j, cell in enumerate(_split_cells(lines[start], delimiter)):
+        parsed = _element_cell(cell)
+        if parsed and parsed[0] not in [metal for metal, _ in columns.values()]:
+            columns[j] = parsed
+    if len(columns) < 2:
+        return None
+
+    # Optional unit row directly under the header, aligned by position or,
+    # when it has one cell per element column, by order
+    row = start + 1
+    if row < len(lines):
+        cells = _split_cells(lines[row], delimiter)
+        units = [_unit_cell(cells[j]) if j < len(cells) else None for j in columns]
+        if not all(units):
+            units = [_unit_cell(c) for c in cells if c]
+        if len(units) == len(columns) and all(units):
+            columns = {j: (metal, unit) for (j, (metal, _)), unit in zip(columns.items(), units)}
+            row += 1
+
+    samples, rows = [], []
+    for line in itertools.islice(lines, row, None):
+        cells = _split_cells(line, delimiter)
+        if not line.strip() or len(cells) <= min(columns):
+            break
+        values = {metal: _value_cell(cells[j], unit) for j, (metal, unit) in columns.items() if j < len(cells)}
+        if all(v is None for v in values.values()):
+            break
+        labels = [c for j, c in enumerate(cells) if j not in columns and c]
+        samples.append(labels[0] if labels else f"sample_{len(samples) + 1}")
+        rows.append(values)
+    if not rows:
+        return None
+    return {
+        'layout': 'samples_as_rows',
+        'samples': samples,
+        'rows': rows,
+        'header': lines[start:row],
+        'end': row + len(rows)
+    }
+
+
+def _samples_as_columns(lines: List[str], start: int, delimiter: Optional[str]) -> Optional[Dict[str, Any]]:
+    """Elements as rows, samples as header columns: 'Element | Unit | S-001 | S-002 ...'."""
+    header = _split_cells(lines[start], delimiter)
+    if len(header) < 2 or _element_cell(header[0]):
+        return None
+    unit_col = next((j for j, cell in enumerate(header) if _UNIT_HEADER_RE.match(cell.lower())), None)
+    sample_cols = [j for j in range(1, len(header)) if j != unit_col and header[j]]
+    if not sample_cols or any(_value_cell(header[j], None) is not None for j in sample_cols):
+        return None
+
+    columns = {j: {} for j in sample_cols}
+    found = 0
+    for line in itertools.islice(lines, start + 1, None):
+        if not line.strip():
+            break
+        cells = _split_cells(line, delimiter)
+        parsed = _element_cell(cells[0])
+        if parsed is None:
+            break
+        metal, unit = parsed
+        if unit_col is not None and unit and len(cells) == len(header) - 1:
+            # "Nickel %" split as one cell: restore the unit column
+            cells.insert(unit_col, unit)
+        if unit_col is not None and unit_col < len(cells):
+            unit = _unit_cell(cells[unit_col]) or unit
+        for j in sample_cols:
+            if j < len(cells):
+                value = _value_cell(cells[j], unit)
+                if value is not None:
+                    columns[j][metal] = value
+        found += 1
+
+    columns = {j: values for j, values in columns.items() if values}
+    if found < 2 or not columns:
+        return None
+    return {
+        'layout': 'samples_as_columns',
+        'samples': [header[j] for j in columns],
+        'rows': list(columns.values()),
+        'header': lines[start:start + 1],
+        'end': start + 1 + found
+    }
+
+
+# Leading lines of a page/chunk searched for the continuation of a table
+# (page headers and other furniture before the rows resume)
+CONTINUATION_SCAN_LINES = 10
+
+
+def _runs_to_end(lines: List[str], end: int) -> bool:
+    return not any(line.strip() for line in itertools.islice(lines, end, None))
+
+
+def extract_coa_table(text: str, header: Optional[List[str]] = None) -> Dict[str, Any]:
+    """
+    Extract a multi-sample assay table from COA text.
+
+    Detects two layouts (cells split on tab, '|', ';', ',' or 2+ spaces):
+    - samples as rows with element columns ("Sample  Ni (%)  Co (%) ...")
+    - elements as rows with sample columns ("Element  Unit  S-001  S-002 ...")
+    Units come from the header annotation, a Unit column/row, or a suffix on
+    the value itself (%, wt%, ppm, mg/kg, g/t); bare numbers use the
+    parse_coa_text heuristic. Below-detection results ("<0.01", "ND") are 0.
+    The largest table in the text wins; text without a recognizable table is
+    parsed as a single sample.
+
+    A table split over pages or chunks is read by passing the 'header' of the
+    previous part's table when it 'continues': rows at the top of this text
+    (after up to CONTINUATION_SCAN_LINES lines of page furniture) are then
+    read under that header, and the result is flagged 'continued'.
+
+    Args:
+        text: Raw COA text
+        header: Header lines of a table that ran to the end of the previous part
+
+    Returns:
+        dict with 'layout', 'samples' (S names), 'elements' (ASSAY_METALS),
+        'matrix' (S × 6 numpy array of mass fractions, 0 where not reported),
+        'header' (the table's header lines), 'continues' (the table runs to
+        the end of the text) and 'continued'
+    """
+    lines = text.replace('\r', '').split('\n')
+    best, best_size, best_lines = None, 0, lines
+    for i, line in enumerate(lines):
+        if not line.strip():
+            continue
+        delimiter = _detect_delimiter(line)
+        for reader in (_samples_as_rows, _samples_as_columns):
+            table = reader(lines, i, delimiter)
+            if table:
+                size = sum(len(row) for row in table['rows'])
+                if size > best_size:
+                    best, best_size, best_lines = table, size, lines
+
+    if header:
+        delimiter = _detect_delimiter(header[0])
+        for i in range(min(len(lines), CONTINUATION_SCAN_LINES)):
+            joined = header + lines[i:]
+            tables = [t for t in (reader(joined, 0, delimiter) for reader in (_samples_as_rows, _samples_as_columns)) if t]
+            if tables:
+                table = max(tables, key=lambda t: sum(len(row) for row in t['rows']))
+                size = sum(len(row) for row in table['rows'])
+                if size > best_size:
+                    best, best_size, best_lines = dict(table, continued=True), size, joined
+                break
+
+    if best is None:
+        best = {
+            'layout': 'single',
+            'samples': ['sample_1'],
+            'rows': [assays_from_tokens(tokenize_coa(text))],
+            'header': [],
+            'end': None
+        }
+
+    matrix = np.array([[row.get(metal) or 0.0 for metal in ASSAY_METALS] for row in best['rows']], dtype=float)
+    logger.info(f"Extracted {len(best['samples'])} sample(s) from COA ({best['layout']})")
+    return {
+        'layout': best['layout'],
+        'samples': best['samples'],
+        'elements': list(ASSAY_METALS),
+        'matrix': matrix,
+        'header': best['header'],
+        'continues': best['end'] is not None and _runs_to_end(best_lines, best['end']),
+        'continued': best.get('continued', False)
+    }
+
+
+def table_to_lots(table: Dict[str, Any], base_params: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """One calculate_valuation input per sample: base_params with that sample's assays."""
+    return [
+        dict(base_params, assays=dict(zip(table['elements'], row.tolist())))
+        for row in table['matrix']
+    ]
+
+
+# ----------------------------------------------------------------------
+# Batch parsing
+# ----------------------------------------------------------------------
+
+BATCH_WORKERS = int(os.environ.get('COA_PARSE_WORKERS', os.cpu_count() or 1))
+# Batches smaller than this are parsed in-process (pool start-up would dominate)
+MIN_PARALLEL_DOCUMENTS = 16
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def parse_confidence(tokens: List[Tuple[str, float, Optional[str]]], assays: Dict[str, float]) -> float:
+    """
+    Heuristic 0-1 confidence for a parse.
+
+    Weighs element coverage (50%), share of values with an explicit unit (30%)
+    and consistency of repeated elements (20%); halved when the assays sum to
+    more than 100%. A document with no assay tokens scores 0.
+    """
+    summary = TokenSummary()
+    summary.add(tokens)
+    return summary.confidence(assays)
+
+
+class TokenSummary:
+    """
+    Running totals of a token stream: last-value-wins assays plus the counts
+    parse_confidence needs, so a large document can be tokenized piece by
+    piece without keeping its tokens.
+    """
+
+    def __init__(self):
+        self.assays = {metal: 0.0 for metal in ASSAY_METALS}
+        self.count = 0
+        self.explicit = 0
+        self._first: Dict[str, float] = {}
+        self._inconsistent = set()
+
+    def add(self, tokens: List[Tuple[str, float, Optional[str]]]):
+        for metal, value, unit in tokens:
+            fraction = to_fraction(value, unit)
+            self.assays[metal] = fraction
+            self.count += 1
+            if unit:
+                self.explicit += 1
+            first = self._first.setdefault(metal, round(fraction, 9))
+            if first != round(fraction, 9):
+                self._inconsistent.add(metal)
+
+    def confidence(self, assays: Optional[Dict[str, float]] = None) -> float:
+        """parse_confidence of the tokens added so far (against self.assays by default)."""
+        if not self.count:
+            return 0.0
+        assays = self.assays if assays is None else assays
+        coverage = sum(1 for v in assays.values() if v > 0) / len(ASSAY_METALS)
+        explicit = self.explicit / self.count
+        consistent = (len(self._first) - len(self._inconsistent)) / len(self._first)
+
+        confidence = 0.5 * coverage + 0.3 * explicit + 0.2 * consistent
+        if sum(assays.values()) > 1.0:
+            confidence /= 2
+        return round(confidence, 3)
+
+
+def parse_document(document: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Parse one document for batch use.
+
+    Args:
+        document: dict with 'id' and 'text'
+
+    Returns:
+        dict with 'id', 'assays', 'confidence', 'tokens', 'elapsed_ms' and,
+        on failure, 'error'
+    """
+    start = time.perf_counter()
+    try:
+        result = {'id': document['id'], **_parse_entry(document['text'])}
+    except Exception as e:
+        result = {'id': document['id'], 'assays': None, 'confidence': 0.0, 'tokens': 0, 'error': str(e)}
+    result['elapsed_ms'] = round((time.perf_counter() - start) * 1000, 3)
+    return result
+
+
+def _parse_chunk(documents: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    return [parse_document(document) for document in documents]
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    """Process pool shared by all batch calls in this process (created on first use)."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=BATCH_WORKERS)
+        return _pool
+
+
+def parse_documents(
+    documents: List[Any],
+    max_workers: Optional[int] = None,
+    use_cache: bool = True
+) -> Iterator[Dict[str, Any]]:
+    """
+    Parse many COA documents in parallel, yielding results as they complete.
+
+    Documents already in the parse cache are yielded first (with 'cached': True);
+    only the misses are sent to the worker pool.
+
+    Args:
+        documents: Texts, or dicts with 'text' and optional 'id'
+                   (ids default to the document's position)
+        max_workers: Worker processes (defaults to COA_PARSE_WORKERS / CPU count);
+                     1 parses in-process
+        use_cache: Look up and store results in the content-hash parse cache
+
+    Yields:
+        parse_document results (completion order, not input order)
+    """
+    cache = get_cache() if use_cache else None
+    pending, keys = [], []
+    for i, document in enumerate(documents):
+        if isinstance(document, str):
+            document = {'text': document}
+        document = {'id': document.get('id', i), 'text': document.get('text', '')}
+        if cache is None:
+            pending.append(document)
+            continue
+
+        start = time.perf_counter()
+        key = content_key(document['text'])
+        entry = cache.get(key)
+        if entry is not None:
+            yield {
+                'id': document['id'],
+                **entry,
+                'cached': True,
+                'elapsed_ms': round((time.perf_counter() - start) * 1000, 3)
+            }
+        else:
+            pending.append(document)
+            keys.append(key)
+
+    def store(results: List[Dict[str, Any]], result_keys: List[str]):
+        if cache is not None:
+            for result, key in zip(results, result_keys):
+                if 'error' not in result:
+                    cache.put(key, {k: result[k] for k in ('assays', 'confidence', 'tokens')})
+        return results
+
+    workers = max_workers or BATCH_WORKERS
+    if workers <= 1 or len(pending) < MIN_PARALLEL_DOCUMENTS:
+        for i, document in enumerate(pending):
+            yield from store([parse_document(document)], keys[i:i + 1])
+        return
+
+    # A few chunks per worker keeps results streaming without per-document IPC
+    chunk_size = max(1, len(pending) // (workers * 4))
+    starts = range(0, len(pending), chunk_size)
+    pool = _get_pool() if max_workers is None else ProcessPoolExecutor(max_workers=workers)
+    try:
+        futures = {pool.submit(_parse_chunk, pending[i:i + chunk_size]): i for i in starts}
+        for future in as_completed(futures):
+            i = futures[future]
+            yield from store(future.result(), keys[i:i + chunk_size])
+    finally:
+        if pool is not _pool:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+
+# ----------------------------------------------------------------------
+# Correctness corpus and benchmark
+# ----------------------------------------------------------------------
+
+def _legacy_parse_coa_text(text: str) -> Dict[str, float]:
+    """Previous line × metal × keyword implementation, kept as the benchmark baseline."""
+    assays = {metal: 0.0 for metal in ASSAY_METALS}
+    text = text.lower().replace(",", "")
+    target_map = {
+        "Nickel": ["ni", "nickel"],
+        "Cobalt": ["co", "cobalt"],
+        "Lithium": ["li", "lithium"],
+        "Copper": ["cu", "copper"],
+        "Aluminum": ["al", "aluminum", "aluminium"],
+        "Manganese": ["mn", "manganese"]
+    }
+    for line in text.split('\n'):
+        for metal, keywords in target_map.items():
+            for kw in keywords:
+                if re.search(rf"\b{kw}", line):
+                    match = re.search(r"(\d+\.?\d*)", line.replace(kw, ""))
+                    if match:
+                        val = float(match.group(1))
+                        assays[metal] = val / 10000.0 if val > 100 else val / 100.0
+    return assays
+
+
+def check_corpus(path: str = CORPUS_PATH) -> List[Dict[str, object]]:
+    """
+    Parse every case in the correctness corpus ('cases' through parse_coa_text,
+    'table_cases' through extract_coa_table).
+
+    Returns:
+        List of failures with case name, expected and actual assays
+    """
+    with open(path, 'r') as f:
+        corpus = json.load(f)
+    cases = corpus['cases']
+    table_cases = corpus.get('table_cases', [])
+
+    failures = []
+    for case in cases:
+        actual = parse_coa_text(case['text'], use_cache=False)
+        expected = {metal: 0.0 for metal in ASSAY_METALS}
+        expected.update(case['expected'])
+        if any(abs(actual[m] - expected[m]) > 1e-9 for m in ASSAY_METALS):
+            failures.append({'name': case['name'], 'expected': expected, 'actual': actual})
+
+    for case in table_cases:
+        table = extract_coa_table(case['text'])
+        expected = np.array([[row.get(m, 0.0) for m in ASSAY_METALS] for row in case['expected']])
+        actual = {'layout': table['layout'], 'samples': table['samples'], 'matrix': table['matrix'].tolist()}
+        if (table['layout'] != case['layout'] or table['samples'] != case['samples']
+                or table['matrix'].shape != expected.shape or not np.allclose(table['matrix'], expected, atol=1e-9)):
+            failures.append({'name': case['name'], 'expected': case, 'actual': actual})
+    return failures
+
+
+def _synthetic_report(pages: int) -> str:
+    """Multi-page lab report with headers, narrative lines and assay rows."""
+    page = [
+        "CERTIFICATE OF ANALYSIS - Page {page}",
+        "Laboratory: Example Assay Labs, 1200 Industrial Park Rd, Suite 40",
+        "Sample ID: BM-2026-{page:04d}   Received: 2026-03-14   Reported: 2026-03-21",
+        "Method: ICP-OES after aqua regia digestion, results on dry basis",
+        "Nickel (Ni): 20.5 %",
+        "Cobalt (Co): 6.2 %",
+        "Lithium (Li): 2.5 %",
+        "Copper (Cu): 3,500 ppm",
+        "Aluminium (Al): 1.2 %",
+        "Manganese (Mn): 5.8 %",
+        "Moisture: 1.4 %   LOI: 12.8 %   Fe: 0.35 %",
+        "Notes: values reported as received; uncertainty +/- 2 % relative",
+        ""
+    ]
+    return "\n".join("\n".join(line.format(page=p) for line in page) for p in range(1, pages + 1))
+
+
+def benchmark(pages: int = 500, repeat: int = 3) -> Dict[str, float]:
+    """Time the compiled parser against the legacy implementation on a synthetic report."""
+    text = _synthetic_report(pages)
+    logging.disable(logging.INFO)
+    try:
+        timings = {}
+        compiled = functools.partial(parse_coa_text, use_cache=False)
+        for name, fn in (('legacy', _legacy_parse_coa_text), ('compiled', compiled)):
+            best = float('inf')
+            for _ in range(repeat):
+                start = time.perf_counter()
+                fn(text)
+                best = min(best, time.perf_counter() - start)
+            timings[name] = best
+    finally:
+        logging.disable(logging.NOTSET)
+
+    return {
+        'pages': pages,
+        'lines': text.count('\n') + 1,
+        'legacy_seconds': round(timings['legacy'], 4),
+        'compiled_seconds': round(timings['compiled'], 4),
+        'speedup': round(timings['legacy'] / timings['compiled'], 1)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='COA parser correctness corpus and benchmark')
+    parser.add_argument('--check', action='store_true', help='Run the correctness corpus')
+    parser.add_argument('--benchmark', action='store_true', help='Time the parser on a large synthetic report')
+    parser.add_argument('--pages', type=int, default=500, help='Synthetic report pages for --benchmark')
+    parser.add_argument('--corpus', default=CORPUS_PATH, help='Correctness corpus path')
+    args = parser.parse_args()
+
+    if not (args.check or args.benchmark):
+        parser.print_help()
+        return 0
+
+    status = 0
+    if args.check:
+        failures = check_corpus(args.corpus)
+        if failures:
+            for failure in failures:
+                print(f"FAIL {failure['name']}: expected {failure['expected']}, got {failure['actual']}")
+            status = 1
+        else:
+            print("All corpus cases passed")
+
+    if args.benchmark:
+        result = benchmark(args.pages)
+        print(f"{result['pages']} pages ({result['lines']} lines): "
+              f"legacy {result['legacy_seconds']}s, compiled {result['compiled_seconds']}s, "
+              f"{result['speedup']}x faster")
+
+    return status
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,369 @@
+"""
+Watch-folder intake daemon for COA files.
+Watches a directory (inotify on Linux, polling elsewhere), parses each new or
+changed COA and values it against the current market snapshot. Processed
+files are tracked in a checkpoint (keyed by absolute path, so watchers of
+several directories can share one) and restarts only pick up what changed.
+
+Usage:
+    python coa_watch.py --dir /srv/coa_inbox --params lot_defaults.json
+    python coa_watch.py --dir /srv/coa_inbox --params lot_defaults.json --once
+"""
+
+import argparse
+import ctypes
+import ctypes.util
+import hashlib
+import json
+import logging
+import os
+import select
+import struct
+import sys
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Any, Optional
+
+import backend
+import coa_ingest
+from valuation_engine import build_exposures, value_exposures, valuation_prices
+
+logger = logging.getLogger(__name__)
+
+RESULTS_PATH = os.environ.get(
+    'COA_RESULTS_PATH',
+    os.path.join(os.path.dirname(__file__), 'data', 'coa_results.jsonl')
+)
+CHECKPOINT_PATH = os.environ.get(
+    'COA_WATCH_CHECKPOINT',
+    os.path.join(os.path.dirname(__file__), 'data', 'coa_watch_checkpoint.json')
+)
+
+# Full rescans while inotify is active, as a safety net for missed events
+RESCAN_INTERVAL_SECONDS = 300
+# Wait for writes to settle before processing a file reported by inotify
+SETTLE_SECONDS = 1.0
+
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_TO = 0x00000080
+_IN_Q_OVERFLOW = 0x00004000
+_EVENT_HEADER = struct.Struct('iIII')
+
+
+class InotifyWatch:
+    """Minimal ctypes inotify watch reporting files closed after writing or moved in."""
+
+    def __init__(self, directory: str):
+        libc_name = ctypes.util.find_library('c')
+        if not sys.platform.startswith('linux') or not libc_name:
+            raise OSError("inotify is only available on Linux")
+        libc = ctypes.CDLL(libc_name, use_errno=True)
+        self.fd = libc.inotify_init()
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init failed")
+        wd = libc.inotify_add_watch(self.fd, os.fsencode(directory), _IN_CLOSE_WRITE | _IN_MOVED_TO)
+        if wd < 0:
+            os.close(self.fd)
+            raise OSError(ctypes.get_errno(), f"inotify_add_watch failed for {directory}")
+
+    def read(self, timeout: float) -> Optional[List[str]]:
+        """
+        File names with events within timeout seconds ([] if none).
+        Returns None when the kernel queue overflowed and a rescan is needed.
+        """
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return []
+        buffer = os.read(self.fd, 64 * 1024)
+        names = []
+        offset = 0
+        while offset < len(buffer):
+            _, mask, _, length = _EVENT_HEADER.unpack_from(buffer, offset)
+            offset += _EVENT_HEADER.size
+            if mask & _IN_Q_OVERFLOW:
+                return None
+            name = buffer[offset:offset + length].rstrip(b'\0')
+            offset += length
+            if name:
+                names.append(os.fsdecode(name))
+        return names
+
+    def close(self):
+        os.close(self.fd)
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class CoaWatcher:
+    """
+    Incremental COA intake for one directory.
+
+    A file is processed when its size or modification time differs from the
+    checkpoint and its content hash is new, so touched-but-unchanged files are
+    skipped. Results are appended to a JSONL store before the checkpoint is
+    saved; after a crash in between, the file is processed again and the
+    duplicate record carries the same (path, sha256) key.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        base_params: Dict[str, Any],
+        results_path: Optional[str] = None,
+        checkpoint_path: Optional[str] = None,
+        poll_interval: float = 5.0,
+        use_inotify: bool = True
+    ):
+        for param in ['gross_weight', 'metal_prices', 'payables']:
+            if param not in base_params:
+                raise ValueError(f"Missing required valuation parameter: {param}")
+
+        self.directory = os.path.abspath(directory)
+        self.base_params = base_params
+        self.results_path = results_path or RESULTS_PATH
+        self.checkpoint_path = checkpoint_path or CHECKPOINT_PATH
+        self.poll_interval = poll_interval
+        self.use_inotify = use_inotify
+        self.checkpoint = self._load_checkpoint()
+
+    # ------------------------------------------------------------------
+    # Checkpoint
+    # ------------------------------------------------------------------
+
+    def _read_checkpoint_file(self) -> Dict[str, Dict[str, Any]]:
+        """Every entry in the checkpoint file, keyed by absolute path."""
+        if not os.path.exists(self.checkpoint_path):
+            return {}
+        with open(self.checkpoint_path, 'r') as f:
+            state = json.load(f)
+        return state.get('files', {})
+
+    def _load_checkpoint(self) -> Dict[str, Dict[str, Any]]:
+        """Entries for this watcher's directory, keyed by file name."""
+        return {
+            os.path.basename(path): entry
+            for path, entry in self._read_checkpoint_file().items()
+            if os.path.dirname(path) == self.directory
+        }
+
+    def _save_checkpoint(self):
+        # Keep the entries of other directories sharing the checkpoint file
+        files = {
+            path: entry for path, entry in self._read_checkpoint_file().items()
+            if os.path.dirname(path) != self.directory
+        }
+        files.update({os.path.join(self.directory, name): entry for name, entry in self.checkpoint.items()})
+        os.makedirs(os.path.dirname(self.checkpoint_path) or '.', exist_ok=True)
+        tmp_path = f"{self.checkpoint_path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({'files': files}, f, indent=2)
+        os.replace(tmp_path, self.checkpoint_path)
+
+    # ------------------------------------------------------------------
+    # Scanning and processing
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _is_candidate(name: str) -> bool:
+        if name.startswith('.') or name.endswith(('.tmp', '.part', '.crdownload')):
+            return False
+        try:
+            coa_ingest.detect_format(name)
+            return True
+        except ValueError:
+            return False
+
+    def _changed(self, name: str) -> Optional[os.stat_result]:
+        """Stat result if the file is new or its size/mtime moved since the checkpoint."""
+        path = os.path.join(self.directory, name)
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+        seen = self.checkpoint.get(name)
+        if seen and seen['size'] == stat.st_size and seen['mtime_ns'] == stat.st_mtime_ns:
+            return None
+        return stat
+
+    def scan(self, names: Optional[List[str]] = None) -> List[str]:
+        """Names of new or changed candidate files (all files, or only the given names)."""
+        if names is None:
+            with os.scandir(self.directory) as entries:
+                names = [entry.name for entry in entries if entry.is_file()]
+        return sorted(name for name in set(names) if self._is_candidate(name) and self._changed(name))
+
+    def _value(self, samples: List[Dict[str, Any]], market_data: Dict[str, Any]) -> List[Dict[str, Any]]:
+        lots = [dict(self.base_params, assays=sample['assays']) for sample in samples]
+        values = value_exposures(build_exposures(lots), valuation_prices(self.base_params, market_data))
+        return [
+            {
+                'sample': sample['sample'],
+                'assays': sample['assays'],
+                'total_revenue': round(float(values['total_revenue'][i]), 2),
+                'material_cost': round(float(values['material_cost'][i]), 2),
+                'total_opex': round(float(values['total_opex'][i]), 2),
+                'net_profit': round(float(values['net_profit'][i]), 2),
+                'margin_pct': round(float(values['margin_pct'][i]), 2)
+            }
+            for i, sample in enumerate(samples)
+        ]
+
+    def process(self, names: List[str], market_data: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """
+        Parse and value the given files against one market snapshot.
+
+        Returns:
+            Result records appended to the results store
+        """
+        if not names:
+            return []
+        market_data = market_data or backend.get_market_data(self.base_params.get('currency', 'USD'))
+
+        records = []
+        for name in names:
+            path = os.path.join(self.directory, name)
+            stat = self._changed(name)
+            if stat is None:
+                continue
+            sha256 = file_sha256(path)
+            seen = self.checkpoint.get(name)
+            if seen and seen['sha256'] == sha256:
+                # Touched but unchanged: refresh size/mtime only
+                seen.update({'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns})
+                continue
+
+            record = {
+                'file': name,
+                'path': path,
+                'sha256': sha256,
+                'processed_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                'market_timestamp': market_data.get('timestamp')
+            }
+            try:
+                ingested = coa_ingest.ingest_coa_file(path)
+                samples = ingested['samples'] or [{'sample': name, 'assays': ingested['assays']}]
+                if all(v == 0.0 for v in samples[0]['assays'].values()):
+                    raise ValueError("No assay values could be parsed")
+                record['confidence'] = ingested['confidence']
+                record['valuations'] = self._value(samples, market_data)
+            except Exception as e:
+                logger.error(f"COA intake failed for {name}: {str(e)}")
+                record['error'] = str(e)
+
+            records.append(record)
+            self.checkpoint[name] = {
+                'size': stat.st_size,
+                'mtime_ns': stat.st_mtime_ns,
+                'sha256': sha256,
+                'processed_at': record['processed_at'],
+                'error': record.get('error')
+            }
+
+        if records:
+            os.makedirs(os.path.dirname(self.results_path) or '.', exist_ok=True)
+            with open(self.results_path, 'a') as f:
+                for record in records:
+                    f.write(json.dumps(record) + '\n')
+        self._save_checkpoint()
+
+        if records:
+            logger.info(f"Processed {len(records)} COA file(s) from {self.directory}")
+        return records
+
+    def run_once(self) -> List[Dict[str, Any]]:
+        """Process everything new or changed since the checkpoint."""
+        return self.process(self.scan())
+
+    def run(self, stop_event: Optional[threading.Event] = None):
+        """Catch up on the backlog, then watch until stop_event is set."""
+        stop_event = stop_event or threading.Event()
+        self.run_once()
+
+        watch = None
+        if self.use_inotify:
+            try:
+                watch = InotifyWatch(self.directory)
+                logger.info(f"Watching {self.directory} with inotify")
+            except OSError as e:
+                logger.warning(f"inotify unavailable ({str(e)}), polling every {self.poll_interval}s")
+        else:
+            logger.info(f"Polling {self.directory} every {self.poll_interval}s")
+
+        last_rescan = time.monotonic()
+        try:
+            while not stop_event.is_set():
+                if watch is None:
+                    stop_event.wait(self.poll_interval)
+                    self.run_once()
+                    continue
+
+                names = watch.read(self.poll_interval)
+                if names is None or time.monotonic() - last_rescan > RESCAN_INTERVAL_SECONDS:
+                    self.run_once()
+                    last_rescan = time.monotonic()
+                elif names:
+                    time.sleep(SETTLE_SECONDS)
+                    self.process(self.scan(names))
+        finally:
+            if watch is not None:
+                watch.close()
+
+
+def load_results(path: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Results store records, keeping the latest record per (path, sha256)."""
+    path = path or RESULTS_PATH
+    if not os.path.exists(path):
+        return []
+    latest = {}
+    with open(path, 'r') as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                latest[(record.get('path', record['file']), record['sha256'])] = record
+    return list(latest.values())
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Watch a directory and value incoming COA files')
+    parser.add_argument('--dir', required=True, help='Directory to watch')
+    parser.add_argument('--params', required=True, help='JSON file with calculate parameters (without assays)')
+    parser.add_argument('--results', default=RESULTS_PATH, help='Results store (JSONL)')
+    parser.add_argument('--checkpoint', default=CHECKPOINT_PATH, help='Checkpoint file')
+    parser.add_argument('--poll-interval', type=float, default=5.0, help='Polling interval / inotify wait in seconds')
+    parser.add_argument('--no-inotify', action='store_true', help='Always poll')
+    parser.add_argument('--once', action='store_true', help='Process the backlog and exit')
+    args = parser.parse_args()
+
+    with open(args.params, 'r') as f:
+        base_params = json.load(f)
+
+    watcher = CoaWatcher(
+        args.dir,
+        base_params,
+        results_path=args.results,
+        checkpoint_path=args.checkpoint,
+        poll_interval=args.poll_interval,
+        use_inotify=not args.no_inotify
+    )
+
+    if args.once:
+        records = watcher.run_once()
+        print(f"Processed {len(records)} file(s)")
+        return 0
+
+    try:
+        watcher.run()
+    except KeyboardInterrupt:
+        logger.info("Stopping COA watcher")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,234 @@
+"""
+Shipment consolidation planner.
+Groups pending shipments that share a lane (origin, destination, mode and
+material class) and whose pickup windows overlap, then compares the freight
+for each consolidated load with shipping every lot on its own. Grouping is a
+sort-and-sweep over pickup windows (O(n log n) per lane) and freight is
+priced for whole lanes at once with calculate_transport_costs.
+"""
+
+import logging
+import time
+from datetime import date, timedelta
+from typing import Dict, List, Any, Optional, Tuple
+
+import numpy as np
+
+from logistics_data import calculate_transport_costs, get_route_key
+
+logger = logging.getLogger(__name__)
+
+HAZMAT_MATERIALS = ('whole_batteries', 'black_mass')
+
+# Window length for shipments that give no latest pickup date
+DEFAULT_MAX_WAIT_DAYS = 7
+
+
+def _parse_date(value: Any, field: str, shipment_id: str) -> date:
+    if isinstance(value, date):
+        return value
+    try:
+        return date.fromisoformat(str(value))
+    except ValueError:
+        raise ValueError(f"Shipment {shipment_id}: {field} must be an ISO date (YYYY-MM-DD)")
+
+
+def normalize_shipments(shipments: List[Dict[str, Any]], max_wait_days: int = DEFAULT_MAX_WAIT_DAYS) -> List[Dict[str, Any]]:
+    """
+    Validate pending shipments and resolve their pickup windows.
+
+    Args:
+        shipments: dicts with 'id', 'origin', 'destination', 'mode',
+                   'weight_kg', 'earliest_pickup' and optional 'latest_pickup',
+                   'material_type', 'is_ddr', 'distance_miles' (truck) and
+                   'lane' (e.g. a pickup site, to consolidate only within it)
+        max_wait_days: Window length when 'latest_pickup' is missing
+
+    Returns:
+        Normalized shipment dicts with 'lane_key', 'start' and 'end' dates
+    """
+    normalized = []
+    for i, shipment in enumerate(shipments):
+        shipment_id = str(shipment.get('id') or f"S{i + 1}")
+        mode = shipment.get('mode', 'ocean')
+        material_type = shipment.get('material_type', 'black_mass')
+        is_ddr = bool(shipment.get('is_ddr', False))
+        weight_kg = float(shipment.get('weight_kg', 0))
+
+        if not shipment.get('origin') or not shipment.get('destination'):
+            raise ValueError(f"Shipment {shipment_id}: origin and destination are required")
+        if weight_kg <= 0:
+            raise ValueError(f"Shipment {shipment_id}: weight_kg must be greater than 0")
+        if mode not in ('ocean', 'truck', 'air'):
+            raise ValueError(f"Shipment {shipment_id}: invalid transport mode {mode}")
+        if is_ddr and mode == 'air':
+            raise ValueError(f"Shipment {shipment_id}: DDR (Damaged/Defective/Recalled) batteries prohibited from air transport")
+        if mode == 'truck' and shipment.get('distance_miles') is None:
+            raise ValueError(f"Shipment {shipment_id}: distance_miles is required for truck transport")
+
+        start = _parse_date(shipment.get('earliest_pickup'), 'earliest_pickup', shipment_id)
+        if shipment.get('latest_pickup'):
+            end = _parse_date(shipment['latest_pickup'], 'latest_pickup', shipment_id)
+        else:
+            end = start + timedelta(days=max_wait_days)
+        if end < start:
+            raise ValueError(f"Shipment {shipment_id}: latest_pickup is before earliest_pickup")
+
+        is_hazmat = material_type in HAZMAT_MATERIALS
+        normalized.append({
+            'id': shipment_id,
+            'origin': shipment['origin'],
+            'destination': shipment['destination'],
+            'mode': mode,
+            'weight_kg': weight_kg,
+            'material_type': material_type,
+            'is_hazmat': is_hazmat,
+            'is_ddr': is_ddr,
+            'distance_miles': float(shipment['distance_miles']) if shipment.get('distance_miles') is not None else None,
+            'start': start,
+            'end': end,
+            # DDR loads are never mixed with other material
+            'lane_key': (shipment['origin'], shipment['destination'], mode, is_hazmat, is_ddr, shipment.get('lane'))
+        })
+    return normalized
+
+
+def sweep_windows(
+    members: List[Dict[str, Any]],
+    max_consolidated_kg: Optional[float] = None
+) -> List[Tuple[date, List[Dict[str, Any]]]]:
+    """
+    Group one lane's shipments into pickups.
+
+    Shipments are swept by window end: the earliest open deadline becomes a
+    pickup date and every waiting shipment whose window has opened by then
+    joins it. This uses the fewest pickups that respect every window (the
+    greedy interval-stabbing order). A weight cap splits large pickups.
+
+    Returns:
+        List of (pickup_date, shipments) in pickup order
+    """
+    by_end = sorted(range(len(members)), key=lambda k: (members[k]['end'], members[k]['start']))
+    by_start = sorted(range(len(members)), key=lambda k: members[k]['start'])
+    assigned = [False] * len(members)
+    waiting: List[int] = []
+    j = 0
+    pickups = []
+
+    for k in by_end:
+        if assigned[k]:
+            continue
+        pickup = members[k]['end']
+        while j < len(by_start) and members[by_start[j]]['start'] <= pickup:
+            waiting.append(by_start[j])
+            j += 1
+        # Unassigned waiting shipments all end on or after this pickup
+        group = sorted((i for i in waiting if not assigned[i]), key=lambda i: (members[i]['end'], members[i]['id']))
+        waiting = []
+        for i in group:
+            assigned[i] = True
+
+        load, load_kg = [], 0.0
+        for i in group:
+            weight = members[i]['weight_kg']
+            if max_consolidated_kg and load and load_kg + weight > max_consolidated_kg:
+                pickups.append((pickup, load))
+                load, load_kg = [], 0.0
+            load.append(members[i])
+            load_kg += weight
+        if load:
+            pickups.append((pickup, load))
+
+    return pickups
+
+
+def plan_consolidation(
+    shipments: List[Dict[str, Any]],
+    max_wait_days: int = DEFAULT_MAX_WAIT_DAYS,
+    max_consolidated_kg: Optional[float] = None
+) -> Dict[str, Any]:
+    """
+    Propose a consolidated pickup schedule for pending shipments.
+
+    Args:
+        shipments: Pending shipments (see normalize_shipments)
+        max_wait_days: Window length when a shipment gives no latest pickup
+        max_consolidated_kg: Optional weight cap per consolidated load
+
+    Returns:
+        dict with 'schedule' (one entry per pickup: shipments, pickup date,
+        consolidated and separate freight, savings), totals and 'elapsed_ms'
+    """
+    start_time = time.perf_counter()
+    normalized = normalize_shipments(shipments, max_wait_days)
+
+    lanes: Dict[Tuple, List[Dict[str, Any]]] = {}
+    for shipment in normalized:
+        lanes.setdefault(shipment['lane_key'], []).append(shipment)
+
+    schedule = []
+    for (origin, destination, mode, is_hazmat, is_ddr, lane), members in lanes.items():
+        rate_lane = get_route_key(origin, destination)
+        # Separate freight for every shipment on the lane in one call
+        separate = calculate_transport_costs(
+            mode,
+            np.array([s['weight_kg'] for s in members]) / 1000.0,
+            is_hazmat,
+            np.array([s['distance_miles'] for s in members], dtype=float) if mode == 'truck' else None,
+            lane=rate_lane
+        )['cost']
+        separate_cost = {s['id']: float(c) for s, c in zip(members, separate)}
+
+        pickups = sweep_windows(members, max_consolidated_kg)
+        loads_kg = np.array([sum(s['weight_kg'] for s in load) for _, load in pickups])
+        # A consolidated truck runs to the farthest drop on the lane
+        distances = np.array([max(s['distance_miles'] for s in load) for _, load in pickups]) if mode == 'truck' else None
+        combined = calculate_transport_costs(mode, loads_kg / 1000.0, is_hazmat, distances, lane=rate_lane)
+
+        for p, (pickup, load) in enumerate(pickups):
+            separate_total = sum(separate_cost[s['id']] for s in load)
+            consolidated_total = float(combined['cost'][p])
+            consolidate = len(load) > 1 and consolidated_total < separate_total
+            utilization = combined['utilization_pct'][p]
+            schedule.append({
+                'origin': origin,
+                'destination': destination,
+                'mode': mode,
+                'lane': lane,
+                'is_hazmat': is_hazmat,
+                'is_ddr': is_ddr,
+                'pickup_date': pickup.isoformat(),
+                'shipment_ids': [s['id'] for s in load],
+                'shipment_count': len(load),
+                'weight_kg': round(float(loads_kg[p]), 2),
+                'consolidate': consolidate,
+                'vehicle_type': str(combined['vehicle_type'][p]) if consolidate else None,
+                'num_vehicles': int(combined['num_vehicles'][p]) if consolidate else None,
+                'utilization_pct': round(float(utilization), 1) if consolidate and not np.isnan(utilization) else None,
+                'separate_cost': round(separate_total, 2),
+                'consolidated_cost': round(consolidated_total if consolidate else separate_total, 2),
+                'savings': round(separate_total - consolidated_total, 2) if consolidate else 0.0
+            })
+
+    schedule.sort(key=lambda entry: (entry['pickup_date'], entry['origin'], entry['destination'], entry['mode']))
+    for n, entry in enumerate(schedule, start=1):
+        entry['consolidation_id'] = f"CONS-{n:04d}"
+
+    separate_total = sum(entry['separate_cost'] for entry in schedule)
+    planned_total = sum(entry['consolidated_cost'] for entry in schedule)
+    elapsed_ms = round((time.perf_counter() - start_time) * 1000, 3)
+    logger.info(f"Planned {len(normalized)} shipments into {len(schedule)} pickups across {len(lanes)} lanes in {elapsed_ms} ms")
+
+    return {
+        'schedule': schedule,
+        'total_shipments': len(normalized),
+        'total_pickups': len(schedule),
+        'consolidated_pickups': sum(1 for entry in schedule if entry['consolidate']),
+        'lanes': len(lanes),
+        'separate_cost': round(separate_total, 2),
+        'planned_cost': round(planned_total, 2),
+        'savings': round(separate_total - planned_total, 2),
+        'savings_pct': round((separate_total - planned_total) / separate_total * 100, 1) if separate_total else 0.0,
+        'currency': 'USD',
+        'elapsed_ms': elapsed_ms
+    }
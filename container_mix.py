@@ -0,0 +1,240 @@
+"""
+Cost-optimal container and vehicle mix.
+calculate_transport_cost sizes a shipment as one vehicle type (N x 20ft above
+24 t, N trucks of one size). This solver treats the freight rate table's
+vehicles (freight_rates.vehicle_types) as an unbounded covering knapsack over
+capacity in RESOLUTION_KG units, so 40ft and 20ft boxes can be mixed and a
+truck load can finish with an LTL remainder.
+Solutions are precomputed into lookup tables, so weights inside a table are
+answered in O(1); tables are rebuilt when the rate file is reloaded.
+"""
+
+import logging
+import math
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Optional
+
+import numpy as np
+
+from freight_rates import get_rates, rates_version, vehicle_modes, vehicle_types
+from logistics_data import calculate_transport_cost
+
+logger = logging.getLogger(__name__)
+
+# Capacity grid; every vehicle capacity in the rate table is a multiple of it
+RESOLUTION_KG = 100
+# Weight range covered by a lookup table
+DEFAULT_TABLE_MAX_KG = 500000
+# Tables kept in memory (truck tables depend on distance)
+MAX_TABLES = 64
+
+
+def _vehicle_price(vehicle: Dict[str, Any], is_hazmat: bool, distance_miles: Optional[float], multiplier: float = 1.0) -> float:
+    # The lane multiplier scales the base rate, not the hazmat surcharge (as in calculate_transport_cost)
+    surcharge = vehicle['hazmat_surcharge'] if is_hazmat else 0
+    if 'base_cost' in vehicle:
+        return float(vehicle['base_cost'] * multiplier + surcharge)
+    return distance_miles * vehicle['rate_per_mile'] * multiplier + surcharge
+
+
+def _ltl_cost(weight_kg: float, is_hazmat: bool, distance_miles: float, lane: Optional[str] = None) -> float:
+    """LTL price for a truck remainder, from calculate_transport_cost."""
+    return calculate_transport_cost('truck', weight_kg / 1000.0, is_hazmat, distance_miles, lane=lane)['cost']
+
+
+class ContainerMixTable:
+    """
+    Minimum-cost vehicle mix for every weight up to max_weight_kg.
+
+    cost[u] is the cheapest way to carry u * RESOLUTION_KG kg and counts[u]
+    the number of each vehicle type used (plus the LTL remainder in kg for
+    trucks), so a lookup is two array reads. Heavier weights peel off whole
+    vehicles of the most cost-efficient type until the rest fits the table.
+    """
+
+    def __init__(
+        self,
+        mode: str,
+        is_hazmat: bool = True,
+        distance_miles: Optional[float] = None,
+        max_weight_kg: float = DEFAULT_TABLE_MAX_KG,
+        lane: Optional[str] = None
+    ):
+        modes = vehicle_modes()
+        if mode not in modes:
+            raise ValueError(f"Container mix supports modes: {', '.join(modes)}")
+        if mode == 'truck' and distance_miles is None:
+            raise ValueError("Distance required for truck transport")
+
+        self.mode = mode
+        self.is_hazmat = is_hazmat
+        self.distance_miles = distance_miles
+        self.lane = lane
+        self.vehicles = vehicle_types(mode, lane)
+        rates = get_rates(mode, lane)
+        # Truck loads under this weight can go LTL, as in calculate_transport_cost
+        self.ltl_max_kg = rates.get('ltl_below_kg') or 0
+        self.capacities = [
+            (v['hazmat_capacity_kg'] if is_hazmat else v['capacity_kg']) // RESOLUTION_KG for v in self.vehicles
+        ]
+        self.prices = [_vehicle_price(v, is_hazmat, distance_miles, rates['cost_multiplier']) for v in self.vehicles]
+
+        # Most cost-efficient type; beyond the table only its count grows
+        self.best = min(range(len(self.vehicles)), key=lambda t: (self.prices[t] / self.capacities[t], -self.capacities[t]))
+        # An optimal mix uses fewer than capacities[best] / gcd(capacities)
+        # vehicles of other types (pigeonhole on their capacity sums), so above
+        # this many units it always contains at least one vehicle of the best type
+        period = self.capacities[self.best]
+        others = period // math.gcd(*self.capacities) - 1
+        ltl_units = math.ceil(self.ltl_max_kg / RESOLUTION_KG)
+        self.threshold = others * max(self.capacities) + period + ltl_units
+        self.units = max(math.ceil(max_weight_kg / RESOLUTION_KG), self.threshold)
+        self._build()
+
+    def _build(self):
+        n_types = len(self.vehicles)
+        units = self.units
+        cost = np.full(units + 1, np.inf)
+        capacity = np.zeros(units + 1, dtype=np.int64)
+        counts = np.zeros((units + 1, n_types), dtype=np.int32)
+        ltl = np.zeros(units + 1, dtype=np.int64)
+        cost[0] = 0.0
+
+        for u in range(1, units + 1):
+            best_key = (np.inf, 0)
+            best_from = None
+            if u * RESOLUTION_KG < self.ltl_max_kg:
+                best_key = (_ltl_cost(u * RESOLUTION_KG, self.is_hazmat, self.distance_miles, self.lane), u)
+            for t in range(n_types):
+                prev = max(0, u - self.capacities[t])
+                key = (cost[prev] + self.prices[t], capacity[prev] + self.capacities[t])
+                # Cheapest first, then least spare capacity (highest utilization)
+                if key[0] < best_key[0] - 1e-9 or (abs(key[0] - best_key[0]) <= 1e-9 and key[1] < best_key[1]):
+                    best_key, best_from = key, (prev, t)
+            cost[u], capacity[u] = best_key
+            if best_from is None:
+                ltl[u] = u * RESOLUTION_KG
+            else:
+                prev, t = best_from
+                counts[u] = counts[prev]
+                counts[u, t] += 1
+                ltl[u] = ltl[prev]
+
+        self.cost, self.capacity, self.counts, self.ltl = cost, capacity, counts, ltl
+
+    def lookup(self, weight_kg: float) -> Dict[str, Any]:
+        """
+        Cheapest vehicle mix for a shipment weight.
+
+        Returns:
+            dict with 'vehicles' (type, count, capacity_kg, cost_each), 'cost',
+            'num_vehicles', 'total_capacity_kg', 'utilization_pct',
+            'cost_per_kg' and 'ltl_weight_kg' (truck remainder sent LTL)
+        """
+        if weight_kg <= 0:
+            raise ValueError("weight_kg must be greater than 0")
+        u = math.ceil(weight_kg / RESOLUTION_KG - 1e-9)
+        extra = 0
+        if u > self.units:
+            # Peel whole best-type vehicles until the rest lies in the table
+            period = self.capacities[self.best]
+            extra = math.ceil((u - self.units) / period)
+            u -= extra * period
+
+        counts = self.counts[u].copy()
+        counts[self.best] += extra
+        ltl_kg = float(self.ltl[u])
+        cost = float(self.cost[u]) + extra * self.prices[self.best]
+        if ltl_kg:
+            # Table LTL prices are for the grid weight; price the actual remainder
+            ftl_capacity_kg = sum(int(c) * cap for c, cap in zip(counts, self.capacities)) * RESOLUTION_KG
+            actual_ltl_kg = weight_kg - ftl_capacity_kg
+            cost += (_ltl_cost(actual_ltl_kg, self.is_hazmat, self.distance_miles, self.lane)
+                     - _ltl_cost(ltl_kg, self.is_hazmat, self.distance_miles, self.lane))
+            ltl_kg = actual_ltl_kg
+
+        vehicles = [
+            {
+                'vehicle_type': vehicle['name'],
+                'count': int(count),
+                'capacity_kg': self.capacities[t] * RESOLUTION_KG,
+                'cost_each': round(self.prices[t], 2)
+            }
+            for t, (vehicle, count) in enumerate(zip(self.vehicles, counts))
+            if count
+        ]
+        total_capacity_kg = sum(v['count'] * v['capacity_kg'] for v in vehicles)
+        ftl_weight_kg = weight_kg - ltl_kg
+
+        return {
+            'mode': self.mode,
+            'weight_kg': weight_kg,
+            'vehicles': vehicles,
+            'num_vehicles': sum(v['count'] for v in vehicles) + (1 if ltl_kg else 0),
+            'total_capacity_kg': total_capacity_kg,
+            'utilization_pct': round(ftl_weight_kg / total_capacity_kg * 100, 1) if total_capacity_kg else None,
+            'ltl_weight_kg': round(ltl_kg, 2),
+            'cost': round(cost, 2),
+            'cost_per_kg': round(cost / weight_kg, 2)
+        }
+
+
+_tables: 'OrderedDict[tuple, ContainerMixTable]' = OrderedDict()
+_tables_lock = threading.Lock()
+
+
+def get_table(
+    mode: str,
+    is_hazmat: bool = True,
+    distance_miles: Optional[float] = None,
+    lane: Optional[str] = None
+) -> ContainerMixTable:
+    """Cached lookup table for a mode, rate lane, hazmat class, (truck) distance and rate version."""
+    # Lanes without their own rates share the default lane's table
+    rate_lane = get_rates(mode, lane)['lane']
+    key = (mode, rate_lane, is_hazmat, None if mode != 'truck' or distance_miles is None else round(float(distance_miles), 1), rates_version())
+    with _tables_lock:
+        table = _tables.get(key)
+        if table is not None:
+            _tables.move_to_end(key)
+            return table
+    table = ContainerMixTable(mode, is_hazmat, key[3], lane=rate_lane)
+    with _tables_lock:
+        _tables[key] = table
+        while len(_tables) > MAX_TABLES:
+            _tables.popitem(last=False)
+    logger.info(f"Built container mix table for {key} ({table.units} units)")
+    return table
+
+
+def optimize_container_mix(
+    mode: str,
+    weight_kg: float,
+    is_hazmat: bool = True,
+    distance_miles: Optional[float] = None,
+    lane: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Minimum-cost vehicle mix, compared with calculate_transport_cost's sizing.
+
+    Args:
+        mode: 'ocean' or 'truck'
+        weight_kg: Shipment weight in kilograms
+        is_hazmat: Whether material is hazardous
+        distance_miles: Required for truck transport
+        lane: 'Origin->Destination' rate lane (default rates when omitted)
+
+    Returns:
+        ContainerMixTable.lookup result plus 'baseline_cost',
+        'baseline_vehicle_type', 'baseline_num_vehicles' and 'savings'
+    """
+    result = get_table(mode, is_hazmat, distance_miles, lane).lookup(weight_kg)
+    baseline = calculate_transport_cost(mode, weight_kg / 1000.0, is_hazmat, distance_miles, lane=lane)
+    result.update({
+        'baseline_cost': baseline['cost'],
+        'baseline_vehicle_type': baseline.get('vehicle_type'),
+        'baseline_num_vehicles': baseline.get('num_vehicles'),
+        'savings': round(baseline['cost'] - result['cost'], 2)
+    })
+    return result
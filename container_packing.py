@@ -0,0 +1,329 @@
+"""
+Container and truck packing for multi-lot shipments.
+Assigns individual packages (drums, IBCs, bulk bags) to 20ft/40ft containers
+or trucks within the hazmat weight limits and floor space listed in the
+freight rate tables (freight_rates.vehicle_types).
+Packages from incompatible segregation groups (e.g. DDR material and clean
+black mass) never share a container. First-fit-decreasing is the default;
+exact mode searches for the minimum number of containers on small groups.
+"""
+
+import logging
+import math
+import time
+from typing import Dict, List, Any, Optional, Tuple
+
+from freight_rates import vehicle_modes, vehicle_types
+
+logger = logging.getLogger(__name__)
+
+HAZMAT_MATERIALS = ('whole_batteries', 'black_mass')
+
+# Floor space per package in pallet positions
+PACKAGE_TYPES = {
+    'drum': 0.25,
+    'ibc': 1.0,
+    'bulk_bag': 1.0,
+    'pallet': 1.0
+}
+
+# Floor space is counted in quarter pallet positions so it packs in integers
+_SLOTS_PER_POSITION = 4
+
+# Exact search limits per segregation group; larger groups fall back to FFD
+EXACT_MAX_PACKAGES = 40
+EXACT_NODE_LIMIT = 200000
+
+
+def segregation_group(package: Dict[str, Any]) -> str:
+    """Group key: explicit 'group', else material type with DDR kept apart."""
+    if package.get('group'):
+        return str(package['group'])
+    group = package.get('material_type', 'black_mass')
+    return f"{group}-ddr" if package.get('is_ddr') else group
+
+
+def expand_packages(packages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Validate package lines and expand 'count' into individual packages.
+
+    Args:
+        packages: dicts with 'id', 'weight_kg', optional 'package_type'
+                  (drum, ibc, bulk_bag, pallet), 'count', 'lot',
+                  'material_type', 'is_ddr' and 'group'
+
+    Returns:
+        One dict per physical package with 'id', 'lot', 'weight_kg', 'slots',
+        'group' and 'is_hazmat'
+    """
+    expanded = []
+    for i, package in enumerate(packages):
+        package_id = str(package.get('id') or f"P{i + 1}")
+        package_type = package.get('package_type', 'drum')
+        if package_type not in PACKAGE_TYPES:
+            raise ValueError(f"Unknown package type for {package_id}: {package_type} (expected one of {', '.join(PACKAGE_TYPES)})")
+        weight_kg = float(package.get('weight_kg', 0))
+        count = int(package.get('count', 1))
+        if weight_kg <= 0 or count < 1:
+            raise ValueError(f"Package {package_id} needs a positive weight_kg and count")
+
+        base = {
+            'lot': package.get('lot', package_id),
+            'package_type': package_type,
+            'weight_kg': weight_kg,
+            'slots': round(PACKAGE_TYPES[package_type] * _SLOTS_PER_POSITION),
+            'group': segregation_group(package),
+            'is_hazmat': package.get('material_type', 'black_mass') in HAZMAT_MATERIALS
+        }
+        for k in range(count):
+            expanded.append(dict(base, id=package_id if count == 1 else f"{package_id}-{k + 1}"))
+    return expanded
+
+
+def _limits(vehicle: Dict[str, Any], is_hazmat: bool) -> Tuple[float, int]:
+    capacity = vehicle['hazmat_capacity_kg'] if is_hazmat else vehicle['capacity_kg']
+    return capacity, vehicle['pallet_positions'] * _SLOTS_PER_POSITION
+
+
+def _first_fit_decreasing(items: List[Dict[str, Any]], capacity: float, slots: int) -> List[List[int]]:
+    """Bins as lists of item indexes; items sorted by weight, then floor space."""
+    order = sorted(range(len(items)), key=lambda i: (items[i]['weight_kg'], items[i]['slots']), reverse=True)
+    bins, free_kg, free_slots = [], [], []
+    for i in order:
+        weight, space = items[i]['weight_kg'], items[i]['slots']
+        for b in range(len(bins)):
+            if free_kg[b] >= weight - 1e-9 and free_slots[b] >= space:
+                bins[b].append(i)
+                free_kg[b] -= weight
+                free_slots[b] -= space
+                break
+        else:
+            bins.append([i])
+            free_kg.append(capacity - weight)
+            free_slots.append(slots - space)
+    return bins
+
+
+def _exact(items: List[Dict[str, Any]], capacity: float, slots: int, incumbent: List[List[int]]) -> Tuple[List[List[int]], bool]:
+    """
+    Branch and bound for the minimum number of bins, starting from the FFD
+    solution. Returns (bins, proven_optimal); the node limit keeps worst cases bounded.
+    """
+    order = sorted(range(len(items)), key=lambda i: (items[i]['weight_kg'], items[i]['slots']), reverse=True)
+    weights = [items[i]['weight_kg'] for i in order]
+    spaces = [items[i]['slots'] for i in order]
+    suffix_kg = [0.0] * (len(order) + 1)
+    suffix_slots = [0] * (len(order) + 1)
+    for k in range(len(order) - 1, -1, -1):
+        suffix_kg[k] = suffix_kg[k + 1] + weights[k]
+        suffix_slots[k] = suffix_slots[k + 1] + spaces[k]
+
+    best = {'count': len(incumbent), 'assignment': None}
+    assignment = [0] * len(order)
+    free_kg: List[float] = []
+    free_slots: List[int] = []
+    nodes = 0
+
+    def lower_bound(k):
+        # Spare room in open bins can absorb some of the rest; anything beyond needs new bins
+        spill_kg = max(0.0, suffix_kg[k] - sum(free_kg))
+        spill_slots = max(0, suffix_slots[k] - sum(free_slots))
+        return len(free_kg) + max(math.ceil(spill_kg / capacity - 1e-9), math.ceil(spill_slots / slots))
+
+    def search(k):
+        nonlocal nodes
+        nodes += 1
+        if nodes > EXACT_NODE_LIMIT:
+            return
+        if k == len(order):
+            if len(free_kg) < best['count']:
+                best['count'] = len(free_kg)
+                best['assignment'] = list(assignment)
+            return
+        if lower_bound(k) >= best['count']:
+            return
+
+        tried = set()
+        for b in range(len(free_kg)):
+            state = (round(free_kg[b], 6), free_slots[b])
+            if state in tried or free_kg[b] < weights[k] - 1e-9 or free_slots[b] < spaces[k]:
+                continue
+            tried.add(state)
+            free_kg[b] -= weights[k]
+            free_slots[b] -= spaces[k]
+            assignment[k] = b
+            search(k + 1)
+            free_kg[b] += weights[k]
+            free_slots[b] += spaces[k]
+
+        if len(free_kg) + 1 < best['count']:
+            free_kg.append(capacity - weights[k])
+            free_slots.append(slots - spaces[k])
+            assignment[k] = len(free_kg) - 1
+            search(k + 1)
+            free_kg.pop()
+            free_slots.pop()
+
+    search(0)
+    if best['assignment'] is None:
+        return incumbent, nodes <= EXACT_NODE_LIMIT
+
+    bins = [[] for _ in range(best['count'])]
+    for k, b in enumerate(best['assignment']):
+        bins[b].append(order[k])
+    return bins, nodes <= EXACT_NODE_LIMIT
+
+
+def _container_cost(vehicle: Dict[str, Any], is_hazmat: bool, distance_miles: Optional[float]) -> Optional[float]:
+    surcharge = vehicle['hazmat_surcharge'] if is_hazmat else 0
+    if 'base_cost' in vehicle:
+        return float(vehicle['base_cost'] + surcharge)
+    if distance_miles is None:
+        return None
+    return round(distance_miles * vehicle['rate_per_mile'] + surcharge, 2)
+
+
+def _right_size(
+    load_kg: float,
+    load_slots: int,
+    vehicles: List[Dict[str, Any]],
+    is_hazmat: bool,
+    distance_miles: Optional[float]
+) -> Dict[str, Any]:
+    """Cheapest vehicle type that holds the load (smallest capacity when unpriced)."""
+    fitting = []
+    for vehicle in vehicles:
+        capacity, slots = _limits(vehicle, is_hazmat)
+        if capacity >= load_kg - 1e-9 and slots >= load_slots:
+            cost = _container_cost(vehicle, is_hazmat, distance_miles)
+            fitting.append(((cost if cost is not None else 0.0, capacity), vehicle))
+    return min(fitting, key=lambda pair: pair[0])[1]
+
+
+def _pack_group(
+    members: List[Dict[str, Any]],
+    bin_vehicle: Dict[str, Any],
+    vehicles: List[Dict[str, Any]],
+    is_hazmat: bool,
+    exact: bool,
+    distance_miles: Optional[float]
+) -> Dict[str, Any]:
+    """Pack one group into bins of bin_vehicle's size and right-size each load."""
+    capacity, slots = _limits(bin_vehicle, is_hazmat)
+    bins = _first_fit_decreasing(members, capacity, slots)
+    method, optimal = 'ffd', None
+    if exact and len(members) <= EXACT_MAX_PACKAGES:
+        bins, optimal = _exact(members, capacity, slots, bins)
+        method = 'exact'
+
+    loads = []
+    for contents in bins:
+        load = [members[i] for i in contents]
+        load_kg = sum(item['weight_kg'] for item in load)
+        load_slots = sum(item['slots'] for item in load)
+        loads.append((load, _right_size(load_kg, load_slots, vehicles, is_hazmat, distance_miles)))
+
+    costs = [_container_cost(vehicle, is_hazmat, distance_miles) for _, vehicle in loads]
+    total_capacity = sum(_limits(vehicle, is_hazmat)[0] for _, vehicle in loads)
+    # Cheapest plan first (unpriced trucks: fewest vehicles), then least spare capacity
+    rank = (sum(c or 0.0 for c in costs) if None not in costs else len(loads), total_capacity)
+    return {'loads': loads, 'method': method, 'optimal': optimal, 'rank': rank}
+
+
+def pack_shipment(
+    packages: List[Dict[str, Any]],
+    mode: str = 'ocean',
+    exact: bool = False,
+    distance_miles: Optional[float] = None
+) -> Dict[str, Any]:
+    """
+    Pack packages into containers (ocean) or trucks.
+
+    Each segregation group is packed once per vehicle type as the bin size,
+    with every load then moved to the cheapest type that still holds it; the
+    cheapest plan (ties: least spare capacity, i.e. highest utilization) wins.
+
+    Args:
+        packages: Package lines (see expand_packages)
+        mode: 'ocean' or 'truck'
+        exact: Search for the minimum container count per group (groups of up
+               to EXACT_MAX_PACKAGES packages; larger groups use FFD)
+        distance_miles: Truck distance, needed to price trucks
+
+    Returns:
+        dict with 'containers' (manifest per container), per-group summary,
+        totals and overall 'utilization_pct'
+    """
+    modes = vehicle_modes()
+    if mode not in modes:
+        raise ValueError(f"Packing supports modes: {', '.join(modes)}")
+    start = time.perf_counter()
+    vehicles = vehicle_types(mode)
+    items = expand_packages(packages)
+
+    groups: Dict[str, List[Dict[str, Any]]] = {}
+    for item in items:
+        groups.setdefault(item['group'], []).append(item)
+
+    containers = []
+    group_summary = []
+    for group, members in groups.items():
+        is_hazmat = any(item['is_hazmat'] for item in members)
+        best = None
+        for vehicle in vehicles:
+            capacity, slots = _limits(vehicle, is_hazmat)
+            if any(item['weight_kg'] > capacity + 1e-9 or item['slots'] > slots for item in members):
+                continue
+            plan = _pack_group(members, vehicle, vehicles, is_hazmat, exact, distance_miles)
+            if best is None or plan['rank'] < best['rank']:
+                best = plan
+        if best is None:
+            heaviest = max(members, key=lambda item: (item['weight_kg'], item['slots']))
+            raise ValueError(f"Package {heaviest['id']} does not fit in any {mode} vehicle type")
+
+        for load, vehicle in best['loads']:
+            load_kg = sum(item['weight_kg'] for item in load)
+            vehicle_capacity, _ = _limits(vehicle, is_hazmat)
+            containers.append({
+                'container_id': f"C{len(containers) + 1}",
+                'vehicle_type': vehicle['name'],
+                'group': group,
+                'is_hazmat': is_hazmat,
+                'packages': [item['id'] for item in load],
+                'lots': sorted({str(item['lot']) for item in load}),
+                'package_count': len(load),
+                'weight_kg': round(load_kg, 2),
+                'capacity_kg': vehicle_capacity,
+                'pallet_positions_used': sum(item['slots'] for item in load) / _SLOTS_PER_POSITION,
+                'pallet_positions': vehicle['pallet_positions'],
+                'utilization_pct': round(load_kg / vehicle_capacity * 100, 1),
+                'cost': _container_cost(vehicle, is_hazmat, distance_miles)
+            })
+
+        group_summary.append({
+            'group': group,
+            'packages': len(members),
+            'containers': len(best['loads']),
+            'weight_kg': round(sum(item['weight_kg'] for item in members), 2),
+            'method': best['method'],
+            'optimal': best['optimal']
+        })
+
+    total_kg = sum(c['weight_kg'] for c in containers)
+    total_capacity = sum(c['capacity_kg'] for c in containers)
+    costs = [c['cost'] for c in containers]
+    elapsed_ms = round((time.perf_counter() - start) * 1000, 3)
+    logger.info(f"Packed {len(items)} packages into {len(containers)} {mode} units in {elapsed_ms} ms")
+
+    return {
+        'mode': mode,
+        'containers': containers,
+        'groups': group_summary,
+        'total_packages': len(items),
+        'total_containers': len(containers),
+        'total_weight_kg': round(total_kg, 2),
+        'utilization_pct': round(total_kg / total_capacity * 100, 1) if total_capacity else 0.0,
+        'total_cost': None if any(c is None for c in costs) else round(sum(costs), 2),
+        'currency': 'USD',
+        'elapsed_ms': elapsed_ms
+    }
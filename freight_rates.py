@@ -0,0 +1,284 @@
+"""
+Freight rate tables.
+Every cost estimator (calculate_transport_cost, the vectorized curves, route
+network legs, container packing and mix, FreightRateAPI) reads its prices
+from data/freight_rates.json through this module. Rates are compiled into an
+index keyed by (mode, lane) with sorted weight-tier bounds, so finding the
+tier for a weight is a binary search, and the file is reloaded when its
+modification time changes, without a restart.
+"""
+
+import json
+import logging
+import math
+import os
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from typing import Dict, List, Any, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+RATES_PATH = os.environ.get(
+    'FREIGHT_RATES_PATH',
+    os.path.join(os.path.dirname(__file__), 'data', 'freight_rates.json')
+)
+
+# Lane used when a shipment's 'Origin->Destination' lane has no entry
+DEFAULT_LANE = '*'
+
+# Seconds between checks of the rate file's mtime (lookups in between skip the stat)
+RELOAD_CHECK_SECONDS = 1.0
+
+
+def _merge_lane(mode_rates: Dict[str, Any], overrides: Dict[str, Any]) -> Dict[str, Any]:
+    """Mode rates with a lane's overrides (vehicles and LTL merged field by field)."""
+    merged = {k: v for k, v in mode_rates.items() if k != 'lanes'}
+    for key, value in overrides.items():
+        if key == 'vehicles':
+            merged['vehicles'] = {
+                vehicle_id: dict(vehicle, **value.get(vehicle_id, {}))
+                for vehicle_id, vehicle in mode_rates.get('vehicles', {}).items()
+            }
+        elif key == 'ltl':
+            merged['ltl'] = dict(mode_rates.get('ltl', {}), **value)
+        else:
+            merged[key] = value
+    return merged
+
+
+def _compile_lane(mode: str, lane: str, rates: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Resolve a lane's tiers against its vehicles and precompute lookup arrays.
+
+    Tier bounds are stored as inclusive upper limits ('below_kg' becomes the
+    next float down), so both the scalar and the array lookup are a
+    left-sided binary search.
+    """
+    vehicles = rates.get('vehicles', {})
+    tiers, bounds = [], []
+    raw_tiers = rates.get('tiers') or [{}]
+    for n, raw in enumerate(raw_tiers):
+        vehicle_id = raw.get('vehicle')
+        if vehicle_id == 'ltl':
+            if 'ltl' not in rates:
+                raise ValueError(f"{mode} lane {lane}: LTL tier without 'ltl' rates")
+            kind, vehicle, label = 'ltl', None, raw.get('label') or rates['ltl']['name']
+        elif vehicle_id is not None:
+            if vehicle_id not in vehicles:
+                raise ValueError(f"{mode} lane {lane}: tier uses unknown vehicle {vehicle_id}")
+            kind, vehicle = 'vehicle', dict(vehicles[vehicle_id], id=vehicle_id)
+            label = raw.get('label') or vehicle['name']
+        else:
+            kind, vehicle, label = 'flat', None, raw.get('label') or rates.get('name', mode)
+
+        if 'max_kg' in raw:
+            bound = float(raw['max_kg'])
+        elif 'below_kg' in raw:
+            bound = float(np.nextafter(float(raw['below_kg']), -np.inf))
+        elif n == len(raw_tiers) - 1:
+            bound = math.inf
+        else:
+            raise ValueError(f"{mode} lane {lane}: only the last tier may be unbounded")
+        if bounds and bound <= bounds[-1]:
+            raise ValueError(f"{mode} lane {lane}: tier bounds must be ascending")
+        tiers.append({'kind': kind, 'vehicle': vehicle, 'label': label, 'max_kg': raw.get('max_kg'), 'below_kg': raw.get('below_kg')})
+        bounds.append(bound)
+
+    if bounds[-1] != math.inf:
+        raise ValueError(f"{mode} lane {lane}: the last tier must be unbounded")
+
+    compiled = dict(rates, mode=mode, lane=lane, tiers=tiers, bounds=bounds)
+    compiled['cost_multiplier'] = float(rates.get('cost_multiplier', 1.0))
+    compiled['labels'] = tuple(tier['label'] for tier in tiers)
+    compiled['ltl_below_kg'] = next((tier['below_kg'] for tier in tiers if tier['kind'] == 'ltl'), None)
+
+    if 'ltl' in rates:
+        steps = rates['ltl']['distance_multipliers']
+        compiled['ltl_distance_bounds'] = [float(step['below_miles']) for step in steps[:-1]]
+        compiled['ltl_distance_multipliers'] = [float(step['multiplier']) for step in steps]
+    return compiled
+
+
+def find_tier(rates: Dict[str, Any], weight_kg: float) -> int:
+    """Index of the weight tier a shipment falls in (binary search)."""
+    return bisect_left(rates['bounds'], weight_kg)
+
+
+def find_tiers(rates: Dict[str, Any], weights_kg: np.ndarray) -> np.ndarray:
+    """find_tier over an array of weights."""
+    return np.searchsorted(np.asarray(rates['bounds']), weights_kg, side='left')
+
+
+def ltl_distance_band(rates: Dict[str, Any], distance_miles: float) -> int:
+    """Index of the LTL distance band a truck distance falls in."""
+    return bisect_right(rates['ltl_distance_bounds'], distance_miles)
+
+
+def ltl_distance_multiplier(rates: Dict[str, Any], distance_miles: float) -> float:
+    """LTL distance band multiplier for a truck distance."""
+    return rates['ltl_distance_multipliers'][ltl_distance_band(rates, distance_miles)]
+
+
+def ltl_distance_multipliers(rates: Dict[str, Any], distances_miles: np.ndarray) -> np.ndarray:
+    """ltl_distance_multiplier over an array of distances."""
+    bands = np.searchsorted(np.asarray(rates['ltl_distance_bounds']), distances_miles, side='right')
+    return np.asarray(rates['ltl_distance_multipliers'])[bands]
+
+
+class FreightRateTable:
+    """
+    Compiled freight rates with hot reload.
+
+    The index maps (mode, lane) to a fully merged rate record; lanes without
+    an entry use the mode's default ('*'). The file's mtime is checked at
+    most every check_seconds. A reload builds a new index and
+    swaps it in whole, so a record fetched by rates() is never half-updated.
+    A file that fails to load is logged and the previous rates stay in use.
+    """
+
+    def __init__(self, path: Optional[str] = None, check_seconds: float = RELOAD_CHECK_SECONDS):
+        self.path = path or RATES_PATH
+        self.check_seconds = check_seconds
+        self._lock = threading.Lock()
+        self._mtime = None
+        self._next_check = 0.0
+        self._index: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self.modes: Tuple[str, ...] = ()
+        self.version = 0
+        self._load()
+
+    def _load(self):
+        self._mtime = os.path.getmtime(self.path)
+        with open(self.path, 'r') as f:
+            config = json.load(f)
+
+        index = {}
+        for mode, mode_rates in config.get('modes', {}).items():
+            index[(mode, DEFAULT_LANE)] = _compile_lane(mode, DEFAULT_LANE, mode_rates)
+            for lane, overrides in mode_rates.get('lanes', {}).items():
+                index[(mode, lane)] = _compile_lane(mode, lane, _merge_lane(mode_rates, overrides))
+
+        version = self.version + 1
+        for record in index.values():
+            record['version'] = version
+        self._index = index
+        self.modes = tuple(config.get('modes', {}))
+        self.version = version
+        logger.info(f"Loaded freight rates v{self.version}: {len(index)} mode/lane entries from {self.path}")
+
+    def _refresh_if_changed(self):
+        now = time.monotonic()
+        if now < self._next_check:
+            return
+        self._next_check = now + self.check_seconds
+        try:
+            changed = os.path.getmtime(self.path) != self._mtime
+        except OSError:
+            return
+        if changed:
+            try:
+                self._load()
+            except (ValueError, KeyError, TypeError) as e:
+                logger.error(f"Keeping previous freight rates; {self.path} failed to load: {e}")
+
+    def rates(self, mode: str, lane: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Rate record for a mode and lane.
+
+        Args:
+            mode: 'ocean', 'truck', 'air' or 'rail'
+            lane: 'Origin->Destination' (e.g. 'US->China'); None for the default
+
+        Returns:
+            Merged rates with 'tiers', 'bounds', 'labels', 'cost_multiplier'
+            and the table 'version' they were loaded in (treat as read-only)
+        """
+        with self._lock:
+            self._refresh_if_changed()
+            record = self._index.get((mode, lane or DEFAULT_LANE)) or self._index.get((mode, DEFAULT_LANE))
+        if record is None:
+            raise ValueError(f"Invalid transport mode: {mode}")
+        return record
+
+    def current_version(self) -> int:
+        """Counter bumped on every successful reload (for cache keys)."""
+        with self._lock:
+            self._refresh_if_changed()
+            return self.version
+
+    def describe(self) -> Dict[str, Any]:
+        """Modes, tiers and lanes of the loaded tables (for the API)."""
+        with self._lock:
+            self._refresh_if_changed()
+            index, version = self._index, self.version
+        modes = {}
+        for (mode, lane), record in index.items():
+            entry = modes.setdefault(mode, {'lanes': {}})
+            tiers = [
+                {'vehicle_type': tier['label'], 'kind': tier['kind'], 'max_kg': tier['max_kg'], 'below_kg': tier['below_kg']}
+                for tier in record['tiers']
+            ]
+            if lane == DEFAULT_LANE:
+                entry['tiers'] = tiers
+                entry['vehicles'] = [tier['vehicle'] for tier in record['tiers'] if tier['vehicle']]
+            else:
+                entry['lanes'][lane] = {
+                    'cost_multiplier': record['cost_multiplier'],
+                    'transit_days': record.get('transit_days'),
+                    'tiers': tiers
+                }
+        return {'version': version, 'path': self.path, 'modes': modes}
+
+
+_table = None
+_table_lock = threading.Lock()
+
+
+def get_rate_table() -> FreightRateTable:
+    """Process-wide freight rate table (loaded on first use)."""
+    global _table
+    if _table is not None:
+        return _table
+    with _table_lock:
+        if _table is None:
+            _table = FreightRateTable()
+        return _table
+
+
+def get_rates(mode: str, lane: Optional[str] = None) -> Dict[str, Any]:
+    """Shortcut for get_rate_table().rates(mode, lane)."""
+    return get_rate_table().rates(mode, lane)
+
+
+def rates_version() -> int:
+    """Version of the loaded rate tables; changes when the file is reloaded."""
+    return get_rate_table().current_version()
+
+
+def vehicle_types(mode: str, lane: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Distinct vehicles of a mode and lane (default lane when omitted), in tier order.
+
+    Each has 'name', 'capacity_kg', 'hazmat_capacity_kg', 'pallet_positions',
+    'hazmat_surcharge' and either 'base_cost' (per container) or
+    'rate_per_mile' (per truck). Empty for modes priced by weight.
+    """
+    vehicles = {}
+    for tier in get_rates(mode, lane)['tiers']:
+        if tier['vehicle'] is not None:
+            vehicles.setdefault(tier['vehicle']['id'], tier['vehicle'])
+    return list(vehicles.values())
+
+
+def vehicle_modes() -> Tuple[str, ...]:
+    """Modes priced per container or truck (packing and mix solvers)."""
+    table = get_rate_table()
+    return tuple(mode for mode in table.modes if vehicle_types(mode))
+
+
+def tier_labels(mode: str, lane: Optional[str] = None) -> Tuple[str, ...]:
+    """Vehicle labels for the tier codes returned by calculate_transport_costs."""
+    return get_rates(mode, lane)['labels']
@@ -0,0 +1,162 @@
+"""
+Offline gazetteer and truck distance matrix.
+Plants, ports, border crossings and common pickup points with coordinates,
+from data/gazetteer.json plus the route network nodes. Road distances are
+great-circle miles times a per-country road factor, precomputed for every
+pair into a matrix, so truck pricing needs no geocoding service and each
+lookup is an index read.
+"""
+
+import json
+import logging
+import math
+import os
+import threading
+from typing import Dict, List, Any, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+GAZETTEER_PATH = os.environ.get(
+    'GAZETTEER_PATH',
+    os.path.join(os.path.dirname(__file__), 'data', 'gazetteer.json')
+)
+NETWORK_PATH = os.environ.get(
+    'ROUTE_NETWORK_PATH',
+    os.path.join(os.path.dirname(__file__), 'data', 'route_network.json')
+)
+
+EARTH_RADIUS_MILES = 3958.8
+
+
+def haversine_miles(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Great-circle distance in miles."""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlmb = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlmb / 2) ** 2
+    return 2 * EARTH_RADIUS_MILES * math.asin(math.sqrt(a))
+
+
+def haversine_matrix(lat: np.ndarray, lon: np.ndarray) -> np.ndarray:
+    """Pairwise great-circle miles for coordinate arrays (N, N)."""
+    phi = np.radians(lat)[:, None]
+    lmb = np.radians(lon)[:, None]
+    a = np.sin((phi.T - phi) / 2) ** 2 + np.cos(phi) * np.cos(phi.T) * np.sin((lmb.T - lmb) / 2) ** 2
+    return 2 * EARTH_RADIUS_MILES * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+class Gazetteer:
+    """
+    Location lookup and precomputed distance matrices.
+
+    Both matrices are rebuilt when the gazetteer or network file changes.
+    Road distance is NaN between locations in different road regions
+    (e.g. US and China), where no truck leg exists.
+    """
+
+    def __init__(self, path: Optional[str] = None, network_path: Optional[str] = None):
+        self.path = path or GAZETTEER_PATH
+        self.network_path = network_path or NETWORK_PATH
+        self._lock = threading.Lock()
+        self._mtimes = None
+        self.locations: Dict[str, Dict[str, Any]] = {}
+        self._index: Dict[str, int] = {}
+        self._names: Dict[str, str] = {}
+        self._load()
+
+    def _file_mtimes(self):
+        return tuple(os.path.getmtime(p) if os.path.exists(p) else None for p in (self.path, self.network_path))
+
+    def _load(self):
+        with open(self.path, 'r') as f:
+            config = json.load(f)
+        self._mtimes = self._file_mtimes()
+
+        locations = {}
+        if os.path.exists(self.network_path):
+            with open(self.network_path, 'r') as f:
+                for node_id, node in json.load(f).get('nodes', {}).items():
+                    locations[node_id] = {k: node[k] for k in ('name', 'type', 'country', 'lat', 'lon')}
+        locations.update(config.get('locations', {}))
+
+        ids = list(locations)
+        names = {}
+        for location_id in ids:
+            location = locations[location_id]
+            for name in [location_id, location['name']] + list(location.get('aliases', [])):
+                names.setdefault(name.strip().lower(), location_id)
+
+        lat = np.array([locations[i]['lat'] for i in ids], dtype=float)
+        lon = np.array([locations[i]['lon'] for i in ids], dtype=float)
+        great_circle = haversine_matrix(lat, lon)
+
+        factors = config.get('road_factors', {})
+        default_factor = factors.get('default', 1.25)
+        countries = [locations[i]['country'] for i in ids]
+        country_factor = np.array([factors.get(c, default_factor) for c in countries])
+        region_of = {c: region for region, members in config.get('road_regions', {}).items() for c in members}
+        regions = np.array([region_of.get(c, c) for c in countries], dtype=object)
+        road = great_circle * (country_factor[:, None] + country_factor[None, :]) / 2
+        road[regions[:, None] != regions[None, :]] = np.nan
+
+        self.locations = locations
+        self.ids = ids
+        self._index = {location_id: i for i, location_id in enumerate(ids)}
+        self._names = names
+        self.great_circle = great_circle
+        self.road = road
+        logger.info(f"Built distance matrix for {len(ids)} locations")
+
+    def _refresh_if_changed(self):
+        if self._file_mtimes() != self._mtimes:
+            self._load()
+
+    def _resolve(self, location: str) -> int:
+        location_id = self._names.get(str(location).strip().lower())
+        if location_id is None:
+            raise ValueError(f"Unknown location: {location}")
+        return self._index[location_id]
+
+    def resolve(self, location: str) -> str:
+        """Location id for an id, name or alias (case-insensitive)."""
+        with self._lock:
+            self._refresh_if_changed()
+            return self.ids[self._resolve(location)]
+
+    def great_circle_miles(self, origin: str, destination: str) -> float:
+        """Great-circle miles between two locations."""
+        with self._lock:
+            self._refresh_if_changed()
+            return float(self.great_circle[self._resolve(origin), self._resolve(destination)])
+
+    def road_miles(self, origin: str, destination: str) -> Optional[float]:
+        """Estimated road miles, or None when no road connects the two locations."""
+        with self._lock:
+            self._refresh_if_changed()
+            miles = self.road[self._resolve(origin), self._resolve(destination)]
+        return None if np.isnan(miles) else round(float(miles), 1)
+
+    def list_locations(self, location_type: Optional[str] = None, country: Optional[str] = None) -> List[Dict[str, Any]]:
+        with self._lock:
+            self._refresh_if_changed()
+            return [
+                dict(location, id=location_id)
+                for location_id, location in self.locations.items()
+                if (location_type is None or location['type'] == location_type)
+                and (country is None or location['country'] == country)
+            ]
+
+
+_gazetteer = None
+_gazetteer_lock = threading.Lock()
+
+
+def get_gazetteer() -> Gazetteer:
+    """Process-wide gazetteer (built on first use)."""
+    global _gazetteer
+    with _gazetteer_lock:
+        if _gazetteer is None:
+            _gazetteer = Gazetteer()
+        return _gazetteer
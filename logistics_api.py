@@ -6,7 +6,7 @@ Includes caching to minimize API calls and improve performance.
 import os
 import requests
 from functools import lru_cache
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Tuple
 from datetime import datetime, timedelta
 
 # API Configuration
@@ -215,16 +215,53 @@ class ChinaHSCIQClient:
 class FreightRateAPI:
     """
     Interface for freight rate APIs (Freightos, Xeneta, etc.).
-    Currently uses static benchmark rates from logistics_data.py.
+    Currently prices from the shared freight rate tables (data/freight_rates.json)
+    through calculate_transport_cost, so quotes match every other estimator.
     """
     
-    def __init__(self):
-        """Initialize freight rate API client."""
+    def _quote(
+        self,
+        mode: str,
+        origin: Optional[str],
+        destination: Optional[str],
+        weight_mt: float,
+        is_hazmat: bool,
+        distance_miles: Optional[float] = None
+    ) -> Tuple[Dict[str, Any], Optional[Dict[str, Any]]]:
+        """
+        Price a shipment on its lane.
+        
+        Returns:
+            (quote with the common fields, lane rates), or (error dict, None)
+        """
         # Import here to avoid circular dependency
-        from logistics_data import TRANSPORT_RATES
-        self.rates = TRANSPORT_RATES
+        from freight_rates import get_rates, rates_version
+        from logistics_data import calculate_transport_cost, get_route_key
+        
+        lane = get_route_key(origin, destination) if origin and destination else None
+        result = calculate_transport_cost(mode, weight_mt, is_hazmat, distance_miles, lane=lane)
+        if 'error' in result:
+            return {"mode": mode, "error": result['error']}, None
+        
+        rates = get_rates(mode, lane)
+        quote = {
+            "mode": mode,
+            "lane": rates['lane'],
+            "weight_mt": weight_mt,
+            "vehicle_type": result['vehicle_type'],
+            "num_vehicles": result['num_vehicles'],
+            "base_cost": result['base_cost'],
+            "hazmat_surcharge": result['hazmat_surcharge'],
+            "total_cost": result['cost'],
+            "currency": "USD",
+            "rates_version": rates_version(),
+            "note": "Benchmark rate - actual rates vary by carrier, season, volume"
+        }
+        if 'fuel_surcharge' in result:
+            quote['fuel_surcharge'] = result['fuel_surcharge']
+        return quote, rates
     
-    def get_ocean_rate(self, origin: str, destination: str, weight_mt: float) -> Dict[str, Any]:
+    def get_ocean_rate(self, origin: str, destination: str, weight_mt: float, is_hazmat: bool = True) -> Dict[str, Any]:
         """
         Get ocean freight rate estimate.
         
@@ -232,40 +269,16 @@ class FreightRateAPI:
             origin: Origin country/port
             destination: Destination country/port
             weight_mt: Weight in metric tons
+            is_hazmat: Whether material is hazardous
         
         Returns:
             Rate estimate with breakdown
         """
-        ocean_rates = self.rates.get("ocean", {})
-        base_rate = ocean_rates.get("base_rate_usd_per_mt", 85)
-        hazmat_mult = ocean_rates.get("hazmat_multiplier", 1.8)
-        
-        # Check for specific route rates
-        route_key = f"{origin}->{ destination}"
-        route_rates = ocean_rates.get("routes", {})
-        if route_key in route_rates:
-            base_rate = route_rates[route_key].get("rate", base_rate)
-            transit_days = route_rates[route_key].get("days", 14)
-        else:
-            transit_days = ocean_rates.get("typical_transit_days", 14)
-        
-        base_cost = base_rate * weight_mt
-        hazmat_cost = base_cost * (hazmat_mult - 1)
-        total_cost = base_cost * hazmat_mult
-        
-        return {
-            "mode": "ocean",
-            "base_rate_per_mt": base_rate,
-            "weight_mt": weight_mt,
-            "base_cost": round(base_cost, 2),
-            "hazmat_surcharge": round(hazmat_cost, 2),
-            "total_cost": round(total_cost, 2),
-            "estimated_transit_days": transit_days,
-            "currency": "USD",
-            "note": "Benchmark rate - actual rates vary by carrier, season, volume"
-        }
+        quote, rates = self._quote("ocean", origin, destination, weight_mt, is_hazmat)
+        quote["estimated_transit_days"] = rates.get("transit_days", rates["typical_transit_days"])
+        return quote
     
-    def get_air_rate(self, origin: str, destination: str, weight_mt: float) -> Dict[str, Any]:
+    def get_air_rate(self, origin: str, destination: str, weight_mt: float, is_hazmat: bool = True) -> Dict[str, Any]:
         """
         Get air freight rate estimate.
         
@@ -273,65 +286,44 @@ class FreightRateAPI:
             origin: Origin airport/country
             destination: Destination airport/country
             weight_mt: Weight in metric tons
+            is_hazmat: Whether material is hazardous
         
         Returns:
             Rate estimate with breakdown
         """
-        air_rates = self.rates.get("air", {})
-        base_rate = air_rates.get("base_rate_usd_per_mt", 4500)
-        hazmat_mult = air_rates.get("hazmat_multiplier", 2.2)
-        
-        base_cost = base_rate * weight_mt
-        hazmat_cost = base_cost * (hazmat_mult - 1)
-        total_cost = base_cost * hazmat_mult
-        
-        return {
-            "mode": "air",
-            "base_rate_per_mt": base_rate,
-            "weight_mt": weight_mt,
-            "base_cost": round(base_cost, 2),
-            "hazmat_surcharge": round(hazmat_cost, 2),
-            "total_cost": round(total_cost, 2),
-            "estimated_transit_days": 2,
-            "currency": "USD",
-            "warning": "DDR (Damaged/Defective/Recalled) batteries PROHIBITED by air",
-            "note": "Benchmark rate - actual rates vary significantly"
-        }
+        quote, rates = self._quote("air", origin, destination, weight_mt, is_hazmat)
+        quote["estimated_transit_days"] = rates.get("transit_days", rates["typical_transit_days"])
+        quote["warning"] = "DDR (Damaged/Defective/Recalled) batteries PROHIBITED by air"
+        return quote
     
-    def get_truck_rate(self, distance_miles: float, weight_mt: float) -> Dict[str, Any]:
+    def get_truck_rate(
+        self,
+        distance_miles: float,
+        weight_mt: float,
+        is_hazmat: bool = True,
+        origin: Optional[str] = None,
+        destination: Optional[str] = None
+    ) -> Dict[str, Any]:
         """
         Get truck freight rate estimate.
         
         Args:
             distance_miles: Distance in miles
             weight_mt: Weight in metric tons
+            is_hazmat: Whether material is hazardous
+            origin: Origin country (selects the rate lane)
+            destination: Destination country
         
         Returns:
             Rate estimate with breakdown
         """
-        truck_rates = self.rates.get("truck", {})
-        base_rate_per_mile = truck_rates.get("base_rate_usd_per_mile", 3.50)
-        hazmat_mult = truck_rates.get("hazmat_multiplier", 1.5)
-        
-        base_cost = base_rate_per_mile * distance_miles
-        hazmat_cost = base_cost * (hazmat_mult - 1)
-        total_cost = base_cost * hazmat_mult
-        
-        # Estimate transit time (assuming 500 miles/day average)
-        transit_days = max(1, int(distance_miles / 500))
-        
-        return {
-            "mode": "truck",
-            "base_rate_per_mile": base_rate_per_mile,
-            "distance_miles": distance_miles,
-            "weight_mt": weight_mt,
-            "base_cost": round(base_cost, 2),
-            "hazmat_surcharge": round(hazmat_cost, 2),
-            "total_cost": round(total_cost, 2),
-            "estimated_transit_days": transit_days,
-            "currency": "USD",
-            "note": "Benchmark rate - actual rates vary by carrier, route, season"
-        }
+        quote, rates = self._quote("truck", origin, destination, weight_mt, is_hazmat, distance_miles)
+        if rates is None:
+            return quote
+        quote["distance_miles"] = distance_miles
+        # Estimate transit time from the table's average daily mileage
+        quote["estimated_transit_days"] = max(1, int(distance_miles / rates["typical_miles_per_day"]))
+        return quote
 
 
 # Singleton instances for easy access
@@ -377,7 +369,7 @@ def get_freight_estimate(
     elif mode == "truck":
         if distance_miles is None:
             return {"error": "distance_miles required for truck transport"}
-        return freight_api.get_truck_rate(distance_miles, weight_mt)
+        return freight_api.get_truck_rate(distance_miles, weight_mt, origin=origin, destination=destination)
     else:
         return {"error": f"Unknown transport mode: {mode}"}
 
@@ -1,414 +1,61 @@
 """
 Logistics and regulatory data for battery waste transportation.
-Loads static data from regulatory_db.json and provides structured access.
+Regulatory data is served from data/regulatory_db.json through
+regulatory_store.py, which reloads it when the file changes.
+Freight prices come from the rate tables in freight_rates.py
+(data/freight_rates.json).
 """
 
 import json
+import math
 import os
-from typing import Dict, List, Any
+import threading
+from typing import Dict, List, Any, Tuple
 
-# Load regulatory database
-_DB_PATH = os.path.join(os.path.dirname(__file__), 'data', 'regulatory_db.json')
+from freight_rates import find_tier, find_tiers, get_rates, ltl_distance_band, ltl_distance_multipliers
+from regulatory_store import DB_PATH, current_snapshot, get_regulatory_store
+
+_DB_PATH = DB_PATH
 
 def load_regulatory_db() -> Dict[str, Any]:
     """Load the regulatory database from JSON file."""
     with open(_DB_PATH, 'r') as f:
         return json.load(f)
 
-# Load database at module import
-_REGULATORY_DB = load_regulatory_db()
-
-# Export key data structures for easy access
-WASTE_REGULATIONS = {
-    "US": {
-        "framework": "RCRA (Resource Conservation and Recovery Act)",
-        "competent_authority": "EPA",
-        "classification": {
-            "lithium_batteries": "Hazardous Waste (D001 Ignitable, D003 Reactive)",
-            "black_mass": "Hazardous Waste (if exhibits characteristics)",
-            "universal_waste": "40 CFR Part 273 eligible"
-        },
-        "export_requirements": {
-            "notification_system": "WIETS",
-            "advance_notice": "60 days",
-            "aoc_required": True,
-            "aes_filing": True,
-            "annual_report_due": "March 1"
-        },
-        "key_regulations": [
-            "40 CFR Part 262 Subpart H (Export)",
-            "40 CFR Part 273 (Universal Waste)",
-            "40 CFR Part 261 (Hazardous Waste ID)"
-        ],
-        "links": {
-            "epa_faqs": "https://www.epa.gov/hw/lithium-ion-battery-recycling-frequently-asked-questions",
-            "wiets": "https://rcrapublic.epa.gov/",
-            "export_regs": "https://www.ecfr.gov/current/title-40/part-262/subpart-H"
-        }
-    },
-    "Canada": {
-        "framework": "CEPA (Canadian Environmental Protection Act, 1999)",
-        "regulation": "SOR/2021-25",
-        "competent_authority": "ECCC (Environment and Climate Change Canada)",
-        "classification": {
-            "hazardous_waste": "Subject to cross-border movement controls",
-            "permit_required": "Export, import, transit"
-        },
-        "export_requirements": {
-            "notification_system": "CNMTS",
-            "permit_required": True,
-            "contract_required": True,
-            "liability_insurance": True,
-            "record_retention": "5 years"
-        },
-        "links": {
-            "regulations": "https://laws.justice.gc.ca/eng/regulations/SOR-2021-25/",
-            "cnmts": "https://ec.ss.ec.gc.ca/"
-        }
-    },
-    "EU": {
-        "framework": "EU Battery Regulation 2023/1542",
-        "effective_date": "2023-08-17",
-        "waste_list_amendment": "EU Commission Decision 2025/934",
-        "classification": {
-            "black_mass": "Hazardous waste (effective Nov 9, 2026)",
-            "waste_code": "191402*",
-            "waste_batteries": "Subject to EU Waste Shipment Regulation"
-        },
-        "export_restrictions": {
-            "non_oecd_prohibited": True,
-            "effective_date": "2026-11-09",
-            "applies_to": ["Waste batteries", "Black mass (waste code 191402*)"]
-        },
-        "sustainability_requirements": [
-            "Carbon footprint declaration",
-            "Recycled content minimums",
-            "Supply chain due diligence",
-            "Battery passport (by 2027)"
-        ],
-        "links": {
-            "regulation": "https://eur-lex.europa.eu/eli/reg/2023/1542/oj"
-        }
-    },
-    "China": {
-        "framework": "GACC (General Administration of Customs)",
-        "standard": "GB/T 45203-2024",
-        "classification": {
-            "black_mass": "Non-waste product (industrial intermediate)",
-            "hs_code": "3824999996",
-            "waste_batteries": "Import restricted, Basel PIC required"
-        },
-        "import_requirements": {
-            "import_license": True,
-            "quality_certificate": True,
-            "inspection": "Entry-exit inspection and quarantine",
-            "facility_approval": "MEE approval required"
-        }
-    },
-    "Basel_Convention": {
-        "description": "Multilateral treaty controlling transboundary movements",
-        "pic_required": True,
-        "key_annexes": {
-            "Annex VIII A1170": "Waste batteries with hazardous constituents",
-            "Annex IX B1090": "Non-hazardous batteries (limited applicability)"
-        },
-        "technical_guidelines": "Under development (expected COP-18, 2027)"
-    }
-}
+def get_data_version() -> int:
+    """Version of the regulatory data; changes when regulatory_db.json is reloaded."""
+    return current_snapshot().version
 
-ROUTE_FEASIBILITY = {
-    "US->Canada": {
-        "status": "allowed",
-        "requirements": ["ECCC permit", "EPA AOC", "RCRA manifest", "DOT packaging"],
-        "processing_time_days": "60-90",
-        "notes": "Well-established cross-border protocols"
-    },
-    "Canada->US": {
-        "status": "allowed",
-        "requirements": ["EPA AOC", "RCRA manifest", "ECCC movement document"],
-        "processing_time_days": "60-90",
-        "notes": "Common route for recycling services"
-    },
-    "US->EU": {
-        "status": "allowed",
-        "requirements": ["EPA AOC", "Basel notification", "EU waste shipment consent"],
-        "processing_time_days": "90-120",
-        "notes": "Multiple EU competent authorities involved"
-    },
-    "US->China": {
-        "status": "restricted",
-        "requirements": ["EPA AOC", "Basel PIC", "China import license", "MEE approval if waste"],
-        "processing_time_days": "120-180",
-        "notes": "Black mass as product (GB/T 45203) easier than waste classification"
-    },
-    "Canada->China": {
-        "status": "restricted",
-        "requirements": ["ECCC permit", "Basel PIC", "China import license"],
-        "processing_time_days": "120-180",
-        "notes": "Long lead times for approvals"
-    },
-    "EU->Non-OECD": {
-        "status": "allowed_until_nov_2026",
-        "status_after": "blocked",
-        "reason": "EU Commission Decision 2025/934 classifies black mass as hazardous waste (191402*), prohibiting export to non-OECD per Basel Convention",
-        "effective_date": "2026-11-09",
-        "current_note": "Currently allowed but restriction takes effect November 9, 2026",
-        "applies_to": ["Waste batteries", "Black mass (waste code 191402*)"],
-        "legal_basis": "Commission Delegated Decision (EU) 2025/934",
-        "notes": "Export to OECD countries will remain allowed after Nov 9, 2026"
-    },
-    "EU->China": {
-        "status": "allowed_until_nov_2026",
-        "status_after": "blocked",
-        "reason": "EU Commission Decision 2025/934 classifies black mass as hazardous waste, prohibiting export to non-OECD countries including China",
-        "effective_date": "2026-11-09",
-        "requirements": ["EU waste shipment consent", "Basel PIC", "China import license", "MEE approval"],
-        "processing_time_days": "120-180",
-        "current_note": "Currently allowed but export of hazardous battery waste to China will be prohibited from November 9, 2026",
-        "notes": "China is non-OECD. After Nov 2026, only non-hazardous battery materials can be exported to China."
-    },
-    "Germany->China": {
-        "status": "allowed_until_nov_2026",
-        "status_after": "blocked",
-        "reason": "EU Commission Decision 2025/934 - same as EU->China",
-        "effective_date": "2026-11-09",
-        "requirements": ["German Federal Environment Agency approval", "Basel PIC", "China import license"],
-        "processing_time_days": "120-180",
-        "notes": "Will be prohibited from November 9, 2026 per EU Commission Decision 2025/934"
-    },
-    "France->China": {
-        "status": "allowed_until_nov_2026",
-        "status_after": "blocked",
-        "reason": "EU Commission Decision 2025/934 - same as EU->China",
-        "effective_date": "2026-11-09",
-        "requirements": ["French Ministry approval", "Basel PIC", "China import license"],
-        "processing_time_days": "120-180",
-        "notes": "Will be prohibited from November 9, 2026 per EU Commission Decision 2025/934"
-    },
-    "US->Mexico": {
-        "status": "allowed",
-        "requirements": ["EPA AOC", "Mexico SEMARNAT approval", "Basel notification"],
-        "processing_time_days": "60-90",
-        "notes": "NAFTA/USMCA simplifies some procedures"
-    },
-    "US->South Korea": {
-        "status": "allowed",
-        "requirements": ["EPA AOC", "Basel PIC", "Korea MOE approval"],
-        "processing_time_days": "90-120",
-        "notes": "Strong e-waste recycling infrastructure"
-    }
-}
+def reload_regulatory_db() -> Dict[str, Any]:
+    """Reload regulatory_db.json now (it is also picked up when its mtime changes)."""
+    return get_regulatory_store().reload().document
 
-# Transport rates based on Freightos Baltic Index
-TRANSPORT_RATES = {
-    "ocean": {
-        "base_rate_usd_per_mt": 85,
-        "hazmat_multiplier": 1.8,
-        "typical_transit_days": 14,
-        "routes": {
-            "US->China": {"rate": 95, "days": 14},
-            "US->EU": {"rate": 75, "days": 10},
-            "Canada->Asia": {"rate": 90, "days": 16}
-        }
-    },
-    "air": {
-        "base_rate_usd_per_mt": 4500,
-        "hazmat_multiplier": 2.2,
-        "typical_transit_days": 2,
-        "notes": "DDR (Damaged/Defective/Recalled) batteries prohibited"
-    },
-    "truck": {
-        "base_rate_usd_per_mile": 3.50,
-        "hazmat_multiplier": 1.5,
-        "typical_distances": {
-            "US-Canada border": 500,
-            "Cross-country US": 2500,
-            "Cross-country Canada": 3000
-        }
-    }
-}
+def get_route_feasibility() -> Dict[str, Dict[str, Any]]:
+    """Route feasibility keyed 'Origin->Destination' (read-only)."""
+    return current_snapshot().route_feasibility
 
-PERMIT_REQUIREMENTS = {
-    "US_export": [
-        {
-            "name": "EPA Acknowledgment of Consent (AOC)",
-            "agency": "EPA",
-            "required": True,
-            "processing_time": "30-90 days",
-            "validity": "Up to 1 year (3 years for OECD pre-consented)",
-            "application_system": "WIETS",
-            "url": "https://rcrapublic.epa.gov/"
-        },
-        {
-            "name": "AES Filing",
-            "agency": "Census Bureau",
-            "required": True,
-            "processing_time": "Immediate",
-            "description": "Automated Export System filing",
-            "url": "https://www.census.gov/foreign-trade/aes/"
-        },
-        {
-            "name": "EPA Form 8700-22 (Hazardous Waste Manifest)",
-            "required": True,
-            "submission_deadline": "Within 30 days to e-Manifest",
-            "url": "https://www.epa.gov/hwgenerators/uniform-hazardous-waste-manifest"
-        }
-    ],
-    "Canada_export": [
-        {
-            "name": "ECCC Export Permit",
-            "agency": "Environment and Climate Change Canada",
-            "required": True,
-            "processing_time": "Varies by destination",
-            "application_system": "CNMTS",
-            "url": "https://ec.ss.ec.gc.ca/"
-        },
-        {
-            "name": "Liability Insurance",
-            "required": True,
-            "regulation": "Division 7 of SOR/2021-25",
-            "purpose": "Cover accidents or incidents during transport"
-        }
-    ],
-    "China_import": [
-        {
-            "name": "Import License",
-            "agency": "Ministry of Commerce (MOFCOM)",
-            "required": True,
-            "processing_time": "30-60 days"
-        },
-        {
-            "name": "MEE Approval",
-            "agency": "Ministry of Ecology and Environment",
-            "required": "If classified as waste",
-            "processing_time": "60-90 days",
-            "notes": "Not required if black mass classified as product per GB/T 45203"
-        }
-    ],
-    "EU_import": [
-        {
-            "name": "Waste Shipment Notification",
-            "agency": "Competent authority of destination country",
-            "required": True,
-            "processing_time": "30 days",
-            "regulation": "EU Waste Shipment Regulation"
-        }
-    ]
-}
+def get_countries() -> Dict[str, Dict[str, Any]]:
+    """Countries and their OECD/Basel membership (read-only)."""
+    return current_snapshot().countries
 
-PACKAGING_REQUIREMENTS = {
-    "lithium_batteries": {
-        "un_classification": {
-            "un_number": "UN3480 (lithium metal) / UN3481 (contained in equipment)",
-            "class": "Class 9 Dangerous Goods",
-            "packing_group": "II"
-        },
-        "regulations": [
-            "49 CFR 173.185 (US DOT)",
-            "IATA DGR Section 4.11 (Air transport)"
-        ],
-        "requirements": [
-            "Inner packaging prevents short circuits",
-            "Outer packaging provides cushioning",
-            "Terminals isolated (tape, plastic caps, bags)",
-            "Package marked with UN number",
-            "Lithium battery handling label",
-            "State of charge documentation"
-        ]
-    },
-    "ddr_batteries": {
-        "description": "Damaged, Defective, or Recalled batteries",
-        "regulation": "49 CFR 173.185(f)",
-        "restrictions": {
-            "air_transport": "Prohibited",
-            "ground_transport": "Allowed with special packaging"
-        },
-        "special_requirements": [
-            "Individual non-conductive inner packaging",
-            "Additional cushioning required",
-            "Warning labels for damaged/defective status",
-            "Separate storage from non-DDR batteries"
-        ]
-    },
-    "black_mass": {
-        "classification": "Hazardous material (reactive battery residues)",
-        "packaging": [
-            "UN-approved drums or IBCs",
-            "Sealed to prevent moisture ingress",
-            "Proper hazardous waste labeling",
-            "SDS (Safety Data Sheet) must accompany"
-        ]
-    }
-}
+def get_dated_rules() -> Tuple[Any, ...]:
+    """Effective-dated regulatory rules with their validity intervals (read-only)."""
+    return current_snapshot().dated_rules
 
-# Material classifications for transport
-MATERIAL_CLASSIFICATIONS = {
-    "whole_batteries": {
-        "description": "Complete lithium-ion battery cells or modules",
-        "hazard_class": "Class 9 Dangerous Goods",
-        "typical_waste_codes": ["D001", "D003"],
-        "universal_waste_eligible": True,
-        "basel_annex": "Annex VIII A1170"
-    },
-    "black_mass": {
-        "description": "Shredded battery material (cathode + anode)",
-        "hazard_class": "Hazardous waste (if exhibits characteristics)",
-        "typical_waste_codes": ["D001", "D003"],
-        "universal_waste_eligible": False,
-        "basel_annex": "Annex VIII A1170 or product (China GB/T 45203)",
-        "notes": "Requires RCRA Part B permit for storage before recycling"
-    },
-    "processed_metals": {
-        "description": "Recovered battery-grade metals (Li, Co, Ni compounds)",
-        "hazard_class": "Generally non-hazardous (case-by-case)",
-        "basel_annex": "Annex IX B1010 (if non-hazardous)",
-        "notes": "May qualify for less restrictive trade if sufficiently processed"
-    }
+# Former module-level tables, now served from the current regulatory snapshot
+_SNAPSHOT_ATTRIBUTES = {
+    'ROUTE_FEASIBILITY': lambda snapshot: snapshot.route_feasibility,
+    'COUNTRIES': lambda snapshot: snapshot.countries,
+    'WASTE_REGULATIONS': lambda snapshot: snapshot.country_regulations,
+    'PERMIT_REQUIREMENTS': lambda snapshot: snapshot.section('permit_requirements'),
+    'PACKAGING_REQUIREMENTS': lambda snapshot: snapshot.section('packaging_requirements'),
+    'MATERIAL_CLASSIFICATIONS': lambda snapshot: snapshot.section('material_classifications')
 }
 
-# Countries and their regulatory frameworks
-COUNTRIES = {
-    "US": {
-        "name": "United States",
-        "competent_authority": "EPA",
-        "oecd_member": True,
-        "basel_party": True,
-        "system": "WIETS"
-    },
-    "Canada": {
-        "name": "Canada",
-        "competent_authority": "ECCC",
-        "oecd_member": True,
-        "basel_party": True,
-        "system": "CNMTS"
-    },
-    "China": {
-        "name": "People's Republic of China",
-        "competent_authority": "MEE",
-        "oecd_member": False,
-        "basel_party": True,
-        "special_notes": "Black mass can be product (GB/T 45203) or waste"
-    },
-    "EU": {
-        "name": "European Union",
-        "competent_authority": "Varies by member state",
-        "oecd_member": True,
-        "basel_party": True,
-        "special_restrictions": "No hazardous battery waste export to non-OECD (from Sept 2026)"
-    },
-    "Mexico": {
-        "name": "Mexico",
-        "competent_authority": "SEMARNAT",
-        "oecd_member": True,
-        "basel_party": True
-    },
-    "South Korea": {
-        "name": "South Korea",
-        "competent_authority": "MOE",
-        "oecd_member": True,
-        "basel_party": True
-    }
-}
+def __getattr__(name: str):
+    if name in _SNAPSHOT_ATTRIBUTES:
+        return _SNAPSHOT_ATTRIBUTES[name](current_snapshot())
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 def get_route_key(origin: str, destination: str) -> str:
     """Generate route key from origin and destination."""
@@ -417,38 +64,105 @@ def get_route_key(origin: str, destination: str) -> str:
 def get_route_status(origin: str, destination: str) -> Dict[str, Any]:
     """Get feasibility status for a specific route."""
     route_key = get_route_key(origin, destination)
-    return ROUTE_FEASIBILITY.get(route_key, {
+    return current_snapshot().route_feasibility.get(route_key, {
         "status": "unknown",
         "notes": "Route not in database. Consult regulatory authorities."
     })
 
 def get_country_regulations(country: str) -> Dict[str, Any]:
     """Get regulatory framework for a specific country."""
-    return WASTE_REGULATIONS.get(country, {})
+    return current_snapshot().country_regulations.get(country, {})
 
 def get_permit_requirements_for_route(origin: str, destination: str) -> List[Dict[str, Any]]:
     """Get all permits required for a specific route."""
+    permit_requirements = current_snapshot().section('permit_requirements')
     permits = []
     
     # Export permits from origin
     if origin == "US":
-        permits.extend(PERMIT_REQUIREMENTS.get("US_export", []))
+        permits.extend(permit_requirements.get("US_export", []))
     elif origin == "Canada":
-        permits.extend(PERMIT_REQUIREMENTS.get("Canada_export", []))
+        permits.extend(permit_requirements.get("Canada_export", []))
     
     # Import permits for destination
     if destination == "China":
-        permits.extend(PERMIT_REQUIREMENTS.get("China_import", []))
+        permits.extend(permit_requirements.get("China_import", []))
     elif destination in ["EU", "Germany", "France", "Netherlands"]:
-        permits.extend(PERMIT_REQUIREMENTS.get("EU_import", []))
+        permits.extend(permit_requirements.get("EU_import", []))
     
     return permits
 
+# Tier-level pricing memo for calculate_transport_cost, bounded (oldest
+# entries are evicted first)
+TIER_PRICING_CACHE_SIZE = 1024
+_tier_pricing_cache: Dict[Tuple, Dict[str, Any]] = {}
+_tier_pricing_lock = threading.Lock()
+_tier_pricing_stats = {'hits': 0, 'misses': 0}
+
+def _tier_pricing(rates: Dict[str, Any], tier_index: int, is_hazmat: bool, distance_band: int = None) -> Dict[str, Any]:
+    """
+    Weight-independent pricing for one rate tier, memoized.
+
+    Every weight in a tier (and, for LTL, every distance in a band) shares
+    the vehicle, capacity and unit rates, so they are resolved once per
+    (mode, lane, hazmat, tier, distance band) and only the weight- and
+    distance-dependent fields are computed per call. The key carries the
+    rate table version the record was loaded in (rates_version() at load),
+    so a reload never serves old prices. Hits are a plain dict lookup; the
+    lock is only taken to insert and evict, and the hit count is
+    approximate under concurrent use.
+    """
+    key = (rates['mode'], rates['lane'], is_hazmat, tier_index, distance_band, rates['version'])
+    pricing = _tier_pricing_cache.get(key)
+    if pricing is not None:
+        _tier_pricing_stats['hits'] += 1
+        return pricing
+
+    tier = rates['tiers'][tier_index]
+    pricing = {'kind': tier['kind'], 'label': tier['label'], 'multiplier': rates['cost_multiplier']}
+    if tier['kind'] == 'vehicle':
+        vehicle = tier['vehicle']
+        pricing.update({
+            'capacity_kg': vehicle['hazmat_capacity_kg'] if is_hazmat else vehicle['capacity_kg'],
+            # Per container (ocean) or per truck-mile (truck)
+            'vehicle_rate': vehicle['base_cost'] if 'base_cost' in vehicle else vehicle['rate_per_mile'],
+            'hazmat_per_vehicle': vehicle['hazmat_surcharge'] if is_hazmat else 0
+        })
+    elif tier['kind'] == 'ltl':
+        ltl = rates['ltl']
+        pricing.update({
+            'rate_per_lb': ltl['hazmat_rate_per_lb'] if is_hazmat else ltl['rate_per_lb'],
+            'distance_mult': rates['ltl_distance_multipliers'][distance_band],
+            'fuel_share': ltl['fuel_surcharge_pct'] / 100,
+            'hazmat_fee': ltl['hazmat_fee'] if is_hazmat else 0,
+            'minimum_charge': ltl['minimum_charge'],
+            'ftl_from_kg': rates['ltl_below_kg']
+        })
+    else:
+        pricing.update({
+            'rate_per_kg': rates['hazmat_rate_per_kg'] if is_hazmat else rates['rate_per_kg'],
+            'minimum_charge': rates['minimum_charge'],
+            'hazmat_surcharge': rates['hazmat_surcharge'] if is_hazmat else 0
+        })
+
+    with _tier_pricing_lock:
+        _tier_pricing_stats['misses'] += 1
+        _tier_pricing_cache[key] = pricing
+        while len(_tier_pricing_cache) > TIER_PRICING_CACHE_SIZE:
+            del _tier_pricing_cache[next(iter(_tier_pricing_cache))]
+    return pricing
+
+def get_tier_pricing_cache_info() -> Dict[str, Any]:
+    """Hit/miss counts and size of the tier pricing memo."""
+    with _tier_pricing_lock:
+        return dict(_tier_pricing_stats, size=len(_tier_pricing_cache), max_size=TIER_PRICING_CACHE_SIZE)
+
 def calculate_transport_cost(
     mode: str,
     weight_mt: float,
     is_hazmat: bool = True,
-    distance_miles: float = None
+    distance_miles: float = None,
+    lane: str = None
 ) -> dict:
     """
     Calculate realistic transport cost with container/vehicle sizing.
@@ -458,40 +172,35 @@ def calculate_transport_cost(
         weight_mt: Weight in metric tons
         is_hazmat: Whether material is hazardous
         distance_miles: Required for truck transport
+        lane: 'Origin->Destination' rate lane (default rates when omitted
+              or not listed in data/freight_rates.json)
     
     Returns:
         dict with cost and sizing information
     """
-    import math
+    if mode not in ("ocean", "truck", "air"):
+        return {'cost': 0.0, 'error': 'Invalid transport mode'}
+    if mode == "truck" and distance_miles is None:
+        return {'cost': 0.0, 'error': 'Distance required for truck transport'}
     
+    rates = get_rates(mode, lane)
     weight_kg = weight_mt * 1000
     weight_lbs = weight_kg * 2.205
+    tier_index = find_tier(rates, weight_kg)
+    distance_band = None
+    if rates['tiers'][tier_index]['kind'] == 'ltl':
+        distance_band = ltl_distance_band(rates, distance_miles)
+    pricing = _tier_pricing(rates, tier_index, is_hazmat, distance_band)
+    multiplier = pricing['multiplier']
     
     if mode == "ocean":
-        # Ocean freight charged per CONTAINER, not per kg
-        # Hazmat limits: 20ft = 18,000 kg, 40ft = 24,000 kg
-        
-        if weight_kg <= 18000:
-            # Fits in 20ft container
-            container_type = "20ft Container (TEU)"
-            container_capacity_kg = 18000 if is_hazmat else 21000
-            num_containers = 1
-            base_cost_per_container = 3000
-            hazmat_surcharge_per_container = 1000 if is_hazmat else 0
-        elif weight_kg <= 24000:
-            # Needs 40ft container
-            container_type = "40ft Container (FEU)"
-            container_capacity_kg = 24000 if is_hazmat else 27000
-            num_containers = 1
-            base_cost_per_container = 4500
-            hazmat_surcharge_per_container = 1500 if is_hazmat else 0
-        else:
-            # Multiple containers needed
-            container_type = "20ft Containers (TEU)"
-            container_capacity_kg = 18000 if is_hazmat else 21000
-            num_containers = math.ceil(weight_kg / container_capacity_kg)
-            base_cost_per_container = 3000
-            hazmat_surcharge_per_container = 1000 if is_hazmat else 0
+        # Ocean freight charged per CONTAINER, not per kg, up to the
+        # container's hazmat weight limit
+        container_type = pricing['label']
+        container_capacity_kg = pricing['capacity_kg']
+        num_containers = max(1, math.ceil(weight_kg / container_capacity_kg))
+        base_cost_per_container = pricing['vehicle_rate'] * multiplier
+        hazmat_surcharge_per_container = pricing['hazmat_per_vehicle']
         
         total_cost = num_containers * (base_cost_per_container + hazmat_surcharge_per_container)
         utilization_pct = (weight_kg / (num_containers * container_capacity_kg)) * 100
@@ -504,33 +213,19 @@ def calculate_transport_cost(
             'total_capacity_kg': num_containers * container_capacity_kg,
             'utilization_pct': round(utilization_pct, 1),
             'cost_per_kg': round(total_cost / weight_kg, 2),
-            'base_cost': base_cost_per_container * num_containers,
+            'base_cost': round(base_cost_per_container * num_containers, 2),
             'hazmat_surcharge': hazmat_surcharge_per_container * num_containers,
             'note': f"Ocean freight charged per container. Your {weight_kg:,.0f} kg shipment requires {num_containers} × {container_type} (capacity: {container_capacity_kg:,} kg each)."
         }
     
     elif mode == "truck":
-        if distance_miles is None:
-            return {'cost': 0.0, 'error': 'Distance required for truck transport'}
-        
-        # Determine FTL vs LTL
-        if weight_kg >= 4500:
+        if pricing['kind'] == 'vehicle':
             # Full Truckload (FTL) - charged per truck, not per kg
-            if weight_kg <= 6000:
-                vehicle_type = "26ft Box Truck"
-                vehicle_capacity_kg = 6000
-            elif weight_kg <= 18000:
-                vehicle_type = "53ft Semi Trailer"
-                vehicle_capacity_kg = 18000 if is_hazmat else 22000
-            else:
-                # Multiple trucks
-                vehicle_type = "53ft Semi Trailers"
-                vehicle_capacity_kg = 18000 if is_hazmat else 22000
-            
-            num_vehicles = math.ceil(weight_kg / vehicle_capacity_kg)
-            rate_per_mile = 2.50  # FTL rate per mile per truck
-            base_cost = distance_miles * rate_per_mile * num_vehicles
-            hazmat_surcharge = 300 * num_vehicles if is_hazmat else 0
+            vehicle_type = pricing['label']
+            vehicle_capacity_kg = pricing['capacity_kg']
+            num_vehicles = max(1, math.ceil(weight_kg / vehicle_capacity_kg))
+            base_cost = distance_miles * pricing['vehicle_rate'] * multiplier * num_vehicles
+            hazmat_surcharge = pricing['hazmat_per_vehicle'] * num_vehicles
             total_cost = base_cost + hazmat_surcharge
             utilization_pct = (weight_kg / (num_vehicles * vehicle_capacity_kg)) * 100
             
@@ -548,35 +243,15 @@ def calculate_transport_cost(
             }
         
         else:
-            # Less Than Truckload (LTL) - charged by weight + freight class
-            vehicle_type = "LTL (Partial Truck)"
-            
-            # LTL pricing by weight
-            if is_hazmat:
-                rate_per_lb = 0.90  # Hazmat LTL rate
-            else:
-                rate_per_lb = 0.40
-            
-            base_cost = weight_lbs * rate_per_lb
-            
-            # Distance-based multiplier for LTL
-            if distance_miles < 500:
-                distance_mult = 1.0
-            elif distance_miles < 1000:
-                distance_mult = 1.3
-            else:
-                distance_mult = 1.6
-            
-            base_cost *= distance_mult
-            
-            # Fuel surcharge (typically 25%)
-            fuel_surcharge = base_cost * 0.25
-            
-            # Hazmat handling fee
-            hazmat_fee = 150 if is_hazmat else 0
+            # Less Than Truckload (LTL) - charged by weight + freight class,
+            # scaled by distance band
+            vehicle_type = pricing['label']
+            base_cost = weight_lbs * pricing['rate_per_lb'] * pricing['distance_mult'] * multiplier
+            fuel_surcharge = base_cost * pricing['fuel_share']
+            hazmat_fee = pricing['hazmat_fee']
             
             # Minimum charge
-            total_cost = max(base_cost + fuel_surcharge + hazmat_fee, 300)
+            total_cost = max(base_cost + fuel_surcharge + hazmat_fee, pricing['minimum_charge'])
             
             return {
                 'cost': round(total_cost, 2),
@@ -589,43 +264,170 @@ def calculate_transport_cost(
                 'base_cost': round(base_cost, 2),
                 'fuel_surcharge': round(fuel_surcharge, 2),
                 'hazmat_surcharge': hazmat_fee,
-                'note': f"LTL freight: {weight_lbs:,.0f} lbs for {distance_miles:,.0f} miles. Consider FTL (4,500+ kg) for better rates."
+                'note': f"LTL freight: {weight_lbs:,.0f} lbs for {distance_miles:,.0f} miles. Consider FTL ({pricing['ftl_from_kg']:,}+ kg) for better rates."
             }
     
-    elif mode == "air":
-        # Air freight - charged by chargeable weight with minimums
-        vehicle_type = "Air Cargo"
-        
-        # Hazmat air freight rates
-        rate_per_kg = 12.00 if is_hazmat else 5.00
-        
-        # Base cost with minimum
-        base_cost = max(weight_kg * rate_per_kg, 1000)
-        
-        # Handling surcharge for hazmat
-        handling_surcharge = 500 if is_hazmat else 0
-        
-        total_cost = base_cost + handling_surcharge
-        
-        return {
-            'cost': round(total_cost, 2),
-            'vehicle_type': vehicle_type,
-            'num_vehicles': 1,
-            'capacity_per_vehicle_kg': None,
-            'total_capacity_kg': None,
-            'utilization_pct': None,
-            'cost_per_kg': round(total_cost / weight_kg, 2),
-            'base_cost': round(base_cost, 2),
-            'hazmat_surcharge': handling_surcharge,
-            'note': f"Air freight: {weight_kg:,.0f} kg @ ${rate_per_kg:.2f}/kg. Minimum charge: $1,000. DDR batteries prohibited."
-        }
+    # Air freight - charged by chargeable weight with minimums
+    vehicle_type = pricing['label']
+    rate_per_kg = pricing['rate_per_kg']
+    
+    # Base cost with minimum
+    base_cost = max(weight_kg * rate_per_kg, pricing['minimum_charge']) * multiplier
     
-    return {'cost': 0.0, 'error': 'Invalid transport mode'}
+    # Handling surcharge for hazmat
+    handling_surcharge = pricing['hazmat_surcharge']
+    
+    total_cost = base_cost + handling_surcharge
+    
+    return {
+        'cost': round(total_cost, 2),
+        'vehicle_type': vehicle_type,
+        'num_vehicles': 1,
+        'capacity_per_vehicle_kg': None,
+        'total_capacity_kg': None,
+        'utilization_pct': None,
+        'cost_per_kg': round(total_cost / weight_kg, 2),
+        'base_cost': round(base_cost, 2),
+        'hazmat_surcharge': handling_surcharge,
+        'note': f"Air freight: {weight_kg:,.0f} kg @ ${rate_per_kg:.2f}/kg. Minimum charge: ${pricing['minimum_charge']:,.0f}. DDR batteries prohibited."
+    }
+
+def calculate_transport_costs(
+    mode: str,
+    weights_mt,
+    is_hazmat: bool = True,
+    distances_miles=None,
+    lane: str = None
+) -> Dict[str, Any]:
+    """
+    Vectorized calculate_transport_cost over many shipment weights.
+
+    Applies the same container/vehicle tiers as calculate_transport_cost to
+    whole arrays at once (unrounded).
+
+    Args:
+        mode: 'ocean', 'air', or 'truck'
+        weights_mt: Array-like of weights in metric tons
+        is_hazmat: Whether material is hazardous
+        distances_miles: Scalar or array broadcastable to weights (required for truck)
+        lane: 'Origin->Destination' rate lane (default rates when omitted)
+
+    Returns:
+        dict of arrays: 'weight_kg', 'cost', 'cost_per_kg' (NaN for zero weight),
+        'num_vehicles', 'capacity_per_vehicle_kg' and 'utilization_pct' (NaN for
+        LTL/air), 'base_cost', 'hazmat_surcharge', 'fuel_surcharge', 'tier'
+        (index into freight_rates.tier_labels(mode)) and 'vehicle_type'
+    """
+    import numpy as np
+
+    if mode not in ("ocean", "truck", "air"):
+        raise ValueError(f"Invalid transport mode: {mode}")
+
+    rates = get_rates(mode, lane)
+    multiplier = rates['cost_multiplier']
+    weight_kg = np.atleast_1d(np.asarray(weights_mt, dtype=float)) * 1000
+    fuel_surcharge = np.zeros_like(weight_kg)
+    tier = find_tiers(rates, weight_kg)
+
+    # Per-tier vehicle figures, indexed by each shipment's tier
+    vehicles = [t['vehicle'] or {} for t in rates['tiers']]
+    tier_capacity = np.array([v.get('hazmat_capacity_kg' if is_hazmat else 'capacity_kg', np.nan) for v in vehicles], dtype=float)
+    tier_hazmat = np.array([v.get('hazmat_surcharge', 0) if is_hazmat else 0 for v in vehicles], dtype=float)
+
+    if mode == "ocean":
+        tier_base = np.array([v['base_cost'] for v in vehicles], dtype=float) * multiplier
+        capacity = tier_capacity[tier]
+        num_vehicles = np.maximum(np.ceil(weight_kg / capacity), 1)
+        base_cost = num_vehicles * tier_base[tier]
+        hazmat_surcharge = num_vehicles * tier_hazmat[tier]
+
+    elif mode == "truck":
+        if distances_miles is None:
+            raise ValueError("Distance required for truck transport")
+        ltl = rates['ltl']
+        distance = np.broadcast_to(np.asarray(distances_miles, dtype=float), weight_kg.shape)
+        weight_lbs = weight_kg * 2.205
+        ftl = np.array([t['kind'] == 'vehicle' for t in rates['tiers']])[tier]
+        capacity = np.where(ftl, tier_capacity[tier], np.nan)
+        num_vehicles = np.where(ftl, np.maximum(np.ceil(weight_kg / np.where(ftl, capacity, 1.0)), 1), 1)
+
+        # FTL: per truck-mile; LTL: per lb with distance multiplier, fuel surcharge and minimum
+        tier_rate = np.array([v.get('rate_per_mile', 0.0) for v in vehicles], dtype=float)
+        ftl_base = distance * tier_rate[tier] * multiplier * num_vehicles
+        ltl_base = weight_lbs * (ltl['hazmat_rate_per_lb'] if is_hazmat else ltl['rate_per_lb']) * ltl_distance_multipliers(rates, distance) * multiplier
+        ltl_fuel = ltl_base * (ltl['fuel_surcharge_pct'] / 100)
+        base_cost = np.where(ftl, ftl_base, ltl_base)
+        fuel_surcharge = np.where(ftl, 0.0, ltl_fuel)
+        hazmat_surcharge = np.where(ftl, tier_hazmat[tier] * num_vehicles, ltl['hazmat_fee']) if is_hazmat else np.zeros_like(weight_kg)
+        # LTL minimum charge applies to the total
+        ltl_total = np.maximum(ltl_base + ltl_fuel + hazmat_surcharge, ltl['minimum_charge'])
+
+    else:
+        num_vehicles = np.ones_like(weight_kg)
+        capacity = np.full_like(weight_kg, np.nan)
+        rate_per_kg = rates['hazmat_rate_per_kg'] if is_hazmat else rates['rate_per_kg']
+        base_cost = np.maximum(weight_kg * rate_per_kg, rates['minimum_charge']) * multiplier
+        hazmat_surcharge = np.full_like(weight_kg, rates['hazmat_surcharge'] if is_hazmat else 0)
+
+    cost = base_cost + fuel_surcharge + hazmat_surcharge
+    if mode == "truck":
+        cost = np.where(ftl, cost, ltl_total)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cost_per_kg = np.where(weight_kg > 0, cost / weight_kg, np.nan)
+        utilization_pct = weight_kg / (num_vehicles * capacity) * 100
+
+    labels = np.array(rates['labels'], dtype=object)
+    return {
+        'weight_kg': weight_kg,
+        'cost': cost,
+        'cost_per_kg': cost_per_kg,
+        'num_vehicles': num_vehicles.astype(int),
+        'capacity_per_vehicle_kg': capacity,
+        'utilization_pct': utilization_pct,
+        'base_cost': base_cost,
+        'hazmat_surcharge': hazmat_surcharge,
+        'fuel_surcharge': fuel_surcharge,
+        'tier': tier,
+        'vehicle_type': labels[tier]
+    }
+
+def find_cost_breakpoints(curve: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Weights where a cost curve from calculate_transport_costs steps to another
+    vehicle tier or vehicle count (e.g. the next container becomes necessary).
+
+    Args:
+        curve: calculate_transport_costs output over ascending weights
+
+    Returns:
+        One entry per step: the last weight on the lower configuration (its best
+        cost/kg), the first weight on the next one, and the cost either side
+    """
+    import numpy as np
+
+    tier, count = curve['tier'], curve['num_vehicles']
+    steps = np.flatnonzero((tier[1:] != tier[:-1]) | (count[1:] != count[:-1]))
+    return [
+        {
+            'weight_kg': float(curve['weight_kg'][i]),
+            'next_weight_kg': float(curve['weight_kg'][i + 1]),
+            'vehicle_type': curve['vehicle_type'][i],
+            'num_vehicles': int(count[i]),
+            'next_vehicle_type': curve['vehicle_type'][i + 1],
+            'next_num_vehicles': int(count[i + 1]),
+            'cost': round(float(curve['cost'][i]), 2),
+            'next_cost': round(float(curve['cost'][i + 1]), 2),
+            'cost_per_kg': round(float(curve['cost_per_kg'][i]), 4)
+        }
+        for i in steps
+    ]
 
 def get_packaging_requirements(material_type: str, is_damaged: bool = False) -> Dict[str, Any]:
     """Get packaging requirements for material type."""
+    packaging_requirements = current_snapshot().section('packaging_requirements')
     if is_damaged:
-        return PACKAGING_REQUIREMENTS.get("ddr_batteries", {})
+        return packaging_requirements.get("ddr_batteries", {})
     
     material_map = {
         "whole_batteries": "lithium_batteries",
@@ -634,9 +436,9 @@ def get_packaging_requirements(material_type: str, is_damaged: bool = False) ->
     }
     
     pkg_key = material_map.get(material_type, "lithium_batteries")
-    return PACKAGING_REQUIREMENTS.get(pkg_key, {})
+    return packaging_requirements.get(pkg_key, {})
 
 # Access to full database for advanced queries
 def get_full_database() -> Dict[str, Any]:
     """Return the complete regulatory database."""
-    return _REGULATORY_DB
+    return current_snapshot().document
@@ -0,0 +1,331 @@
+"""
+Lot-to-destination assignment optimizer.
+Builds the lot × destination profit matrix (valuation minus freight, blocked
+routes masked out) in one vectorized pass and assigns lots to refineries
+subject to destination capacity limits.
+"""
+
+import logging
+import time
+from typing import Dict, List, Any, Optional
+
+import numpy as np
+
+import backend
+from logistics_data import calculate_transport_costs, get_route_key
+from valuation_engine import (
+    PRICE_KEYS, build_exposures, revenue_coefficients, valuation_prices,
+    DEFAULT_NI_PRODUCT, DEFAULT_LI_PRODUCT
+)
+
+logger = logging.getLogger(__name__)
+
+HAZMAT_MATERIALS = ('whole_batteries', 'black_mass')
+
+# Local search passes after the greedy construction
+MAX_IMPROVEMENT_PASSES = 10
+
+
+def _destination_distance(destination: Dict[str, Any], origin: str) -> Optional[float]:
+    """Truck distance for a destination: scalar, or mapping keyed by origin."""
+    distance = destination.get('distance_miles')
+    if isinstance(distance, dict):
+        distance = distance.get(origin)
+    return float(distance) if distance is not None else None
+
+
+def build_profit_matrix(
+    lots: List[Dict[str, Any]],
+    destinations: List[Dict[str, Any]],
+    market_data: Dict[str, float]
+) -> Dict[str, Any]:
+    """
+    Build the lot × destination profit matrix.
+
+    Args:
+        lots: calculate_valuation input_params, plus 'id', 'origin',
+              'material_type' and 'is_ddr'
+        destinations: dicts with 'id', 'country', 'mode', optional
+              'distance_miles' (scalar or {origin: miles}), 'capacity_kg' and
+              refinery terms ('hydromet_recovery', 'refining_opex_base',
+              'ni_product', 'li_product') overriding the lot's own
+        market_data: Product (salt) prices per kg, as from get_market_data
+
+    Returns:
+        dict with 'profit', 'valuation_profit', 'freight' (N, D) arrays,
+        'feasible' (N, D) bool mask and per-cell 'reasons' for blocked cells
+    """
+    n, d = len(lots), len(destinations)
+    exposures = build_exposures(lots)
+    lot_prices = np.array([valuation_prices(lot, market_data) for lot in lots]).reshape(n, len(PRICE_KEYS))
+
+    # Revenue: contained Ni/Co/Li mass × destination recovery/product coefficients × lot prices
+    coef = np.array([
+        revenue_coefficients(
+            float(dest.get('hydromet_recovery', 0.95)),
+            dest.get('ni_product', DEFAULT_NI_PRODUCT),
+            dest.get('li_product', DEFAULT_LI_PRODUCT)
+        ) for dest in destinations
+    ]).reshape(d, 3, len(PRICE_KEYS))
+    revenue = np.einsum('im,jmk,ik->ij', exposures['masses'][:, :3], coef, lot_prices)
+
+    # Refining OPEX is charged by the destination refinery; pre-treatment stays with the lot
+    lot_refining = np.array([float(lot.get('refining_opex_base', 1500.0)) for lot in lots])
+    dest_refining = np.array([
+        float(dest['refining_opex_base']) if dest.get('refining_opex_base') is not None else np.nan
+        for dest in destinations
+    ])
+    refining_rate = np.where(np.isnan(dest_refining)[None, :], lot_refining[:, None], dest_refining[None, :])
+    pre_treat = exposures['opex'] - exposures['net_bm_weight'] / 1000.0 * lot_refining
+    opex = pre_treat[:, None] + exposures['net_bm_weight'][:, None] / 1000.0 * refining_rate
+
+    material_cost = np.einsum('ik,ik->i', exposures['cost'], lot_prices)
+    valuation_profit = revenue - material_cost[:, None] - opex
+
+    # Feasibility is decided once per (lot profile, destination) and broadcast
+    # to the profile's lots; freight is priced per (mode, hazmat, distance)
+    # group with one vectorized call over the lot weights
+    freight = np.zeros((n, d))
+    feasible = np.ones((n, d), dtype=bool)
+    reasons = {}
+    weights_mt = np.array([float(lot['gross_weight']) / 1000.0 for lot in lots])
+
+    profiles = {}
+    for i, lot in enumerate(lots):
+        key = (lot.get('origin', 'US'), lot.get('material_type', 'black_mass'), bool(lot.get('is_ddr', False)))
+        profiles.setdefault(key, []).append(i)
+
+    for (origin, material_type, is_ddr), members in profiles.items():
+        rows = np.array(members)
+        is_hazmat = material_type in HAZMAT_MATERIALS
+        route_cache = {}
+
+        for j, dest in enumerate(destinations):
+            mode = dest.get('mode', 'ocean')
+            distance = _destination_distance(dest, origin)
+            reason = None
+            if is_ddr and mode == 'air':
+                reason = 'DDR batteries prohibited from air transport'
+            else:
+                if dest['country'] not in route_cache:
+                    route_cache[dest['country']] = backend.check_route_feasibility(origin, dest['country'], material_type)
+                route = route_cache[dest['country']]
+                if not route['allowed']:
+                    reason = f"Route {origin}->{dest['country']} is {route['status']}"
+                elif mode not in ('ocean', 'truck', 'air'):
+                    reason = 'Invalid transport mode'
+                elif mode == 'truck' and distance is None:
+                    reason = 'Distance required for truck transport'
+
+            if reason is not None:
+                feasible[rows, j] = False
+                reasons.update(((i, j), reason) for i in members)
+                continue
+            freight[rows, j] = calculate_transport_costs(
+                mode, weights_mt[rows], is_hazmat, distance, lane=get_route_key(origin, dest['country'])
+            )['cost']
+
+    profit = np.where(feasible, valuation_profit - freight, -np.inf)
+
+    return {
+        'profit': profit,
+        'valuation_profit': valuation_profit,
+        'freight': freight,
+        'feasible': feasible,
+        'reasons': reasons
+    }
+
+
+def solve_assignment(
+    profit: np.ndarray,
+    weights_kg: np.ndarray,
+    capacities_kg: np.ndarray,
+    skip_unprofitable: bool = False
+) -> np.ndarray:
+    """
+    Assign each lot to at most one destination, maximizing total profit.
+
+    Uses the per-lot optimum when capacities allow it; otherwise a regret-based
+    greedy construction followed by shift/swap local search.
+
+    Args:
+        profit: (N, D) profit matrix, -inf where infeasible
+        weights_kg: (N,) lot weights
+        capacities_kg: (D,) destination capacities (np.inf for unlimited)
+        skip_unprofitable: Leave lots unassigned when their best profit is negative
+
+    Returns:
+        np.ndarray (N,) of destination indices, -1 for unassigned lots
+    """
+    n, d = profit.shape
+    assignment = np.full(n, -1)
+    if n == 0 or d == 0:
+        return assignment
+
+    candidates = np.isfinite(profit)
+    if skip_unprofitable:
+        candidates &= profit >= 0
+    candidates &= weights_kg[:, None] <= capacities_kg[None, :]
+    masked = np.where(candidates, profit, -np.inf)
+
+    # Unconstrained optimum: every lot to its best destination
+    best = np.argmax(masked, axis=1)
+    has_option = np.isfinite(masked[np.arange(n), best])
+    load = np.bincount(best[has_option], weights=weights_kg[has_option], minlength=d)
+    if np.all(load <= capacities_kg):
+        assignment[has_option] = best[has_option]
+        return assignment
+
+    # Regret greedy: place the lot that loses most by missing its best option first
+    remaining = capacities_kg.astype(float).copy()
+    pending = has_option.copy()
+    while pending.any():
+        fits = candidates & (weights_kg[:, None] <= remaining[None, :]) & pending[:, None]
+        options = np.where(fits, masked, -np.inf)
+        top2 = -np.sort(-options, axis=1)[:, :2] if d > 1 else np.hstack([options, np.full((n, 1), -np.inf)])
+        placeable = np.isfinite(top2[:, 0])
+        pending &= placeable
+        if not pending.any():
+            break
+        with np.errstate(invalid='ignore'):
+            regret = np.where(np.isfinite(top2[:, 1]), top2[:, 0] - top2[:, 1], np.inf)
+        regret = np.where(pending, regret, -np.inf)
+        i = int(np.argmax(regret))
+        j = int(np.argmax(options[i]))
+        assignment[i] = j
+        remaining[j] -= weights_kg[i]
+        pending[i] = False
+
+    # Local search: shift a lot to a better destination, or swap two lots
+    for _ in range(MAX_IMPROVEMENT_PASSES):
+        improved = False
+        for i in range(n):
+            current = assignment[i]
+            current_profit = masked[i, current] if current >= 0 else (0.0 if skip_unprofitable else -np.inf)
+            room = remaining + (weights_kg[i] if current >= 0 else 0.0) * (np.arange(d) == current)
+            with np.errstate(invalid='ignore'):
+                gains = np.where(candidates[i] & (weights_kg[i] <= room), masked[i] - current_profit, -np.inf)
+            j = int(np.argmax(gains))
+            if gains[j] > 1e-9 and j != current:
+                if current >= 0:
+                    remaining[current] += weights_kg[i]
+                remaining[j] -= weights_kg[i]
+                assignment[i] = j
+                improved = True
+
+        assigned = np.flatnonzero(assignment >= 0)
+        if len(assigned) > 1:
+            a = assignment[assigned]
+            w = weights_kg[assigned]
+            p_cur = masked[assigned, a]
+            # gain[x, y] for lot x taking y's destination and vice versa
+            p_cross = masked[assigned[:, None], a[None, :]]
+            gain = p_cross + p_cross.T - p_cur[:, None] - p_cur[None, :]
+            delta_w = w[:, None] - w[None, :]
+            fits_y = remaining[a][None, :] >= delta_w
+            fits_x = remaining[a][:, None] >= -delta_w
+            gain = np.where(fits_x & fits_y & (a[:, None] != a[None, :]), gain, -np.inf)
+            np.fill_diagonal(gain, -np.inf)
+            x, y = np.unravel_index(int(np.argmax(gain)), gain.shape)
+            if gain[x, y] > 1e-9:
+                lx, ly = assigned[x], assigned[y]
+                jx, jy = assignment[lx], assignment[ly]
+                remaining[jx] += weights_kg[lx] - weights_kg[ly]
+                remaining[jy] += weights_kg[ly] - weights_kg[lx]
+                assignment[lx], assignment[ly] = jy, jx
+                improved = True
+
+        if not improved:
+            break
+
+    return assignment
+
+
+def optimize_lot_assignment(
+    lots: List[Dict[str, Any]],
+    destinations: List[Dict[str, Any]],
+    market_data: Dict[str, float],
+    skip_unprofitable: bool = False,
+    include_matrix: bool = False
+) -> Dict[str, Any]:
+    """
+    Decide which destination each lot should go to.
+
+    Args:
+        lots: Lot dicts (see build_profit_matrix)
+        destinations: Destination dicts (see build_profit_matrix)
+        market_data: Product (salt) prices per kg
+        skip_unprofitable: Leave loss-making lots unassigned
+        include_matrix: Include the full profit matrix in the result
+
+    Returns:
+        dict with per-lot assignments, per-destination loads, totals and timing
+    """
+    start = time.perf_counter()
+
+    matrix = build_profit_matrix(lots, destinations, market_data)
+    weights = np.array([float(lot['gross_weight']) for lot in lots])
+    capacities = np.array([
+        float(dest['capacity_kg']) if dest.get('capacity_kg') is not None else np.inf
+        for dest in destinations
+    ])
+    assignment = solve_assignment(matrix['profit'], weights, capacities, skip_unprofitable)
+
+    lot_ids = [lot.get('id', f"lot_{i + 1}") for i, lot in enumerate(lots)]
+    dest_ids = [dest.get('id', dest.get('country')) for dest in destinations]
+
+    assignments = []
+    unassigned = []
+    for i, j in enumerate(assignment):
+        if j < 0:
+            feasible_any = bool(matrix['feasible'][i].any())
+            unassigned.append({
+                'lot_id': lot_ids[i],
+                'reason': 'Insufficient destination capacity or unprofitable' if feasible_any
+                          else 'No feasible destination'
+            })
+            continue
+        assignments.append({
+            'lot_id': lot_ids[i],
+            'destination_id': dest_ids[j],
+            'net_profit': round(float(matrix['profit'][i, j]), 2),
+            'valuation_profit': round(float(matrix['valuation_profit'][i, j]), 2),
+            'freight_cost': round(float(matrix['freight'][i, j]), 2),
+            'weight_kg': float(weights[i])
+        })
+
+    destination_loads = []
+    for j, dest_id in enumerate(dest_ids):
+        on_dest = assignment == j
+        assigned_kg = float(weights[on_dest].sum())
+        capacity = None if np.isinf(capacities[j]) else float(capacities[j])
+        destination_loads.append({
+            'destination_id': dest_id,
+            'num_lots': int(on_dest.sum()),
+            'assigned_kg': assigned_kg,
+            'capacity_kg': capacity,
+            'utilization_pct': round(assigned_kg / capacity * 100, 1) if capacity else None
+        })
+
+    result = {
+        'assignments': assignments,
+        'unassigned': unassigned,
+        'destinations': destination_loads,
+        'total_profit': round(sum(a['net_profit'] for a in assignments), 2),
+        'total_freight': round(sum(a['freight_cost'] for a in assignments), 2),
+        'solve_ms': round((time.perf_counter() - start) * 1000, 1)
+    }
+
+    if include_matrix:
+        result['matrix'] = {
+            'lot_ids': lot_ids,
+            'destination_ids': dest_ids,
+            'profit': [[round(float(v), 2) if np.isfinite(v) else None for v in row] for row in matrix['profit']],
+            'blocked': [
+                {'lot_id': lot_ids[i], 'destination_id': dest_ids[j], 'reason': reason}
+                for (i, j), reason in matrix['reasons'].items()
+            ]
+        }
+
+    logger.info(f"Assigned {len(assignments)}/{len(lots)} lots across {len(destinations)} destinations in {result['solve_ms']} ms")
+    return result
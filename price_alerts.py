@@ -0,0 +1,367 @@
+"""
+Price and margin alert engine.
+Thresholds are kept in sorted per-key indexes, so each snapshot only bisects
+the range of thresholds crossed since the previous value instead of checking
+every alert. Triggered alerts are delivered through pluggable dispatchers
+(in-process queue, webhook posted from a background worker).
+"""
+
+import bisect
+import json
+import logging
+import os
+import queue
+import threading
+import uuid
+from collections import deque
+from datetime import datetime
+from typing import Dict, List, Any, Optional
+
+import requests
+
+from valuation_engine import PRICE_KEYS
+
+logger = logging.getLogger(__name__)
+
+ALERTS_PATH = os.environ.get(
+    'PRICE_ALERTS_PATH',
+    os.path.join(os.path.dirname(__file__), 'data', 'price_alerts.json')
+)
+ALERT_WEBHOOK_URL = os.environ.get('ALERT_WEBHOOK_URL', '')
+
+# Per-alert webhook URLs must be listed here (comma-separated, exact match)
+ALERT_WEBHOOK_ALLOWED_URLS = frozenset(
+    url.strip() for url in os.environ.get('ALERT_WEBHOOK_ALLOWED_URLS', '').split(',') if url.strip()
+)
+
+# Undelivered webhook events held for the worker; further events are dropped
+WEBHOOK_QUEUE_SIZE = 1000
+
+DIRECTIONS = ('below', 'above')
+ALERT_KINDS = ('price', 'quote_margin')
+
+# Recently triggered alerts kept for GET /api/alerts/triggered
+RECENT_TRIGGERS = 200
+
+# Sorts after every alert id, so (threshold, _MAX_ID) bounds all entries at threshold
+_MAX_ID = '\uffff'
+
+
+def alert_key(kind: str, target: str) -> str:
+    """Index key for an alert: price key (e.g. 'LCE') or 'quote:<id>'."""
+    return target if kind == 'price' else f"quote:{target}"
+
+
+def webhook_allowed(url: str) -> bool:
+    """Whether a per-alert webhook URL is the default or in ALERT_WEBHOOK_ALLOWED_URLS."""
+    return url == ALERT_WEBHOOK_URL or url in ALERT_WEBHOOK_ALLOWED_URLS
+
+
+class QueueDispatcher:
+    """Delivers triggered alerts to an in-process queue (local stand-in for consumers and tests)."""
+
+    def __init__(self, target: Optional[queue.Queue] = None):
+        self.queue = target or queue.Queue()
+
+    def send(self, event: Dict[str, Any]):
+        self.queue.put(event)
+
+
+class WebhookDispatcher:
+    """
+    POSTs triggered alerts as JSON to a webhook URL.
+
+    send() only queues the event; a daemon worker thread (started on first
+    use) delivers it, so evaluation never waits on the network. A per-alert
+    webhook_url is used only if webhook_allowed() accepts it.
+    """
+
+    def __init__(self, url: str, timeout: float = 5.0, queue_size: int = WEBHOOK_QUEUE_SIZE):
+        self.url = url
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.queue = queue.Queue(maxsize=queue_size)
+        self._worker = None
+        self._worker_lock = threading.Lock()
+
+    def send(self, event: Dict[str, Any]):
+        url = event.get('webhook_url') or self.url
+        if not url:
+            return
+        if not webhook_allowed(url):
+            logger.warning(f"Alert webhook {url} is not in ALERT_WEBHOOK_ALLOWED_URLS; event {event['alert_id']} not sent")
+            return
+        self._ensure_worker()
+        try:
+            self.queue.put_nowait((url, event))
+        except queue.Full:
+            logger.warning(f"Alert webhook queue full; event {event['alert_id']} dropped")
+
+    def _ensure_worker(self):
+        if self._worker is not None:
+            return
+        with self._worker_lock:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name='alert-webhook', daemon=True)
+                self._worker.start()
+
+    def _run(self):
+        while True:
+            url, event = self.queue.get()
+            try:
+                self._post(url, event)
+            finally:
+                self.queue.task_done()
+
+    def _post(self, url: str, event: Dict[str, Any]):
+        try:
+            response = self.session.post(url, json=event, timeout=self.timeout)
+            if response.status_code >= 400:
+                logger.warning(f"Alert webhook {url} returned status {response.status_code}")
+        except requests.exceptions.RequestException as e:
+            logger.warning(f"Alert webhook {url} failed: {str(e)}")
+
+
+class AlertEngine:
+    """
+    Threshold alerts over price keys and quote margins.
+
+    An alert triggers when its value crosses the threshold between two
+    consecutive observations: 'below' when it falls under the threshold,
+    'above' when it rises to or over it. On the first observation of a key,
+    every alert whose condition already holds triggers.
+    """
+
+    def __init__(self, path: Optional[str] = None, dispatchers: Optional[List[Any]] = None):
+        self.path = path or ALERTS_PATH
+        self.dispatchers = dispatchers if dispatchers is not None else [WebhookDispatcher(ALERT_WEBHOOK_URL)]
+        self._lock = threading.Lock()
+        self._mtime = None
+        self.alerts: Dict[str, Dict[str, Any]] = {}
+        self.last_values: Dict[str, float] = {}
+        self.recent = deque(maxlen=RECENT_TRIGGERS)
+        # key -> direction -> sorted list of (threshold, alert_id)
+        self._index: Dict[str, Dict[str, List[tuple]]] = {}
+        self._load()
+
+    # ------------------------------------------------------------------
+    # Persistence and index maintenance
+    # ------------------------------------------------------------------
+
+    def _load(self):
+        if os.path.exists(self.path):
+            with open(self.path, 'r') as f:
+                state = json.load(f)
+            self._mtime = os.path.getmtime(self.path)
+            self.alerts = {a['id']: a for a in state.get('alerts', [])}
+            self.last_values = state.get('last_values', {})
+        self._index = {}
+        for alert in self.alerts.values():
+            if alert['active']:
+                self._index_add(alert)
+
+    def _refresh_if_changed(self):
+        """Reload when another process (e.g. a second API worker) saved the alerts."""
+        if os.path.exists(self.path) and os.path.getmtime(self.path) != self._mtime:
+            self._load()
+
+    def _save(self):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({'alerts': list(self.alerts.values()), 'last_values': self.last_values}, f, indent=2)
+        os.replace(tmp_path, self.path)
+        self._mtime = os.path.getmtime(self.path)
+
+    def _index_add(self, alert: Dict[str, Any]):
+        by_direction = self._index.setdefault(alert['key'], {'below': [], 'above': []})
+        bisect.insort(by_direction[alert['direction']], (alert['threshold'], alert['id']))
+
+    def _index_remove(self, alert: Dict[str, Any]):
+        entries = self._index.get(alert['key'], {}).get(alert['direction'], [])
+        pos = bisect.bisect_left(entries, (alert['threshold'], alert['id']))
+        if pos < len(entries) and entries[pos] == (alert['threshold'], alert['id']):
+            del entries[pos]
+
+    # ------------------------------------------------------------------
+    # Alert management
+    # ------------------------------------------------------------------
+
+    def add_alert(
+        self,
+        kind: str,
+        target: str,
+        direction: str,
+        threshold: float,
+        repeat: bool = False,
+        webhook_url: Optional[str] = None,
+        note: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Register an alert.
+
+        Args:
+            kind: 'price' (target is a price key, e.g. 'LCE') or
+                  'quote_margin' (target is a quote id, value is margin_pct)
+            target: Price key or quote id
+            direction: 'below' or 'above'
+            threshold: Trigger level (USD per kg, or margin %)
+            repeat: Keep the alert active after it triggers
+            webhook_url: Optional per-alert webhook overriding the default
+                         (must be listed in ALERT_WEBHOOK_ALLOWED_URLS)
+            note: Optional free-text description
+
+        Returns:
+            The stored alert
+        """
+        if kind not in ALERT_KINDS:
+            raise ValueError(f"Unknown alert kind: {kind} (expected one of {', '.join(ALERT_KINDS)})")
+        if direction not in DIRECTIONS:
+            raise ValueError(f"Unknown direction: {direction} (expected 'below' or 'above')")
+        if kind == 'price' and target not in PRICE_KEYS:
+            raise ValueError(f"Unknown price key: {target} (expected one of {', '.join(PRICE_KEYS)})")
+        if webhook_url and not webhook_allowed(webhook_url):
+            raise ValueError(f"webhook_url is not allowed: {webhook_url} (see ALERT_WEBHOOK_ALLOWED_URLS)")
+
+        alert = {
+            'id': f"A-{uuid.uuid4().hex[:8].upper()}",
+            'kind': kind,
+            'target': target,
+            'key': alert_key(kind, target),
+            'direction': direction,
+            'threshold': float(threshold),
+            'repeat': repeat,
+            'webhook_url': webhook_url,
+            'note': note,
+            'active': True,
+            'created_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'last_triggered_at': None,
+            'trigger_count': 0
+        }
+        with self._lock:
+            self._refresh_if_changed()
+            self.alerts[alert['id']] = alert
+            self._index_add(alert)
+            self._save()
+        return alert
+
+    def remove_alert(self, alert_id: str) -> bool:
+        """Delete an alert; returns False if it does not exist."""
+        with self._lock:
+            self._refresh_if_changed()
+            alert = self.alerts.pop(alert_id, None)
+            if alert is None:
+                return False
+            if alert['active']:
+                self._index_remove(alert)
+            self._save()
+            return True
+
+    def list_alerts(self, active_only: bool = False) -> List[Dict[str, Any]]:
+        with self._lock:
+            self._refresh_if_changed()
+            return [a for a in self.alerts.values() if a['active'] or not active_only]
+
+    # ------------------------------------------------------------------
+    # Evaluation
+    # ------------------------------------------------------------------
+
+    def _crossed(self, key: str, previous: Optional[float], value: float) -> List[str]:
+        """Alert ids whose thresholds lie in the range crossed from previous to value."""
+        by_direction = self._index.get(key)
+        if not by_direction:
+            return []
+
+        crossed = []
+        below = by_direction['below']
+        if below:
+            # falls under t: value < t <= previous (first observation: every t > value)
+            lo = bisect.bisect_right(below, (value, _MAX_ID))
+            hi = len(below) if previous is None else bisect.bisect_right(below, (previous, _MAX_ID))
+            crossed.extend(alert_id for _, alert_id in below[lo:hi])
+
+        above = by_direction['above']
+        if above:
+            # rises to t: previous < t <= value (first observation: every t <= value)
+            lo = 0 if previous is None else bisect.bisect_right(above, (previous, _MAX_ID))
+            hi = bisect.bisect_right(above, (value, _MAX_ID))
+            crossed.extend(alert_id for _, alert_id in above[lo:hi])
+
+        return crossed
+
+    def evaluate(self, values: Dict[str, float], source: str = 'snapshot') -> List[Dict[str, Any]]:
+        """
+        Check new values against the index and dispatch triggered alerts.
+
+        Args:
+            values: Observed values keyed by alert key (price keys, 'quote:<id>')
+            source: Label included in delivered events
+
+        Returns:
+            List of triggered alert events
+        """
+        events = []
+        with self._lock:
+            self._refresh_if_changed()
+            now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            for key, value in values.items():
+                if value is None:
+                    continue
+                value = float(value)
+                previous = self.last_values.get(key)
+                self.last_values[key] = value
+
+                for alert_id in self._crossed(key, previous, value):
+                    alert = self.alerts[alert_id]
+                    alert['last_triggered_at'] = now
+                    alert['trigger_count'] += 1
+                    if not alert['repeat']:
+                        alert['active'] = False
+                        self._index_remove(alert)
+                    events.append({
+                        'alert_id': alert_id,
+                        'kind': alert['kind'],
+                        'target': alert['target'],
+                        'direction': alert['direction'],
+                        'threshold': alert['threshold'],
+                        'value': value,
+                        'previous_value': previous,
+                        'note': alert['note'],
+                        'webhook_url': alert['webhook_url'],
+                        'source': source,
+                        'triggered_at': now
+                    })
+
+            if values:
+                self._save()
+            self.recent.extend(events)
+
+        for event in events:
+            for dispatcher in self.dispatchers:
+                try:
+                    dispatcher.send(event)
+                except Exception as e:
+                    logger.error(f"Alert dispatch failed for {event['alert_id']}: {str(e)}")
+
+        if events:
+            logger.info(f"Triggered {len(events)} alert(s) from {source}")
+        return events
+
+    def evaluate_snapshot(self, market_data: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """
+        Evaluate price alerts against a market snapshot (get_market_data output).
+
+        Thresholds are USD per kg: prices in another currency are divided by
+        the snapshot's 'FX' rate, and only PRICE_KEYS are observed.
+        """
+        fx = market_data.get('FX') or 1.0
+        values = {
+            k: market_data[k] / fx for k in PRICE_KEYS
+            if isinstance(market_data.get(k), (int, float)) and not isinstance(market_data.get(k), bool)
+        }
+        return self.evaluate(values, source='market_snapshot')
+
+    def evaluate_quote_margins(self, mark_result: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Evaluate quote margin alerts against QuoteBook.mark_to_market output."""
+        values = {alert_key('quote_margin', c['quote_id']): c['margin_pct'] for c in mark_result.get('changes', [])}
+        return self.evaluate(values, source='quote_mark_to_market')
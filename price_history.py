@@ -0,0 +1,201 @@
+"""
+Local price history store.
+Keeps dated price snapshots (per kg, same keys as get_market_data) in a CSV
+file and loads them as a dense date × price-key matrix for vectorized use.
+"""
+
+import csv
+import io
+import logging
+import os
+import threading
+from datetime import datetime
+from typing import Dict, Any, Optional, Union, IO, Callable, List
+
+import numpy as np
+
+from valuation_engine import PRICE_KEYS, PRICE_INDEX
+
+logger = logging.getLogger(__name__)
+
+HISTORY_PATH = os.environ.get(
+    'PRICE_HISTORY_PATH',
+    os.path.join(os.path.dirname(__file__), 'data', 'price_history.csv')
+)
+
+# Callbacks notified with every new market snapshot
+_snapshot_listeners: List[Callable[[Dict[str, Any]], None]] = []
+
+# Last day known to be in the store, per path (spares a file read per request)
+_recorded_days: Dict[str, np.datetime64] = {}
+_record_lock = threading.Lock()
+
+
+def _parse_date(value: str) -> np.datetime64:
+    """Parse 'YYYY-MM-DD' (optionally followed by a time) into a day-resolution date."""
+    return np.datetime64(value.strip()[:10], 'D')
+
+
+class PriceHistory:
+    """
+    Dated price matrix.
+
+    Rows are dates in ascending order, columns follow PRICE_KEYS.
+    Missing observations are NaN.
+    """
+
+    def __init__(self, dates: np.ndarray, prices: np.ndarray):
+        order = np.argsort(dates, kind='stable')
+        self.dates = np.asarray(dates, dtype='datetime64[D]')[order]
+        self.prices = np.asarray(prices, dtype=float).reshape(len(self.dates), len(PRICE_KEYS))[order]
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+    @classmethod
+    def empty(cls) -> 'PriceHistory':
+        return cls(np.array([], dtype='datetime64[D]'), np.zeros((0, len(PRICE_KEYS))))
+
+    @classmethod
+    def from_csv(cls, source: Union[str, IO], units: str = 'per_kg') -> 'PriceHistory':
+        """
+        Load history from CSV with a 'date' column and any subset of PRICE_KEYS columns.
+
+        Args:
+            source: File path, open file, or raw CSV text
+            units: 'per_kg' (default) or 'per_tonne' (divided by 1000 on load)
+
+        Returns:
+            PriceHistory (duplicate dates keep the last row)
+        """
+        if isinstance(source, str) and '\n' not in source and os.path.exists(source):
+            with open(source, 'r', newline='') as f:
+                return cls.from_csv(f, units)
+        if isinstance(source, str):
+            source = io.StringIO(source)
+
+        reader = csv.DictReader(source)
+        if not reader.fieldnames or 'date' not in [f.strip().lower() for f in reader.fieldnames]:
+            raise ValueError("Price history CSV must have a 'date' column")
+
+        columns = {}
+        date_col = None
+        for name in reader.fieldnames:
+            key = name.strip()
+            if key.lower() == 'date':
+                date_col = name
+            elif key in PRICE_INDEX:
+                columns[name] = PRICE_INDEX[key]
+
+        scale = 1000.0 if units == 'per_tonne' else 1.0
+        rows = {}
+        for row in reader:
+            if not row.get(date_col):
+                continue
+            values = np.full(len(PRICE_KEYS), np.nan)
+            for name, idx in columns.items():
+                cell = (row.get(name) or '').strip().replace(',', '')
+                if cell:
+                    values[idx] = float(cell) / scale
+            rows[_parse_date(row[date_col])] = values
+
+        if not rows:
+            return cls.empty()
+        dates = np.array(list(rows.keys()), dtype='datetime64[D]')
+        return cls(dates, np.vstack(list(rows.values())))
+
+    def to_csv(self, path: str):
+        """Write history to CSV (empty cells for missing observations)."""
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['date'] + list(PRICE_KEYS))
+            for date, row in zip(self.dates, self.prices):
+                writer.writerow([str(date)] + ['' if np.isnan(v) else f"{v:.6f}" for v in row])
+        os.replace(tmp_path, path)
+
+    def between(self, start: Optional[str] = None, end: Optional[str] = None) -> 'PriceHistory':
+        """Rows with start <= date <= end (inclusive, either bound optional)."""
+        lo = 0 if start is None else int(np.searchsorted(self.dates, _parse_date(start), side='left'))
+        hi = len(self.dates) if end is None else int(np.searchsorted(self.dates, _parse_date(end), side='right'))
+        return PriceHistory(self.dates[lo:hi], self.prices[lo:hi])
+
+    def filled(self, base: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Dense price matrix: gaps forward-filled, leading gaps and absent
+        columns taken from base (zeros if not given).
+        """
+        prices = self.prices.copy()
+        if len(prices) == 0:
+            return prices
+        t = np.arange(len(prices))[:, None]
+        last_seen = np.maximum.accumulate(np.where(np.isnan(prices), -1, t), axis=0)
+        prices = np.where(last_seen >= 0, prices[np.maximum(last_seen, 0), np.arange(prices.shape[1])], np.nan)
+        fallback = np.zeros(len(PRICE_KEYS)) if base is None else np.asarray(base, dtype=float)
+        return np.where(np.isnan(prices), fallback[None, :], prices)
+
+    def with_snapshot(self, date: np.datetime64, prices: Dict[str, float]) -> 'PriceHistory':
+        """Return a copy with the snapshot for `date` added (or replaced)."""
+        values = np.full(len(PRICE_KEYS), np.nan)
+        for key, idx in PRICE_INDEX.items():
+            if prices.get(key) is not None:
+                values[idx] = float(prices[key])
+        keep = self.dates != date
+        return PriceHistory(
+            np.append(self.dates[keep], date),
+            np.vstack([self.prices[keep], values[None, :]])
+        )
+
+
+def load_history(path: Optional[str] = None) -> PriceHistory:
+    """Load the local history store (empty history if the file does not exist)."""
+    path = path or HISTORY_PATH
+    if not os.path.exists(path):
+        return PriceHistory.empty()
+    return PriceHistory.from_csv(path)
+
+
+def record_snapshot(market_data: Dict[str, Any], path: Optional[str] = None) -> PriceHistory:
+    """
+    Append a market snapshot (get_market_data output in USD) to the local store.
+    One row per day is kept; a later snapshot on the same day replaces it.
+    """
+    path = path or HISTORY_PATH
+    timestamp = market_data.get('timestamp') or datetime.now().strftime('%Y-%m-%d')
+    day = _parse_date(timestamp)
+    with _record_lock:
+        history = load_history(path).with_snapshot(day, market_data)
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        history.to_csv(path)
+        _recorded_days[path] = day
+    logger.info(f"Recorded price snapshot for {timestamp[:10]} ({len(history)} days stored)")
+    return history
+
+
+def needs_daily_snapshot(path: Optional[str] = None) -> bool:
+    """Whether the store has no snapshot for today yet."""
+    path = path or HISTORY_PATH
+    today = np.datetime64(datetime.now().strftime('%Y-%m-%d'), 'D')
+    with _record_lock:
+        if _recorded_days.get(path) == today:
+            return False
+        history = load_history(path)
+        if len(history) and history.dates[-1] == today:
+            _recorded_days[path] = today
+            return False
+        return True
+
+
+def subscribe(callback: Callable[[Dict[str, Any]], None]):
+    """Register a callback invoked with each published market snapshot."""
+    if callback not in _snapshot_listeners:
+        _snapshot_listeners.append(callback)
+
+
+def publish_snapshot(market_data: Dict[str, Any]):
+    """Notify subscribers of a new market snapshot; listener errors are logged, not raised."""
+    for callback in list(_snapshot_listeners):
+        try:
+            callback(market_data)
+        except Exception as e:
+            logger.error(f"Snapshot listener {getattr(callback, '__name__', callback)} failed: {str(e)}")
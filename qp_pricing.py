@@ -0,0 +1,292 @@
+"""
+Quotational-period (QP) average pricing.
+Builds calendar-day prefix sums over the price history so any window average
+is O(1), and settles open contracts on QP-averaged prices in bulk.
+"""
+
+import logging
+from datetime import date
+from typing import Dict, Iterable, List, Any, Optional, Tuple, Union
+
+import numpy as np
+
+from price_history import PriceHistory, _parse_date
+from valuation_engine import (
+    PRICE_KEYS, PRICE_INDEX, build_exposures, value_exposures, valuation_prices
+)
+
+logger = logging.getLogger(__name__)
+
+# Supported QP conventions
+QP_TYPES = ('month', 'window', 'rolling')
+
+# Exchange holidays: a list of dates, or a ready-made numpy business-day calendar
+Holidays = Union[Iterable[str], np.busdaycalendar]
+
+
+def trading_calendar(holidays: Optional[Holidays] = None) -> np.busdaycalendar:
+    """
+    Mon-Fri business-day calendar without the given exchange holidays.
+
+    Args:
+        holidays: ISO dates the exchange is closed (e.g. LME's Dec 25 and 26),
+                  or an np.busdaycalendar that is used as is
+
+    Raises:
+        ValueError: if a holiday is not an ISO date string
+    """
+    if isinstance(holidays, np.busdaycalendar):
+        return holidays
+    if isinstance(holidays, str):
+        raise ValueError("Holidays must be a list of ISO date strings")
+    dates = []
+    for value in holidays or []:
+        if not isinstance(value, str):
+            raise ValueError(f"Holidays must be ISO date strings, got {type(value).__name__}")
+        dates.append(_parse_date(value))
+    return np.busdaycalendar(holidays=np.array(dates, dtype='datetime64[D]'))
+
+
+class PrefixSumIndex:
+    """
+    Calendar-day prefix sums of prices and observation counts.
+
+    Days without an observation contribute nothing, so window averages are the
+    mean of the observed (e.g. LME trading-day) prices inside the window.
+    Trading days (Mon-Fri less the calendar's holidays) without an observation
+    are counted as gaps.
+    """
+
+    def __init__(self, history: PriceHistory, holidays: Optional[Holidays] = None):
+        if len(history) == 0:
+            raise ValueError("Price history is empty")
+
+        self.calendar = trading_calendar(holidays)
+        self.origin = history.dates[0]
+        self.last_date = history.dates[-1]
+        num_days = int((self.last_date - self.origin).astype(int)) + 1
+        offsets = (history.dates - self.origin).astype(int)
+
+        values = np.zeros((num_days, len(PRICE_KEYS)))
+        counts = np.zeros((num_days, len(PRICE_KEYS)))
+        observed = ~np.isnan(history.prices)
+        values[offsets] = np.where(observed, history.prices, 0.0)
+        counts[offsets] = observed
+
+        # Trading days without an observation, per key
+        business_days = np.is_busday(self.origin + np.arange(num_days), busdaycal=self.calendar)
+        missing = business_days[:, None] & (counts == 0)
+
+        # Leading zero row: sum over days [lo, hi] = S[hi + 1] - S[lo]
+        zero_row = np.zeros((1, len(PRICE_KEYS)))
+        self.sums = np.vstack([zero_row, np.cumsum(values, axis=0)])
+        self.counts = np.vstack([zero_row, np.cumsum(counts, axis=0)])
+        self.missing = np.vstack([zero_row, np.cumsum(missing, axis=0)])
+        self.recorded_keys = observed.any(axis=0)
+        self.num_days = num_days
+
+    def _offsets(self, dates) -> np.ndarray:
+        return (np.asarray(dates, dtype='datetime64[D]') - self.origin).astype(int)
+
+    def window_averages(self, starts, ends) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Average price per key for many inclusive [start, end] windows at once.
+
+        Args:
+            starts: Array-like of window start dates
+            ends: Array-like of window end dates
+
+        Returns:
+            (averages, counts), each (W, K); averages are NaN where a window
+            has no observation for a key
+        """
+        lo = np.clip(self._offsets(starts), 0, self.num_days)
+        hi = np.clip(self._offsets(ends) + 1, 0, self.num_days)
+        hi = np.maximum(hi, lo)
+        total = self.sums[hi] - self.sums[lo]
+        count = self.counts[hi] - self.counts[lo]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            averages = np.where(count > 0, total / count, np.nan)
+        return averages, count
+
+    def missing_business_days(self, starts, ends) -> np.ndarray:
+        """
+        Trading days without an observation per key, for many inclusive
+        [start, end] windows at once (W, K). Trading days outside the history
+        count as missing.
+        """
+        start_offsets = self._offsets(starts)
+        end_offsets = self._offsets(ends)
+        lo = np.clip(start_offsets, 0, self.num_days)
+        hi = np.maximum(np.clip(end_offsets + 1, 0, self.num_days), lo)
+        inside = self.missing[hi] - self.missing[lo]
+
+        # Trading days before the first or after the last history date
+        starts = np.asarray(starts, dtype='datetime64[D]')
+        stops = np.maximum(np.asarray(ends, dtype='datetime64[D]') + 1, starts)
+        before = np.busday_count(starts, np.minimum(np.maximum(self.origin, starts), stops), busdaycal=self.calendar)
+        after = np.busday_count(np.minimum(np.maximum(self.last_date + 1, starts), stops), stops, busdaycal=self.calendar)
+        return inside + (before + after)[:, None]
+
+    def window_average(self, key: str, start: str, end: str) -> Optional[float]:
+        """Average of one price key over [start, end]; None without observations."""
+        averages, _ = self.window_averages([_parse_date(start)], [_parse_date(end)])
+        value = averages[0, PRICE_INDEX[key]]
+        return None if np.isnan(value) else float(value)
+
+    def rolling_averages(self, window_days: int) -> Dict[str, Any]:
+        """Trailing window_days average for every calendar day in the history."""
+        hi = np.arange(1, self.num_days + 1)
+        lo = np.maximum(hi - window_days, 0)
+        total = self.sums[hi] - self.sums[lo]
+        count = self.counts[hi] - self.counts[lo]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            averages = np.where(count > 0, total / count, np.nan)
+        return {
+            'dates': self.origin + np.arange(self.num_days),
+            'averages': averages
+        }
+
+    def latest_on_or_before(self, as_of: np.datetime64) -> np.ndarray:
+        """Most recent observed price per key on or before as_of (NaN if none)."""
+        hi = int(np.clip(self._offsets([as_of])[0] + 1, 0, self.num_days))
+        count = self.counts[:hi + 1]
+        result = np.full(len(PRICE_KEYS), np.nan)
+        for k in range(len(PRICE_KEYS)):
+            if count[-1, k] == 0:
+                continue
+            # first prefix position reaching the final count marks the last observation
+            last = int(np.searchsorted(count[:, k], count[-1, k], side='left'))
+            result[k] = self.sums[last, k] - self.sums[last - 1, k]
+        return result
+
+
+def _add_months(year: int, month: int, offset: int) -> Tuple[int, int]:
+    index = year * 12 + (month - 1) + offset
+    return index // 12, index % 12 + 1
+
+
+def qp_period(delivery_date: str, qp: Dict[str, Any]) -> Tuple[np.datetime64, np.datetime64]:
+    """
+    Resolve a contract's quotational period to inclusive start/end dates.
+
+    Args:
+        delivery_date: Delivery date (YYYY-MM-DD)
+        qp: {'type': 'month', 'offset_months': 1} - calendar month M+offset
+            {'type': 'window', 'start': ..., 'end': ...} - explicit dates
+            {'type': 'rolling', 'days': 30} - trailing days up to delivery
+
+    Returns:
+        (start, end) as datetime64[D]
+    """
+    qp_type = qp.get('type', 'month')
+    delivery = _parse_date(delivery_date)
+
+    if qp_type == 'month':
+        d = delivery.astype(object)
+        year, month = _add_months(d.year, d.month, int(qp.get('offset_months', 1)))
+        next_year, next_month = _add_months(year, month, 1)
+        start = np.datetime64(date(year, month, 1), 'D')
+        end = np.datetime64(date(next_year, next_month, 1), 'D') - 1
+        return start, end
+    if qp_type == 'window':
+        return _parse_date(qp['start']), _parse_date(qp['end'])
+    if qp_type == 'rolling':
+        days = int(qp.get('days', 30))
+        return delivery - (days - 1), delivery
+
+    raise ValueError(f"Unknown QP type: {qp_type} (expected one of {', '.join(QP_TYPES)})")
+
+
+def settle_contracts(
+    contracts: List[Dict[str, Any]],
+    history: PriceHistory,
+    market_data: Optional[Dict[str, float]] = None,
+    as_of: Optional[str] = None,
+    holidays: Optional[Holidays] = None
+) -> Dict[str, Any]:
+    """
+    Provisional and final settlement of contracts on QP-averaged prices.
+
+    A contract is final once its QP has ended and the history covers the whole
+    period: every trading day in the QP has an observation for each QP key
+    (its 'qp_keys', or every key the history records). Otherwise it is settled
+    provisionally on the average observed so far (or the latest spot price if
+    the QP has not started). Trading days are Mon-Fri less the exchange
+    holidays given, so a QP spanning Dec 25 can still settle final.
+
+    Args:
+        contracts: dicts with 'id', 'delivery_date', 'qp', optional 'qp_keys'
+                   (price keys to average, default all) and 'provisional_value'
+                   (previously invoiced profit), plus calculate_valuation inputs
+        history: PriceHistory with prices per kg
+        market_data: Prices for keys without observations
+        as_of: Settlement date (defaults to the last history date)
+        holidays: Exchange holidays (see trading_calendar)
+
+    Returns:
+        dict with per-contract settlements and totals
+    """
+    index = PrefixSumIndex(history, holidays)
+    as_of_date = _parse_date(as_of) if as_of else index.last_date
+    data_end = min(as_of_date, index.last_date)
+    spot = index.latest_on_or_before(data_end)
+
+    n = len(contracts)
+    periods = [qp_period(c['delivery_date'], c.get('qp', {})) for c in contracts]
+    starts = np.array([p[0] for p in periods], dtype='datetime64[D]')
+    ends = np.array([p[1] for p in periods], dtype='datetime64[D]')
+
+    # One vectorized lookup for every contract's (possibly truncated) QP window
+    averages, counts = index.window_averages(starts, np.minimum(ends, data_end))
+    missing = index.missing_business_days(starts, np.minimum(ends, data_end))
+    not_started = starts > data_end
+    averages[not_started] = spot
+
+    prices = np.zeros((n, len(PRICE_KEYS)))
+    missing_days = np.zeros(n, dtype=int)
+    for i, contract in enumerate(contracts):
+        base = valuation_prices(contract, market_data or {})
+        qp_keys = contract.get('qp_keys')
+        use = ~np.isnan(averages[i])
+        if qp_keys:
+            selected = np.isin(np.arange(len(PRICE_KEYS)), [PRICE_INDEX[k] for k in qp_keys])
+            use &= selected
+        else:
+            selected = index.recorded_keys
+        prices[i] = np.where(use, averages[i], base)
+        missing_days[i] = int(missing[i, selected].max()) if selected.any() else 0
+    is_final = (ends <= data_end) & (missing_days == 0)
+
+    values = value_exposures(build_exposures(contracts), prices, paired=True)
+
+    settlements = []
+    for i, contract in enumerate(contracts):
+        net_profit = float(values['net_profit'][i])
+        settlement = {
+            'contract_id': contract.get('id', f"contract_{i + 1}"),
+            'status': 'final' if is_final[i] else 'provisional',
+            'qp_start': str(starts[i]),
+            'qp_end': str(ends[i]),
+            'observed_days': int(counts[i].max()) if not not_started[i] else 0,
+            'missing_days': int(missing_days[i]),
+            'qp_prices': {key: round(float(prices[i, k]), 4) for k, key in enumerate(PRICE_KEYS)},
+            'total_revenue': round(float(values['total_revenue'][i]), 2),
+            'material_cost': round(float(values['material_cost'][i]), 2),
+            'net_profit': round(net_profit, 2),
+            'margin_pct': round(float(values['margin_pct'][i]), 2)
+        }
+        if contract.get('provisional_value') is not None:
+            settlement['adjustment'] = round(net_profit - float(contract['provisional_value']), 2)
+        settlements.append(settlement)
+
+    num_final = int(is_final.sum())
+    logger.info(f"Settled {n} contracts as of {as_of_date} ({num_final} final, {n - num_final} provisional)")
+
+    return {
+        'as_of': str(as_of_date),
+        'settlements': settlements,
+        'num_final': num_final,
+        'num_provisional': n - num_final,
+        'total_net_profit': round(float(values['net_profit'].sum()), 2)
+    }
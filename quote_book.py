@@ -0,0 +1,306 @@
+"""
+Persistent quote book with incremental mark-to-market.
+Each quote stores its calculate_valuation inputs; metal costs and revenues are
+linear in price, so the book keeps per-quote exposure vectors and re-prices
+every open quote with a matrix-vector product on each market snapshot.
+"""
+
+import json
+import logging
+import os
+import threading
+import uuid
+from datetime import datetime
+from typing import Dict, List, Any, Optional
+
+import numpy as np
+
+from valuation_engine import (
+    PRICE_KEYS, build_exposures, prices_vector, value_exposures, valuation_prices
+)
+
+logger = logging.getLogger(__name__)
+
+QUOTE_BOOK_PATH = os.environ.get(
+    'QUOTE_BOOK_PATH',
+    os.path.join(os.path.dirname(__file__), 'data', 'quote_book.json')
+)
+
+# Issue prices, marks and profits are all held in this currency
+BOOK_CURRENCY = 'USD'
+
+
+def _price_row(prices: Dict[str, Optional[float]]) -> np.ndarray:
+    """Price vector with NaN for keys that are absent or null."""
+    return prices_vector(prices, base=np.full(len(PRICE_KEYS), np.nan))
+
+
+class QuoteBook:
+    """
+    Open and closed quotes, persisted as JSON.
+
+    The book tracks the last snapshot it was marked against. Quotes already
+    marked at that snapshot are updated with only the changed price columns;
+    newly issued quotes are priced in full on their first mark.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or QUOTE_BOOK_PATH
+        self._lock = threading.Lock()
+        self._mtime = None
+        self.quotes: List[Dict[str, Any]] = []
+        self.last_prices: Optional[np.ndarray] = None
+        self.last_marked_at: Optional[str] = None
+        self._load()
+
+    # ------------------------------------------------------------------
+    # Persistence
+    # ------------------------------------------------------------------
+
+    def _load(self):
+        """Load the book from disk and rebuild exposure vectors."""
+        if os.path.exists(self.path):
+            with open(self.path, 'r') as f:
+                state = json.load(f)
+            self._mtime = os.path.getmtime(self.path)
+        else:
+            state = {}
+
+        self.quotes = state.get('quotes', [])
+        last_prices = state.get('last_prices')
+        self.last_prices = _price_row(last_prices) if last_prices else None
+        self.last_marked_at = state.get('last_marked_at')
+
+        exposures = build_exposures([q['input_params'] for q in self.quotes])
+        self._revenue = exposures['revenue']
+        self._net = exposures['revenue'] - exposures['cost']
+        self._opex = exposures['opex']
+        self._issue = np.array([_price_row(q['issue_prices']) for q in self.quotes]).reshape(len(self.quotes), len(PRICE_KEYS))
+
+    def _refresh_if_changed(self):
+        """Reload when another process (e.g. a second API worker) saved the book."""
+        if os.path.exists(self.path) and os.path.getmtime(self.path) != self._mtime:
+            self._load()
+
+    def _save(self):
+        state = {
+            'quotes': self.quotes,
+            'last_prices': None if self.last_prices is None else {
+                key: None if np.isnan(value) else value
+                for key, value in zip(PRICE_KEYS, self.last_prices.tolist())
+            },
+            'last_marked_at': self.last_marked_at
+        }
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(state, f)
+        os.replace(tmp_path, self.path)
+        self._mtime = os.path.getmtime(self.path)
+
+    # ------------------------------------------------------------------
+    # Quotes
+    # ------------------------------------------------------------------
+
+    def add_quote(
+        self,
+        input_params: Dict[str, Any],
+        market_data: Dict[str, float],
+        quote_id: Optional[str] = None,
+        metadata: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """
+        Issue a quote priced at the lot's metal prices and current product prices.
+
+        Args:
+            input_params: calculate_valuation input parameters, priced in BOOK_CURRENCY
+            market_data: Product (salt) prices per kg at issue
+            quote_id: Optional identifier (generated if omitted)
+            metadata: Optional free-form fields (counterparty, notes, ...)
+
+        Returns:
+            The stored quote record
+        """
+        return self.add_quotes([{
+            'input_params': input_params,
+            'quote_id': quote_id,
+            'metadata': metadata
+        }], market_data)[0]
+
+    def add_quotes(self, requests: List[Dict[str, Any]], market_data: Dict[str, float]) -> List[Dict[str, Any]]:
+        """
+        Issue several quotes with a single exposure build and a single save.
+
+        Args:
+            requests: dicts with 'input_params' and optional 'quote_id', 'metadata'
+            market_data: Product (salt) prices per kg at issue
+
+        Returns:
+            The stored quote records, in request order
+
+        Raises:
+            ValueError: if a quote id is already taken or a lot is not priced in BOOK_CURRENCY
+        """
+        for req in requests:
+            currency = req['input_params'].get('currency', BOOK_CURRENCY)
+            if currency != BOOK_CURRENCY:
+                raise ValueError(f"Quote book is held in {BOOK_CURRENCY}, got a quote priced in {currency}")
+
+        with self._lock:
+            self._refresh_if_changed()
+            existing = {q['id'] for q in self.quotes}
+            ids = []
+            for req in requests:
+                quote_id = req.get('quote_id') or f"Q-{uuid.uuid4().hex[:8].upper()}"
+                if quote_id in existing:
+                    raise ValueError(f"Quote {quote_id} already exists")
+                existing.add(quote_id)
+                ids.append(quote_id)
+
+            lots = [req['input_params'] for req in requests]
+            exposures = build_exposures(lots)
+            issue_prices = np.array([valuation_prices(lot, market_data) for lot in lots]).reshape(len(lots), len(PRICE_KEYS))
+            values = value_exposures(exposures, issue_prices, paired=True)
+
+            issued_at = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            quotes = []
+            for i, req in enumerate(requests):
+                net_profit = float(values['net_profit'][i])
+                quotes.append({
+                    'id': ids[i],
+                    'status': 'open',
+                    'currency': BOOK_CURRENCY,
+                    'issued_at': issued_at,
+                    'input_params': req['input_params'],
+                    'metadata': req.get('metadata') or {},
+                    'issue_prices': dict(zip(PRICE_KEYS, issue_prices[i].tolist())),
+                    'issue_profit': net_profit,
+                    'issue_margin_pct': float(values['margin_pct'][i]),
+                    'current_profit': net_profit,
+                    'current_revenue': float(values['total_revenue'][i]),
+                    'marked': False,
+                    'marked_at': None
+                })
+
+            self.quotes.extend(quotes)
+            self._revenue = np.vstack([self._revenue, exposures['revenue']])
+            self._net = np.vstack([self._net, exposures['revenue'] - exposures['cost']])
+            self._opex = np.append(self._opex, exposures['opex'])
+            self._issue = np.vstack([self._issue, issue_prices])
+            self._save()
+
+            logger.info(f"Issued {len(quotes)} quote(s), book now holds {len(self.quotes)}")
+            return quotes
+
+    def close_quote(self, quote_id: str) -> Optional[Dict[str, Any]]:
+        """Close a quote so it is no longer marked; returns None if not found."""
+        with self._lock:
+            self._refresh_if_changed()
+            for quote in self.quotes:
+                if quote['id'] == quote_id:
+                    quote['status'] = 'closed'
+                    quote['closed_at'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+                    self._save()
+                    return quote
+            return None
+
+    def positions(self, status: Optional[str] = 'open') -> List[Dict[str, Any]]:
+        """Current position per quote (optionally filtered by status)."""
+        with self._lock:
+            self._refresh_if_changed()
+            return [self._position(q) for q in self.quotes if status is None or q['status'] == status]
+
+    @staticmethod
+    def _position(quote: Dict[str, Any]) -> Dict[str, Any]:
+        revenue = quote['current_revenue']
+        return {
+            'quote_id': quote['id'],
+            'status': quote['status'],
+            'currency': quote.get('currency', BOOK_CURRENCY),
+            'issued_at': quote['issued_at'],
+            'metadata': quote['metadata'],
+            'issue_profit': round(quote['issue_profit'], 2),
+            'net_profit': round(quote['current_profit'], 2),
+            'margin_pct': round(quote['current_profit'] / revenue * 100, 2) if revenue > 0 else 0,
+            'change_since_issue': round(quote['current_profit'] - quote['issue_profit'], 2),
+            'marked_at': quote['marked_at']
+        }
+
+    # ------------------------------------------------------------------
+    # Mark-to-market
+    # ------------------------------------------------------------------
+
+    def mark_to_market(self, snapshot: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Re-price all open quotes against a market snapshot.
+
+        Args:
+            snapshot: BOOK_CURRENCY prices per kg keyed by PRICE_KEYS (get_market_data output);
+                      keys absent from the snapshot keep their last marked
+                      value, or each quote's issue price if the book has
+                      never seen that key
+
+        Returns:
+            dict with per-quote position changes and book totals
+        """
+        with self._lock:
+            self._refresh_if_changed()
+            marked_at = snapshot.get('timestamp') or datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            # Keys never seen by the book stay NaN and resolve per quote to its issue price
+            base = self.last_prices if self.last_prices is not None else np.full(len(PRICE_KEYS), np.nan)
+            new_prices = prices_vector(snapshot, base=base)
+
+            open_idx = np.array([i for i, q in enumerate(self.quotes) if q['status'] == 'open'], dtype=int)
+            if len(open_idx) == 0:
+                self.last_prices = new_prices
+                return {'marked_at': marked_at, 'num_quotes': 0, 'total_profit': 0.0, 'total_change': 0.0, 'changes': []}
+
+            synced = np.array([self.quotes[i]['marked'] for i in open_idx], dtype=bool)
+            previous = np.array([self.quotes[i]['current_profit'] for i in open_idx])
+            profit = previous.copy()
+            revenue = np.array([self.quotes[i]['current_revenue'] for i in open_idx])
+
+            # Quotes marked at the last snapshot: apply only the changed price columns
+            rows = open_idx[synced]
+            if len(rows) and self.last_prices is not None:
+                changed = ~(np.isnan(new_prices) & np.isnan(self.last_prices)) & (new_prices != self.last_prices)
+                cols = np.flatnonzero(changed)
+                if len(cols):
+                    issue = self._issue[np.ix_(rows, cols)]
+                    before = np.where(np.isnan(self.last_prices[cols]), issue, self.last_prices[cols])
+                    after = np.where(np.isnan(new_prices[cols]), issue, new_prices[cols])
+                    delta = after - before
+                    profit[synced] += np.einsum('ij,ij->i', self._net[np.ix_(rows, cols)], delta)
+                    revenue[synced] += np.einsum('ij,ij->i', self._revenue[np.ix_(rows, cols)], delta)
+
+            # Quotes never marked (or book never marked): full product once
+            rows = open_idx[~synced]
+            if len(rows):
+                prices = np.where(np.isnan(new_prices)[None, :], self._issue[rows], new_prices[None, :])
+                profit[~synced] = np.einsum('ij,ij->i', self._net[rows], prices) - self._opex[rows]
+                revenue[~synced] = np.einsum('ij,ij->i', self._revenue[rows], prices)
+
+            changes = []
+            for k, i in enumerate(open_idx):
+                quote = self.quotes[i]
+                quote['current_profit'] = float(profit[k])
+                quote['current_revenue'] = float(revenue[k])
+                quote['marked'] = True
+                quote['marked_at'] = marked_at
+                position = self._position(quote)
+                position['previous_profit'] = round(float(previous[k]), 2)
+                position['change'] = round(float(profit[k] - previous[k]), 2)
+                changes.append(position)
+
+            self.last_prices = new_prices
+            self.last_marked_at = marked_at
+            self._save()
+
+            logger.info(f"Marked {len(open_idx)} open quotes to market at {marked_at}")
+            return {
+                'marked_at': marked_at,
+                'num_quotes': len(changes),
+                'total_profit': round(float(profit.sum()), 2),
+                'total_change': round(float((profit - previous).sum()), 2),
+                'changes': changes
+            }
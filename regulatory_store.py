@@ -0,0 +1,293 @@
+"""
+Regulatory data store.
+Serves data/regulatory_db.json to logistics_data and everything built on it
+(route feasibility, country regulations, permits, packaging). The file is
+decoded into an immutable snapshot: route feasibility, countries and country
+regulations are indexed when it loads, the sections only a few endpoints
+read (permits, packaging, material classifications) are indexed on first
+use. Effective-dated rules (the 'dated_rules' section plus each route's
+'status_after' change) are parsed into validity intervals. When the file's
+modification time changes a new snapshot is built and swapped in with one
+assignment, so a reader always sees one whole version.
+"""
+
+import json
+import logging
+import os
+import re
+import threading
+import time
+from datetime import datetime
+from types import MappingProxyType
+from typing import Dict, List, Any, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DB_PATH = os.environ.get(
+    'REGULATORY_DB_PATH',
+    os.path.join(os.path.dirname(__file__), 'data', 'regulatory_db.json')
+)
+
+# Seconds between checks of the file's mtime (lookups in between skip the stat)
+RELOAD_CHECK_SECONDS = 1.0
+
+# Route key places that are not in 'countries' and don't title-case cleanly
+PLACE_ALIASES = {'non_oecd': 'Non-OECD'}
+
+# Materials a route's 'status_after' applies to (hazardous battery waste;
+# processed metals keep the route's status)
+STATUS_AFTER_MATERIALS = ('whole_batteries', 'black_mass')
+
+_DAYS_RANGE = re.compile(r'\s*(\d+(?:\s*-\s*\d+)?)')
+
+
+def _place_names(countries: Dict[str, Any]) -> Dict[str, str]:
+    """snake_case key fragment -> place name ('south_korea' -> 'South Korea')."""
+    names = {code.lower().replace(' ', '_').replace('-', '_'): code for code in countries}
+    names.update(PLACE_ALIASES)
+    return names
+
+
+def _place(fragment: str, names: Dict[str, str]) -> str:
+    return names.get(fragment) or ' '.join(word.capitalize() for word in fragment.split('_'))
+
+
+def processing_days(processing_time: Optional[str]) -> Optional[str]:
+    """Day range from a processing time ('60-90 days combined' -> '60-90')."""
+    if not processing_time:
+        return None
+    match = _DAYS_RANGE.match(str(processing_time))
+    return match.group(1).replace(' ', '') if match else None
+
+
+def index_routes(section: Dict[str, Any], countries: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """
+    Route feasibility keyed 'Origin->Destination'.
+
+    JSON keys are 'origin_to_destination' ('us_to_south_korea'), or an entry
+    may name its 'origin' and 'destination'. 'processing_time_days' is
+    derived from 'processing_time' when not given.
+    """
+    names = _place_names(countries)
+    routes = {}
+    for key, entry in section.items():
+        if 'status' not in entry:
+            raise ValueError(f"route_feasibility.{key}: missing 'status'")
+        if 'origin' in entry and 'destination' in entry:
+            origin, destination = entry['origin'], entry['destination']
+        elif '_to_' in key:
+            origin, destination = (_place(part, names) for part in key.split('_to_', 1))
+        else:
+            raise ValueError(f"route_feasibility.{key}: key is not 'origin_to_destination'")
+        route = {k: v for k, v in entry.items() if k not in ('origin', 'destination')}
+        if 'processing_time_days' not in route and processing_days(route.get('processing_time')):
+            route['processing_time_days'] = processing_days(route['processing_time'])
+        routes[f"{origin}->{destination}"] = route
+    return routes
+
+
+def index_permits(section: Dict[str, Any], countries: Dict[str, Any]) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Permit lists keyed 'Country_direction' ('us_export' -> 'US_export').
+
+    An entry is a list of permits or groups of them ({'permits': [...],
+    'forms': [...]}), flattened in order.
+    """
+    names = _place_names(countries)
+    permits = {}
+    for key, entry in section.items():
+        place, _, direction = key.rpartition('_')
+        if isinstance(entry, dict):
+            items = [item for group in entry.values() if isinstance(group, list) for item in group]
+        else:
+            items = list(entry)
+        permits[f"{_place(place, names)}_{direction}"] = items
+    return permits
+
+
+def _rule_date(rule_id: str, field: str, value: Optional[str]) -> Optional[datetime]:
+    if value is None:
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"dated_rules.{rule_id}: {field} is not an ISO date: {value!r}")
+
+
+def _optional_set(values: Optional[List[str]]) -> Optional[frozenset]:
+    return frozenset(values) if values is not None else None
+
+
+def index_dated_rules(section: List[Dict[str, Any]], routes: Dict[str, Dict[str, Any]]) -> Tuple[MappingProxyType, ...]:
+    """
+    Effective-dated rules, each in force on [effective_from, effective_until).
+
+    Rules from 'dated_rules' match on 'origins', 'destinations',
+    'destination_oecd' and 'materials' (omitted = any) and give 'before'
+    effects (requirements, a countdown warning) and 'after' effects (status,
+    requirements). A route with 'status_after' and 'effective_date' becomes
+    a rule for that route alone that switches its status for
+    STATUS_AFTER_MATERIALS and drops its 'current_note'.
+    """
+    rules = []
+    for raw in section:
+        rule_id = raw.get('id') or f"rule_{len(rules)}"
+        effective_from = _rule_date(rule_id, 'effective_from', raw.get('effective_from'))
+        if effective_from is None:
+            raise ValueError(f"dated_rules.{rule_id}: missing 'effective_from'")
+        effective_until = _rule_date(rule_id, 'effective_until', raw.get('effective_until'))
+        if effective_until is not None and effective_until <= effective_from:
+            raise ValueError(f"dated_rules.{rule_id}: effective_until must be after effective_from")
+        before, after = raw.get('before', {}), raw.get('after', {})
+        rules.append(MappingProxyType({
+            'id': rule_id,
+            'effective_from': effective_from,
+            'effective_until': effective_until,
+            'routes': None,
+            'origins': _optional_set(raw.get('origins')),
+            'destinations': _optional_set(raw.get('destinations')),
+            'destination_oecd': raw.get('destination_oecd'),
+            'materials': _optional_set(raw.get('materials')),
+            'before_requirements': tuple(before.get('requirements', [])),
+            'countdown': before.get('countdown'),
+            'status': after.get('status'),
+            'after_requirements': tuple(after.get('requirements', [])),
+            'clears_current_note': False
+        }))
+
+    for route_key, route in routes.items():
+        if not (route.get('status_after') and route.get('effective_date')):
+            continue
+        rule_id = f"route:{route_key}"
+        rules.append(MappingProxyType({
+            'id': rule_id,
+            'effective_from': _rule_date(rule_id, 'effective_date', route['effective_date']),
+            'effective_until': None,
+            'routes': frozenset([route_key]),
+            'origins': None,
+            'destinations': None,
+            'destination_oecd': None,
+            'materials': frozenset(STATUS_AFTER_MATERIALS),
+            'before_requirements': (),
+            'countdown': None,
+            'status': route['status_after'],
+            'after_requirements': (),
+            'clears_current_note': True
+        }))
+    return tuple(rules)
+
+
+# Sections indexed on first use: name -> (JSON section, builder)
+LAZY_SECTIONS = {
+    'permit_requirements': ('permit_requirements', index_permits),
+    'packaging_requirements': ('packaging_requirements', lambda section, countries: dict(section)),
+    'material_classifications': ('material_classifications', lambda section, countries: dict(section))
+}
+
+
+class RegulatorySnapshot:
+    """
+    One loaded version of the regulatory database.
+
+    Everything reachable from a snapshot is shared between threads and must
+    be treated as read-only.
+    """
+
+    def __init__(self, document: Dict[str, Any], version: int):
+        self.document = document
+        self.version = version
+        self.countries: Dict[str, Dict[str, Any]] = document.get('countries', {})
+        self.country_regulations: Dict[str, Dict[str, Any]] = document.get('country_regulations', {})
+        self.route_feasibility = index_routes(document.get('route_feasibility', {}), self.countries)
+        self.dated_rules = index_dated_rules(document.get('dated_rules', []), self.route_feasibility)
+        self._lazy: Dict[str, Any] = {}
+        self._lazy_lock = threading.Lock()
+
+    def section(self, name: str) -> Dict[str, Any]:
+        """An index from LAZY_SECTIONS, built the first time it is asked for."""
+        index = self._lazy.get(name)
+        if index is not None:
+            return index
+        source, build = LAZY_SECTIONS[name]
+        with self._lazy_lock:
+            if name not in self._lazy:
+                self._lazy[name] = build(self.document.get(source, {}), self.countries)
+                logger.debug(f"Indexed regulatory section {name} (v{self.version})")
+            return self._lazy[name]
+
+
+class RegulatoryStore:
+    """
+    Current regulatory snapshot with hot reload.
+
+    The file's mtime is checked at most every check_seconds. A changed file
+    is decoded and indexed off to the side, then the new snapshot replaces
+    the old one in a single assignment. A file that fails to load is logged
+    and the previous snapshot stays in use.
+    """
+
+    def __init__(self, path: Optional[str] = None, check_seconds: float = RELOAD_CHECK_SECONDS):
+        self.path = path or DB_PATH
+        self.check_seconds = check_seconds
+        self._lock = threading.Lock()
+        self._mtime = None
+        self._next_check = 0.0
+        self._snapshot: Optional[RegulatorySnapshot] = None
+        self._load()
+
+    def _load(self):
+        self._mtime = os.path.getmtime(self.path)
+        with open(self.path, 'r') as f:
+            document = json.load(f)
+        version = self._snapshot.version + 1 if self._snapshot else 1
+        snapshot = RegulatorySnapshot(document, version)
+        self._snapshot = snapshot
+        logger.info(f"Loaded regulatory database v{version}: {len(snapshot.route_feasibility)} routes from {self.path}")
+
+    def _refresh_if_changed(self):
+        now = time.monotonic()
+        if now < self._next_check:
+            return
+        self._next_check = now + self.check_seconds
+        try:
+            changed = os.path.getmtime(self.path) != self._mtime
+        except OSError:
+            return
+        if changed:
+            try:
+                self._load()
+            except (OSError, ValueError, KeyError, TypeError, AttributeError) as e:
+                logger.error(f"Keeping previous regulatory data; {self.path} failed to load: {e}")
+
+    def snapshot(self) -> RegulatorySnapshot:
+        """Current snapshot (read everything for one answer from the same one)."""
+        with self._lock:
+            self._refresh_if_changed()
+            return self._snapshot
+
+    def reload(self) -> RegulatorySnapshot:
+        """Load the file now, whether or not its mtime changed."""
+        with self._lock:
+            self._load()
+            self._next_check = time.monotonic() + self.check_seconds
+            return self._snapshot
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_regulatory_store() -> RegulatoryStore:
+    """Process-wide regulatory store (loaded on first use)."""
+    global _store
+    if _store is not None:
+        return _store
+    with _store_lock:
+        if _store is None:
+            _store = RegulatoryStore()
+        return _store
+
+
+def current_snapshot() -> RegulatorySnapshot:
+    """Shortcut for get_regulatory_store().snapshot()."""
+    return get_regulatory_store().snapshot()
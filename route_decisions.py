@@ -0,0 +1,475 @@
+"""
+Precompiled route feasibility decisions.
+Every origin x destination x material combination over the known countries
+is resolved once into an immutable decision: route status, requirement
+lists, warnings and info notes, and the regulatory frameworks at both ends.
+Effective-dated rules (e.g. the EU export ban on whole batteries to
+non-OECD countries) split a decision into variants over validity
+intervals, so evaluating a route for any as-of date is a dict lookup plus
+a binary search over its breakpoints. The table is rebuilt when
+logistics_data reports a new data version, and the full country x country
+feasibility matrix is cached per data version and as-of day.
+"""
+
+import hashlib
+import json
+import logging
+import threading
+from bisect import bisect_right
+from collections import OrderedDict
+from datetime import date, datetime, timezone
+from types import MappingProxyType
+from typing import Dict, List, Any, Optional, Tuple, Iterable, Union
+
+import logistics_data
+
+logger = logging.getLogger(__name__)
+
+MATERIAL_TYPES = ('whole_batteries', 'black_mass', 'processed')
+
+# Member states without their own ROUTE_FEASIBILITY entries fall back to the 'EU' rules
+EU_MEMBER_STATES = ('Germany', 'France', 'Netherlands', 'Belgium', 'Italy', 'Spain')
+
+EU_ORIGINS = ('EU',) + EU_MEMBER_STATES
+
+# Place groups a dated rule's 'origins'/'destinations' may name
+PLACE_GROUPS = {'EU': EU_ORIGINS}
+
+# Note keywords that make a route note informational rather than a warning
+POSITIVE_NOTE_KEYWORDS = ('common route', 'well-established', 'simplifies', 'strong infrastructure', 'easier')
+
+# Combinations compiled on demand (unlisted countries) are kept up to this many
+MAX_ADHOC_DECISIONS = 10000
+
+# Feasibility matrices kept (one per data version and as-of day)
+MATRIX_CACHE_SIZE = 8
+
+# As-of dates are accepted as datetimes, dates or ISO strings
+AsOf = Union[datetime, date, str]
+
+
+def _append_unique(items: list, item: str):
+    if item not in items:
+        items.append(item)
+
+
+def _regulations(country: str) -> MappingProxyType:
+    regs = logistics_data.get_country_regulations(country)
+    return MappingProxyType({
+        'framework': regs.get('framework'),
+        'authority': regs.get('competent_authority')
+    })
+
+
+def _freeze(decision: Dict[str, Any]) -> MappingProxyType:
+    return MappingProxyType({
+        key: tuple(value) if isinstance(value, list) else value
+        for key, value in decision.items()
+    })
+
+
+def _date_label(effective: datetime) -> str:
+    """'Nov 9, 2026' style label for a rule's effective date."""
+    return f"{effective:%b} {effective.day}, {effective.year}"
+
+
+def _in_places(place: str, places: Optional[frozenset]) -> bool:
+    if places is None:
+        return True
+    return place in places or any(place in PLACE_GROUPS.get(group, ()) for group in places)
+
+
+def route_entry(origin: str, destination: str) -> Tuple[str, Dict[str, Any]]:
+    """
+    ROUTE_FEASIBILITY key and entry for a route, falling back to the EU rules
+    ('EU->China', then 'EU->Non-OECD') for member states without their own.
+    """
+    route_key = logistics_data.get_route_key(origin, destination)
+    route_info = logistics_data.get_route_status(origin, destination)
+    if route_info.get('status') == 'unknown' and origin in EU_MEMBER_STATES:
+        fallbacks = [('EU', destination)]
+        if not logistics_data.get_countries().get(destination, {}).get('oecd_member', True):
+            fallbacks.append(('EU', 'Non-OECD'))
+        for fallback in fallbacks:
+            info = logistics_data.get_route_status(*fallback)
+            if info.get('status') != 'unknown':
+                return logistics_data.get_route_key(*fallback), info
+    return route_key, route_info
+
+
+def _rule_applies(rule: MappingProxyType, route_key: str, origin: str, destination: str, material_type: str) -> bool:
+    if rule['routes'] is not None and route_key not in rule['routes']:
+        return False
+    if rule['materials'] is not None and material_type not in rule['materials']:
+        return False
+    if not (_in_places(origin, rule['origins']) and _in_places(destination, rule['destinations'])):
+        return False
+    if rule['destination_oecd'] is not None:
+        # Destinations missing from the country list count as non-OECD
+        dest_oecd = logistics_data.get_countries().get(destination, {}).get('oecd_member', False)
+        if dest_oecd != rule['destination_oecd']:
+            return False
+    return True
+
+
+def compile_decision(origin: str, destination: str, material_type: str) -> MappingProxyType:
+    """
+    Resolve everything about a route that does not depend on the as-of date.
+
+    Returns:
+        Read-only mapping with 'breakpoints' (sorted datetimes where a dated
+        rule starts or ends) and 'variants' (one per interval, so variant i
+        holds from breakpoints[i-1] until breakpoints[i]). Each variant has
+        'status', 'requirements', 'warnings' and 'info_notes' (tuples), the
+        route's processing time, reason and effective date, both regulation
+        summaries, and 'countdowns' (effective date, label, warning
+        template) for rules that have not taken effect yet
+    """
+    route_key, route_info = route_entry(origin, destination)
+    status = route_info.get('status', 'unknown')
+
+    requirements = list(route_info.get('requirements', []))
+    info_notes = []
+
+    # Classification logic:
+    # - whole_batteries: ONLY assembled cells with electrolyte (energized batteries)
+    # - black_mass: Electrode scrap (foils, jelly rolls), shredded material, powders
+    # - processed: Refined metals/compounds (lowest hazard)
+    if material_type in ('black_mass', 'whole_batteries'):
+        _append_unique(requirements, "Material classified as hazardous waste")
+        if origin == 'US':
+            _append_unique(requirements, "RCRA Part B permit required for storage")
+    elif material_type == 'processed':
+        # Processed/refined metals have lower regulatory burden
+        _append_unique(requirements, "Material may qualify for reduced hazmat classification")
+
+    if material_type == 'whole_batteries':
+        _append_unique(requirements, "UN 3480/3481 packaging required (assembled cells only)")
+        _append_unique(requirements, "State of charge documentation required")
+        info_notes.append("Note: Dry electrode scrap (foils/jelly rolls without electrolyte) should be classified as Black Mass")
+
+    # Route notes: positive/neutral ones are info, the rest warnings
+    note_warnings = []
+    if route_info.get('notes'):
+        note = route_info['notes']
+        if any(positive in note.lower() for positive in POSITIVE_NOTE_KEYWORDS):
+            info_notes.append(note)
+        else:
+            note_warnings.append(note)
+    # Time-sensitive regulation note (e.g. "Currently allowed but ...")
+    current_note = route_info.get('current_note')
+
+    base = {
+        'processing_time': route_info.get('processing_time_days'),
+        'reason': route_info.get('reason'),
+        'effective_date': route_info.get('effective_date'),
+        'origin_regulations': _regulations(origin),
+        'destination_regulations': _regulations(destination),
+        'info_notes': info_notes
+    }
+
+    rules = [
+        rule for rule in logistics_data.get_dated_rules()
+        if _rule_applies(rule, route_key, origin, destination, material_type)
+    ]
+    breakpoints = sorted(
+        {rule['effective_from'] for rule in rules}
+        | {rule['effective_until'] for rule in rules if rule['effective_until'] is not None}
+    )
+
+    variants = []
+    for start in [None] + breakpoints:
+        variant_status = status
+        variant_requirements = list(requirements)
+        countdowns = []
+        keep_current_note = True
+        for rule in rules:
+            label = _date_label(rule['effective_from'])
+            if start is None or start < rule['effective_from']:
+                for requirement in rule['before_requirements']:
+                    _append_unique(variant_requirements, requirement.format(label=label))
+                if rule['countdown']:
+                    countdowns.append((rule['effective_from'], label, rule['countdown']))
+            elif rule['effective_until'] is None or start < rule['effective_until']:
+                variant_status = rule['status'] or variant_status
+                for requirement in rule['after_requirements']:
+                    _append_unique(variant_requirements, requirement.format(label=label))
+                keep_current_note = keep_current_note and not rule['clears_current_note']
+
+        warnings = []
+        if variant_status == 'restricted':
+            warnings.append(f"Long processing time: {route_info.get('processing_time_days', 'varies')}")
+        warnings += note_warnings
+        if current_note and keep_current_note:
+            warnings.append(current_note)
+        variants.append(_freeze(dict(
+            base,
+            status=variant_status,
+            allowed=variant_status in ('allowed', 'allowed_until_nov_2026'),
+            requirements=variant_requirements,
+            warnings=warnings,
+            countdowns=countdowns
+        )))
+
+    return MappingProxyType({'breakpoints': tuple(breakpoints), 'variants': tuple(variants)})
+
+
+class RouteDecisionTable:
+    """
+    Hash index of compiled decisions keyed by (origin, destination, material).
+
+    Built for every pair of known countries (COUNTRIES, EU member states and
+    the ROUTE_FEASIBILITY endpoints) and each material type; other
+    combinations are compiled on first use. Rebuilt when the regulatory data
+    version changes.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._decisions: Dict[Tuple[str, str, str], MappingProxyType] = {}
+        self._adhoc = 0
+        self.version = None
+        self._build()
+
+    def _build(self):
+        version = logistics_data.get_data_version()
+        places = set(logistics_data.get_countries()) | set(EU_ORIGINS)
+        for route_key in logistics_data.get_route_feasibility():
+            places.update(route_key.split('->'))
+        decisions = {
+            (origin, destination, material_type): compile_decision(origin, destination, material_type)
+            for origin in places
+            for destination in places
+            for material_type in MATERIAL_TYPES
+        }
+        self._decisions = decisions
+        self._adhoc = 0
+        self.version = version
+        logger.info(f"Compiled {len(decisions)} route decisions (data version {version})")
+
+    def lookup(self, origin: str, destination: str, material_type: str) -> MappingProxyType:
+        """Compiled decision for a route and material."""
+        key = (origin, destination, material_type)
+        with self._lock:
+            if self.version != logistics_data.get_data_version():
+                self._build()
+            decision = self._decisions.get(key)
+            if decision is None:
+                decision = compile_decision(origin, destination, material_type)
+                if self._adhoc < MAX_ADHOC_DECISIONS:
+                    self._decisions[key] = decision
+                    self._adhoc += 1
+            return decision
+
+    def __len__(self) -> int:
+        return len(self._decisions)
+
+
+_table = None
+_table_lock = threading.Lock()
+
+
+def get_decision_table() -> RouteDecisionTable:
+    """Process-wide route decision table (compiled on first use)."""
+    global _table
+    if _table is not None:
+        return _table
+    with _table_lock:
+        if _table is None:
+            _table = RouteDecisionTable()
+        return _table
+
+
+def parse_as_of(as_of: Optional[AsOf]) -> datetime:
+    """
+    Naive datetime for an as-of value; aware datetimes are converted to naive
+    UTC. Raises ValueError for values that are not dates or ISO strings.
+    """
+    if as_of is None:
+        return datetime.now()
+    if isinstance(as_of, str):
+        try:
+            as_of = datetime.fromisoformat(as_of)
+        except ValueError:
+            raise ValueError(f"as-of date is not an ISO date: {as_of!r}")
+    elif not isinstance(as_of, date):
+        raise ValueError(f"as-of date must be an ISO date string, got {type(as_of).__name__}")
+    if not isinstance(as_of, datetime):
+        return datetime(as_of.year, as_of.month, as_of.day)
+    if as_of.tzinfo is not None:
+        return as_of.astimezone(timezone.utc).replace(tzinfo=None)
+    return as_of
+
+
+def _evaluate(decision: MappingProxyType, now: datetime) -> Dict[str, Any]:
+    variant = decision['variants'][bisect_right(decision['breakpoints'], now)]
+    warnings_prefix = tuple(
+        template.format(label=label, days_until=(effective - now).days)
+        for effective, label, template in variant['countdowns']
+    )
+    return {
+        'allowed': variant['allowed'],
+        'status': variant['status'],
+        'requirements': list(variant['requirements']),
+        'warnings': list(warnings_prefix + variant['warnings']),
+        'info_notes': list(variant['info_notes']),
+        'processing_time': variant['processing_time'],
+        'reason': variant['reason'],
+        'effective_date': variant['effective_date'],
+        'origin_regulations': dict(variant['origin_regulations']),
+        'destination_regulations': dict(variant['destination_regulations'])
+    }
+
+
+def decide_route(origin: str, destination: str, material_type: str, now: Optional[AsOf] = None) -> Dict[str, Any]:
+    """
+    Route feasibility for a shipment, from the decision table.
+
+    Args:
+        origin: Origin country code (e.g., 'US', 'Canada')
+        destination: Destination country code
+        material_type: Type of material ('whole_batteries', 'black_mass', 'processed')
+        now: As-of date for date-dependent rules (datetime, date or ISO
+            string; defaults to now)
+
+    Returns:
+        check_route_feasibility result (a fresh dict the caller may modify)
+    """
+    decision = get_decision_table().lookup(origin, destination, material_type)
+    if not decision['breakpoints'] and now is None:
+        # No dated rule touches this route; skip reading the clock
+        return _evaluate(decision, datetime.min)
+    return _evaluate(decision, parse_as_of(now))
+
+
+def decide_route_dates(origin: str, destination: str, material_type: str, dates: Iterable[AsOf]) -> List[Dict[str, Any]]:
+    """
+    decide_route for many as-of dates (one table lookup for all of them).
+
+    Args:
+        origin: Origin country code
+        destination: Destination country code
+        material_type: Type of material
+        dates: As-of dates (datetime, date or ISO string)
+
+    Returns:
+        One check_route_feasibility result per date, each with its 'as_of'
+    """
+    decision = get_decision_table().lookup(origin, destination, material_type)
+    results = []
+    for as_of in dates:
+        now = parse_as_of(as_of)
+        result = _evaluate(decision, now)
+        result['as_of'] = now.date().isoformat()
+        results.append(result)
+    return results
+
+
+def route_timeline(origin: str, destination: str, material_type: str) -> List[Dict[str, Any]]:
+    """
+    Validity intervals of a route's feasibility.
+
+    Returns:
+        One entry per interval with 'from' and 'until' (ISO dates; None for
+        open ends), 'status', 'allowed' and 'requirements'
+    """
+    decision = get_decision_table().lookup(origin, destination, material_type)
+    bounds = [None] + [breakpoint.date().isoformat() for breakpoint in decision['breakpoints']] + [None]
+    return [
+        {
+            'from': bounds[i],
+            'until': bounds[i + 1],
+            'status': variant['status'],
+            'allowed': variant['allowed'],
+            'requirements': list(variant['requirements'])
+        }
+        for i, variant in enumerate(decision['variants'])
+    ]
+
+
+_matrix_cache: 'OrderedDict[Tuple[int, date], Dict[str, Any]]' = OrderedDict()
+_matrix_lock = threading.Lock()
+
+# Matrix cell for origin == destination (no border crossing to regulate)
+DOMESTIC_CELL = MappingProxyType({
+    'allowed': True,
+    'status': 'domestic',
+    'processing_time': None,
+    'reason': 'Domestic shipment; no cross-border movement rules apply',
+    'warnings': [],
+    'next_change': None
+})
+
+
+def _matrix_cell(decision: MappingProxyType, now: datetime) -> Dict[str, Any]:
+    index = bisect_right(decision['breakpoints'], now)
+    result = _evaluate(decision, now)
+    return {
+        'allowed': result['allowed'],
+        'status': result['status'],
+        'processing_time': result['processing_time'],
+        'reason': result['reason'],
+        'warnings': result['warnings'],
+        'next_change': decision['breakpoints'][index].date().isoformat() if index < len(decision['breakpoints']) else None
+    }
+
+
+def feasibility_matrix(as_of: Optional[AsOf] = None) -> Dict[str, Any]:
+    """
+    Feasibility of every origin x destination pair in COUNTRIES for every
+    material type, evaluated at the start of the as-of day.
+
+    Matrices are cached per (data version, as-of day), so repeated calls
+    cost a dict lookup until regulatory_db.json changes or the day rolls
+    over.
+
+    Args:
+        as_of: As-of date (datetime, date or ISO string; defaults to today)
+
+    Returns:
+        dict with 'data_version', 'as_of', 'countries', 'materials',
+        'matrix' (material -> origin -> destination -> cell with 'allowed',
+        'status', 'processing_time', 'reason', 'warnings' and 'next_change',
+        the next date a dated rule changes the cell; DOMESTIC_CELL on the
+        diagonal) and 'etag', a hash of the rest (treat as read-only; shared
+        between callers)
+    """
+    day = parse_as_of(as_of).date()
+    version = logistics_data.get_data_version()
+    key = (version, day)
+    with _matrix_lock:
+        cached = _matrix_cache.get(key)
+        if cached is not None:
+            _matrix_cache.move_to_end(key)
+            return cached
+
+    now = datetime(day.year, day.month, day.day)
+    table = get_decision_table()
+    countries = list(logistics_data.get_countries())
+    body = {
+        'data_version': version,
+        'as_of': day.isoformat(),
+        'countries': countries,
+        'materials': list(MATERIAL_TYPES),
+        'matrix': {
+            material_type: {
+                origin: {
+                    destination: (
+                        dict(DOMESTIC_CELL, warnings=[]) if origin == destination
+                        else _matrix_cell(table.lookup(origin, destination, material_type), now)
+                    )
+                    for destination in countries
+                }
+                for origin in countries
+            }
+            for material_type in MATERIAL_TYPES
+        }
+    }
+    body['etag'] = hashlib.sha256(json.dumps(body, sort_keys=True).encode()).hexdigest()[:32]
+    logger.info(f"Built feasibility matrix for {len(countries)} countries as of {day} (data version {version})")
+
+    with _matrix_lock:
+        _matrix_cache[key] = body
+        while len(_matrix_cache) > MATRIX_CACHE_SIZE:
+            _matrix_cache.popitem(last=False)
+    return body
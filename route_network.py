@@ -0,0 +1,389 @@
+"""
+Multimodal route network.
+Plants, ports and border crossings are nodes; truck, rail and ocean legs are
+edges. The graph is built once from data/route_network.json (and rebuilt when
+the file changes); each query prices the legs for the shipment weight with the
+same rate logic as single-mode estimates and searches for the cheapest
+(Dijkstra) and fastest (A*) feasible path. Regulatory blocks come from
+route_decisions.decide_route for the shipment's material and as-of date and
+are applied as filters on cross-border edges, checked both for the leg itself
+and for the shipment's origin country, so a blocked export cannot be routed
+around through a third country.
+"""
+
+import heapq
+import json
+import logging
+import math
+import os
+import threading
+from datetime import date
+from typing import Dict, List, Any, Optional, Tuple
+
+from freight_rates import get_rates
+from gazetteer import Gazetteer, haversine_miles
+from logistics_data import calculate_transport_cost, get_route_key
+from route_decisions import EU_MEMBER_STATES, decide_route
+
+logger = logging.getLogger(__name__)
+
+NETWORK_PATH = os.environ.get(
+    'ROUTE_NETWORK_PATH',
+    os.path.join(os.path.dirname(__file__), 'data', 'route_network.json')
+)
+
+NETWORK_MODES = ('truck', 'rail', 'ocean')
+
+# Ocean legs are priced per container by calculate_transport_cost for the leg's
+# rate lane, then scaled by transit time against the ocean 'typical_transit_days'
+# in the freight rate table; short feeder legs pay at least this share of the lane price
+MIN_OCEAN_LEG_FACTOR = 0.25
+
+def crosses_border(from_country: str, to_country: str) -> bool:
+    """Whether a leg is a transboundary movement (moves within the EU are not)."""
+    if from_country == to_country:
+        return False
+    return not (from_country in EU_MEMBER_STATES + ('EU',) and to_country in EU_MEMBER_STATES + ('EU',))
+
+
+def rail_leg_cost(weight_mt: float, distance_miles: float, is_hazmat: bool, lane: Optional[str] = None) -> Dict[str, Any]:
+    """Rail leg cost from the freight rate table (per metric ton-mile with a minimum charge)."""
+    rates = get_rates('rail', lane)
+    base_cost = max(weight_mt * distance_miles * rates['rate_per_mt_mile'], rates['minimum_charge']) * rates['cost_multiplier']
+    hazmat_surcharge = base_cost * (rates['hazmat_multiplier'] - 1) if is_hazmat else 0.0
+    total_cost = base_cost + hazmat_surcharge
+    return {
+        'cost': round(total_cost, 2),
+        'vehicle_type': rates['name'],
+        'num_vehicles': max(1, math.ceil(weight_mt * 1000 / rates['car_capacity_kg'])),
+        'base_cost': round(base_cost, 2),
+        'hazmat_surcharge': round(hazmat_surcharge, 2)
+    }
+
+
+def leg_cost(edge: Dict[str, Any], weight_mt: float, is_hazmat: bool) -> Dict[str, Any]:
+    """Price one network leg for a shipment (at the rates of the leg's country lane)."""
+    mode = edge['mode']
+    lane = edge.get('lane')
+    if mode == 'rail':
+        return rail_leg_cost(weight_mt, edge['distance_miles'], is_hazmat, lane)
+
+    if mode == 'ocean':
+        result = calculate_transport_cost('ocean', weight_mt, is_hazmat, lane=lane)
+        factor = max(edge['transit_days'] / get_rates('ocean')['typical_transit_days'], MIN_OCEAN_LEG_FACTOR)
+        return dict(result, cost=round(result['cost'] * factor, 2))
+
+    return calculate_transport_cost(mode, weight_mt, is_hazmat, edge['distance_miles'], lane=lane)
+
+
+class RouteNetwork:
+    """
+    Precomputed multimodal graph.
+
+    Adjacency lists, border flags and the A* speed bound are built once per
+    version of the network file; leg prices and regulatory filters depend on
+    the shipment and are applied per query.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or NETWORK_PATH
+        self._lock = threading.Lock()
+        self._mtime = None
+        self.nodes: Dict[str, Dict[str, Any]] = {}
+        self.edges: List[Dict[str, Any]] = []
+        self.adjacency: Dict[str, List[int]] = {}
+        self.max_days_speed = 1.0
+        self._load()
+
+    def _load(self):
+        with open(self.path, 'r') as f:
+            network = json.load(f)
+        self._mtime = os.path.getmtime(self.path)
+        nodes = network['nodes']
+
+        edges = []
+        gazetteer = None
+        for raw in network['edges']:
+            if raw['from'] not in nodes or raw['to'] not in nodes:
+                raise ValueError(f"Edge {raw['from']}->{raw['to']} references an unknown node")
+            if raw['mode'] not in NETWORK_MODES:
+                raise ValueError(f"Edge {raw['from']}->{raw['to']} has unsupported mode {raw['mode']}")
+            if raw.get('distance_miles') is None:
+                # Overland legs may omit the distance; the gazetteer estimates it
+                if raw['mode'] == 'ocean':
+                    raise ValueError(f"Ocean edge {raw['from']}->{raw['to']} needs distance_miles")
+                gazetteer = gazetteer or Gazetteer(network_path=self.path)
+                miles = gazetteer.road_miles(raw['from'], raw['to'])
+                if miles is None:
+                    raise ValueError(f"No road connects {raw['from']} and {raw['to']}")
+                raw = dict(raw, distance_miles=miles)
+            pairs = [(raw['from'], raw['to'])]
+            if raw.get('bidirectional', True):
+                pairs.append((raw['to'], raw['from']))
+            for a, b in pairs:
+                edge = dict(raw, **{'from': a, 'to': b})
+                edge['cross_border'] = crosses_border(nodes[a]['country'], nodes[b]['country'])
+                edge['lane'] = get_route_key(nodes[a]['country'], nodes[b]['country'])
+                edges.append(edge)
+
+        adjacency = {node_id: [] for node_id in nodes}
+        max_speed = 0.0
+        for i, edge in enumerate(edges):
+            adjacency[edge['from']].append(i)
+            a, b = nodes[edge['from']], nodes[edge['to']]
+            # Straight-line miles per transit day; the fastest edge bounds the A* heuristic
+            max_speed = max(max_speed, haversine_miles(a['lat'], a['lon'], b['lat'], b['lon']) / max(edge['transit_days'], 1e-9))
+
+        self.nodes, self.edges, self.adjacency = nodes, edges, adjacency
+        self.max_days_speed = max_speed or 1.0
+        logger.info(f"Loaded route network: {len(nodes)} nodes, {len(edges)} directed edges")
+
+    def _refresh_if_changed(self):
+        if os.path.exists(self.path) and os.path.getmtime(self.path) != self._mtime:
+            self._load()
+
+    # ------------------------------------------------------------------
+    # Search
+    # ------------------------------------------------------------------
+
+    def _days_heuristic(self, node_id: str, goal: str) -> float:
+        a, b = self.nodes[node_id], self.nodes[goal]
+        return haversine_miles(a['lat'], a['lon'], b['lat'], b['lon']) / self.max_days_speed
+
+    def _search(
+        self,
+        origin: str,
+        destination: str,
+        usable: List[bool],
+        prices: Dict[int, Dict[str, Any]],
+        objective: str
+    ) -> Optional[List[Tuple[int, float, float]]]:
+        """
+        Best path as [(edge index, transfer cost, transfer days)], or None.
+
+        Search states are (node, arriving mode) so transfer charges at ports
+        and crossings are counted only when the mode actually changes.
+        """
+        def step(node_id, arriving_mode, edge_index):
+            edge = self.edges[edge_index]
+            node = self.nodes[node_id]
+            cost, days = prices[edge_index]['cost'], edge['transit_days']
+            extra_cost = extra_days = 0.0
+            if arriving_mode is not None:
+                extra_cost += node.get('dwell_cost_usd', 0)
+                extra_days += node.get('dwell_days', 0)
+                if arriving_mode != edge['mode']:
+                    extra_cost += node.get('transfer_cost_usd', 0)
+                    extra_days += node.get('transfer_days', 0)
+            return cost + extra_cost, days + extra_days, extra_cost, extra_days
+
+        use_heuristic = objective == 'days'
+        start = (origin, None)
+        best = {start: (0.0, 0.0)}
+        parent = {}
+        counter = 0
+        heap = [(self._days_heuristic(origin, destination) if use_heuristic else 0.0, 0.0, counter, start)]
+        settled = set()
+
+        while heap:
+            _, _, _, state = heapq.heappop(heap)
+            if state in settled:
+                continue
+            settled.add(state)
+            node_id, arriving_mode = state
+            if node_id == destination:
+                path = []
+                while state in parent:
+                    state, edge_index, extra_cost, extra_days = parent[state]
+                    path.append((edge_index, extra_cost, extra_days))
+                return path[::-1]
+
+            cost, days = best[state]
+            for edge_index in self.adjacency[node_id]:
+                if not usable[edge_index]:
+                    continue
+                edge = self.edges[edge_index]
+                step_cost, step_days, extra_cost, extra_days = step(node_id, arriving_mode, edge_index)
+                nxt = (edge['to'], edge['mode'])
+                candidate = (cost + step_cost, days + step_days)
+                # Primary objective first, the other one breaks ties
+                key = candidate if objective == 'cost' else candidate[::-1]
+                current = best.get(nxt)
+                if current is not None and key >= (current if objective == 'cost' else current[::-1]):
+                    continue
+                best[nxt] = candidate
+                parent[nxt] = (state, edge_index, extra_cost, extra_days)
+                priority = key[0] + (self._days_heuristic(edge['to'], destination) if use_heuristic else 0.0)
+                counter += 1
+                heapq.heappush(heap, (priority, key[1], counter, nxt))
+
+        return None
+
+    def _border_checks(
+        self,
+        edge: Dict[str, Any],
+        origin_country: str,
+        material_type: str,
+        as_of: date
+    ) -> List[Tuple[str, Dict[str, Any]]]:
+        """
+        (label, decide_route result) for the leg's own border and, if
+        different, origin country -> leg destination.
+        """
+        from_country, to_country = self.nodes[edge['from']]['country'], self.nodes[edge['to']]['country']
+        pairs = [(from_country, to_country)]
+        if from_country != origin_country and crosses_border(origin_country, to_country):
+            pairs.append((origin_country, to_country))
+        return [(f"{a}->{b}", decide_route(a, b, material_type, as_of)) for a, b in pairs]
+
+    def _describe(
+        self,
+        path: List[Tuple[int, float, float]],
+        prices: Dict[int, Dict[str, Any]],
+        checks: Dict[int, List[Tuple[str, Dict[str, Any]]]]
+    ) -> Dict[str, Any]:
+        legs = []
+        warnings = []
+        total_cost = total_days = 0.0
+        for edge_index, extra_cost, extra_days in path:
+            edge = self.edges[edge_index]
+            price = prices[edge_index]
+            leg = {
+                'from': edge['from'],
+                'to': edge['to'],
+                'from_name': self.nodes[edge['from']]['name'],
+                'to_name': self.nodes[edge['to']]['name'],
+                'mode': edge['mode'],
+                'distance_miles': edge['distance_miles'],
+                'transit_days': edge['transit_days'],
+                'cost': price['cost'],
+                'vehicle_type': price.get('vehicle_type'),
+                'num_vehicles': price.get('num_vehicles'),
+                'handling_cost': round(extra_cost, 2),
+                'handling_days': extra_days
+            }
+            if edge['cross_border']:
+                leg['border'] = checks[edge_index][0][0]
+                leg['route_status'] = checks[edge_index][0][1]['status']
+                for label, decision in checks[edge_index]:
+                    if decision['status'] == 'restricted':
+                        warnings.append(f"{label} is restricted: {decision['processing_time'] or 'varies'} days processing")
+                    elif decision['status'] == 'unknown':
+                        warnings.append(f"{label} not in regulatory database. Consult regulatory authorities.")
+                    else:
+                        warnings.extend(decision['warnings'])
+            legs.append(leg)
+            total_cost += price['cost'] + extra_cost
+            total_days += edge['transit_days'] + extra_days
+
+        modes = [leg['mode'] for leg in legs]
+        return {
+            'legs': legs,
+            'total_cost': round(total_cost, 2),
+            'transit_days': round(total_days, 1),
+            'distance_miles': sum(leg['distance_miles'] for leg in legs),
+            'modes': list(dict.fromkeys(modes)),
+            'transfers': sum(1 for a, b in zip(modes, modes[1:]) if a != b),
+            'warnings': list(dict.fromkeys(warnings))
+        }
+
+    def find_routes(
+        self,
+        origin: str,
+        destination: str,
+        weight_kg: float,
+        material_type: str = 'black_mass',
+        modes: Optional[List[str]] = None,
+        allow_restricted: bool = True,
+        as_of: Optional[date] = None
+    ) -> Dict[str, Any]:
+        """
+        Cheapest and fastest feasible paths between two network nodes.
+
+        Args:
+            origin: Origin node id (e.g. 'plant_nevada')
+            destination: Destination node id
+            weight_kg: Shipment weight in kilograms
+            material_type: Type of material (hazmat pricing for whole_batteries/black_mass,
+                           and the regulatory rules that apply to it)
+            modes: Modes allowed on the path (default: all network modes)
+            allow_restricted: Use cross-border legs whose status is 'restricted'
+            as_of: Date for time-dependent regulatory blocks (default: today)
+
+        Returns:
+            dict with 'cheapest' and 'fastest' paths (None when no feasible path
+            exists) and the cross-border legs removed by regulatory filters
+        """
+        modes = list(modes or NETWORK_MODES)
+        invalid = [m for m in modes if m not in NETWORK_MODES]
+        if invalid:
+            raise ValueError(f"Unsupported network modes: {', '.join(invalid)} (expected {', '.join(NETWORK_MODES)})")
+        if weight_kg <= 0:
+            raise ValueError("weight_kg must be greater than 0")
+        as_of = as_of or date.today()
+        is_hazmat = material_type in ['whole_batteries', 'black_mass']
+
+        with self._lock:
+            self._refresh_if_changed()
+            for node_id in (origin, destination):
+                if node_id not in self.nodes:
+                    raise ValueError(f"Unknown network node: {node_id}")
+
+            origin_country = self.nodes[origin]['country']
+            usable = []
+            checks = {}
+            blocked = {}
+            for i, edge in enumerate(self.edges):
+                ok = edge['mode'] in modes
+                if ok and edge['cross_border']:
+                    checks[i] = self._border_checks(edge, origin_country, material_type, as_of)
+                    for label, decision in checks[i]:
+                        if decision['status'] == 'blocked' or (decision['status'] == 'restricted' and not allow_restricted):
+                            ok = False
+                            blocked[label] = decision['reason'] or f"Route is {decision['status']}"
+                usable.append(ok)
+
+            weight_mt = weight_kg / 1000.0
+            prices = {i: leg_cost(edge, weight_mt, is_hazmat) for i, edge in enumerate(self.edges) if usable[i]}
+
+            cheapest = self._search(origin, destination, usable, prices, 'cost')
+            fastest = self._search(origin, destination, usable, prices, 'days')
+
+            return {
+                'origin': origin,
+                'destination': destination,
+                'weight_kg': weight_kg,
+                'material_type': material_type,
+                'is_hazmat': is_hazmat,
+                'as_of': as_of.isoformat(),
+                'cheapest': self._describe(cheapest, prices, checks) if cheapest is not None else None,
+                'fastest': self._describe(fastest, prices, checks) if fastest is not None else None,
+                'blocked_borders': [{'border': k, 'reason': v} for k, v in sorted(blocked.items())],
+                'currency': 'USD'
+            }
+
+    def describe_network(self) -> Dict[str, Any]:
+        """Nodes and edges of the network, for pickers in the frontend."""
+        with self._lock:
+            self._refresh_if_changed()
+            return {
+                'nodes': [dict(node, id=node_id) for node_id, node in self.nodes.items()],
+                'edges': [
+                    {k: edge[k] for k in ('from', 'to', 'mode', 'distance_miles', 'transit_days', 'cross_border')}
+                    for edge in self.edges
+                ],
+                'modes': list(NETWORK_MODES)
+            }
+
+
+_network = None
+_network_lock = threading.Lock()
+
+
+def get_network() -> RouteNetwork:
+    """Process-wide route network (loaded on first use)."""
+    global _network
+    with _network_lock:
+        if _network is None:
+            _network = RouteNetwork()
+        return _network
@@ -0,0 +1,64 @@
+"""
+COA ingestion of tables larger than one chunk.
+Run from the repository root: python -m pytest tests
+"""
+
+import io
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import coa_ingest
+import coa_parser
+
+
+def _csv_table(num_rows: int) -> bytes:
+    lines = ["Sample,Ni (%),Co (%),Li (%)"]
+    lines += [f"S-{i:05d},{10 + i % 7},{5 + i % 3},2.5" for i in range(num_rows)]
+    return ('\n'.join(lines) + '\n').encode()
+
+
+def test_csv_table_spanning_chunks_keeps_every_row():
+    num_rows = coa_ingest.ROWS_PER_CHUNK * 2 + 123
+    result = coa_ingest.ingest_coa_file(io.BytesIO(_csv_table(num_rows)), 'assays.csv')
+
+    assert result['chunks'] == 3
+    assert [s['sample'] for s in result['samples']] == [f"S-{i:05d}" for i in range(num_rows)]
+    last = result['samples'][-1]
+    assert last['assays']['Nickel'] == (10 + (num_rows - 1) % 7) / 100
+    assert last['assays']['Cobalt'] == (5 + (num_rows - 1) % 3) / 100
+    assert last['chunk'] == f"rows {coa_ingest.ROWS_PER_CHUNK * 2 + 1}-{num_rows + 1}"
+
+
+def test_text_table_spanning_chunks_keeps_every_row():
+    num_rows = coa_ingest.ROWS_PER_CHUNK + 50
+    text = "Sample  Ni (%)  Co (%)\n" + ''.join(f"L-{i}  {20 + i % 4}  6\n" for i in range(num_rows))
+    result = coa_ingest.ingest_coa_file(io.BytesIO(text.encode()), 'report.txt')
+
+    assert result['chunks'] == 2
+    assert len(result['samples']) == num_rows
+    assert result['samples'][-1]['sample'] == f"L-{num_rows - 1}"
+
+
+def test_table_continues_after_page_furniture():
+    first = coa_parser.extract_coa_table("Page 1\nSample  Ni (%)  Co (%)\nA  10  5\nB  11  6\n")
+    assert first['continues']
+
+    second = coa_parser.extract_coa_table("Page 2 of 2\nC  12  7\nD  13  8\n\nEnd of report", first['header'])
+    assert second['continued']
+    assert not second['continues']
+    assert second['samples'] == ['C', 'D']
+
+
+def test_untabulated_text_assays_match_single_pass_parse():
+    lines = [f"Nickel (Ni): {20 + i % 2}.5 %" if i % 3 else "Cobalt 6200 ppm" for i in range(1200)]
+    text = '\n'.join(lines)
+    result = coa_ingest.ingest_coa_file(io.BytesIO(text.encode()), 'notes.txt')
+
+    tokens = coa_parser.tokenize_coa(text)
+    assays = coa_parser.assays_from_tokens(tokens)
+    assert result['samples'] == []
+    assert result['tokens'] == len(tokens)
+    assert result['assays'] == assays
+    assert result['confidence'] == coa_parser.parse_confidence(tokens, assays)
@@ -0,0 +1,107 @@
+"""
+Price and quote-margin alert crossing logic.
+Run from the repository root: python -m pytest tests
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import price_alerts
+
+
+def _engine(tmp_path):
+    dispatcher = price_alerts.QueueDispatcher()
+    engine = price_alerts.AlertEngine(path=str(tmp_path / 'alerts.json'), dispatchers=[dispatcher])
+    return engine, dispatcher
+
+
+def _triggered(events):
+    return sorted(e['alert_id'] for e in events)
+
+
+def test_first_observation_triggers_conditions_that_already_hold(tmp_path):
+    engine, _ = _engine(tmp_path)
+    low = engine.add_alert('price', 'LCE', 'below', 14.0)
+    high = engine.add_alert('price', 'LCE', 'above', 12.0)
+    engine.add_alert('price', 'LCE', 'above', 13.0)
+
+    events = engine.evaluate({'LCE': 12.5})
+
+    assert _triggered(events) == sorted([low['id'], high['id']])
+
+
+def test_only_thresholds_crossed_between_observations_trigger(tmp_path):
+    engine, dispatcher = _engine(tmp_path)
+    engine.evaluate({'Ni': 16.0})
+    falls_through = engine.add_alert('price', 'Ni', 'below', 15.5)
+    still_above = engine.add_alert('price', 'Ni', 'below', 14.0)
+    rises_to = engine.add_alert('price', 'Ni', 'above', 17.0)
+
+    assert _triggered(engine.evaluate({'Ni': 15.0})) == [falls_through['id']]
+    assert dispatcher.queue.get_nowait()['alert_id'] == falls_through['id']
+    assert dispatcher.queue.empty()
+
+    # 'above' triggers on reaching the threshold exactly
+    events = engine.evaluate({'Ni': 17.0})
+    assert _triggered(events) == [rises_to['id']]
+    assert events[0]['previous_value'] == 15.0
+    assert engine.alerts[still_above['id']]['active']
+
+
+def test_one_shot_alerts_deactivate_and_repeating_alerts_rearm(tmp_path):
+    engine, _ = _engine(tmp_path)
+    engine.evaluate({'Co': 30.0})
+    once = engine.add_alert('price', 'Co', 'below', 29.0)
+    repeat = engine.add_alert('price', 'Co', 'below', 29.0, repeat=True)
+
+    assert _triggered(engine.evaluate({'Co': 28.0})) == sorted([once['id'], repeat['id']])
+    engine.evaluate({'Co': 30.0})
+    assert _triggered(engine.evaluate({'Co': 28.5})) == [repeat['id']]
+    assert not engine.alerts[once['id']]['active']
+    assert engine.alerts[repeat['id']]['trigger_count'] == 2
+
+
+def test_snapshot_prices_are_converted_to_usd(tmp_path):
+    engine, _ = _engine(tmp_path)
+    alert = engine.add_alert('price', 'LCE', 'above', 14.0)
+
+    # 19.6 CAD per kg at 1.40 CAD per USD is 14.0 USD
+    events = engine.evaluate_snapshot({'LCE': 19.6, 'FX': 1.4, 'timestamp': '2026-01-05 09:00:00', 'fx_fallback_used': False})
+
+    assert _triggered(events) == [alert['id']]
+    assert events[0]['value'] == pytest.approx(14.0)
+    assert set(engine.last_values) == {'LCE'}
+
+
+def test_quote_margin_alerts_follow_marked_positions(tmp_path):
+    engine, _ = _engine(tmp_path)
+    alert = engine.add_alert('quote_margin', 'Q-1', 'below', 10.0)
+
+    assert engine.evaluate_quote_margins({'changes': [{'quote_id': 'Q-1', 'margin_pct': 12.5}]}) == []
+    events = engine.evaluate_quote_margins({'changes': [{'quote_id': 'Q-1', 'margin_pct': 9.0}]})
+    assert _triggered(events) == [alert['id']]
+    assert events[0]['source'] == 'quote_mark_to_market'
+
+
+def test_index_and_last_values_survive_a_reload(tmp_path):
+    engine, _ = _engine(tmp_path)
+    engine.evaluate({'LCE': 13.0})
+    alert = engine.add_alert('price', 'LCE', 'above', 13.5)
+
+    reloaded, _ = _engine(tmp_path)
+    assert reloaded.evaluate({'LCE': 13.2}) == []
+    assert _triggered(reloaded.evaluate({'LCE': 13.6})) == [alert['id']]
+
+
+def test_invalid_alerts_are_rejected(tmp_path):
+    engine, _ = _engine(tmp_path)
+    with pytest.raises(ValueError):
+        engine.add_alert('price', 'Gold', 'below', 1.0)
+    with pytest.raises(ValueError):
+        engine.add_alert('price', 'LCE', 'sideways', 1.0)
+    with pytest.raises(ValueError):
+        engine.add_alert('price', 'LCE', 'below', 1.0, webhook_url='http://attacker.invalid/hook')
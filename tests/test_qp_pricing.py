@@ -0,0 +1,100 @@
+"""
+QP settlement finality over exchange holidays.
+Run from the repository root: python -m pytest tests
+"""
+
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import qp_pricing
+from price_history import PriceHistory
+from valuation_engine import PRICE_INDEX, PRICE_KEYS
+
+# LME is closed on Christmas Day and Boxing Day
+LME_HOLIDAYS = ['2025-12-25', '2025-12-26']
+
+
+def _history(start: str, end: str, skip=()) -> PriceHistory:
+    """Ni and Co observed on every weekday in [start, end] except the skipped dates."""
+    days = np.arange(np.datetime64(start), np.datetime64(end) + 1)
+    days = days[np.is_busday(days) & ~np.isin(days, np.array(skip, dtype='datetime64[D]'))]
+    prices = np.full((len(days), len(PRICE_KEYS)), np.nan)
+    prices[:, PRICE_INDEX['Ni']] = 16.0 + np.arange(len(days)) * 0.01
+    prices[:, PRICE_INDEX['Co']] = 30.0
+    return PriceHistory(days, prices)
+
+
+def _contract(contract_id: str = 'C-1', delivery_date: str = '2025-11-14') -> dict:
+    # December QP (M+1 on a November delivery)
+    return {
+        'id': contract_id,
+        'delivery_date': delivery_date,
+        'qp': {'type': 'month', 'offset_months': 1},
+        'gross_weight': 1000,
+        'feed_type': 'Black Mass (Processed)',
+        'assays': {'Nickel': 0.2, 'Cobalt': 0.05, 'Lithium': 0.03},
+        'metal_prices': {'Ni': 16.5, 'Co': 33.0, 'Li': 13.5},
+        'payables': {'Ni': 0.8, 'Co': 0.7, 'Li': 0.5}
+    }
+
+
+def test_holidays_are_gaps_without_a_calendar():
+    history = _history('2025-11-03', '2026-01-09', skip=LME_HOLIDAYS)
+    settlement = qp_pricing.settle_contracts([_contract()], history)['settlements'][0]
+
+    assert settlement['status'] == 'provisional'
+    assert settlement['missing_days'] == 2
+
+
+def test_qp_spanning_christmas_is_final_with_exchange_holidays():
+    history = _history('2025-11-03', '2026-01-09', skip=LME_HOLIDAYS)
+    result = qp_pricing.settle_contracts([_contract()], history, holidays=LME_HOLIDAYS)
+    settlement = result['settlements'][0]
+
+    assert settlement['status'] == 'final'
+    assert settlement['missing_days'] == 0
+    assert settlement['qp_start'] == '2025-12-01'
+    assert settlement['qp_end'] == '2025-12-31'
+    # 23 weekdays in December 2025, less the two holidays
+    assert settlement['observed_days'] == 21
+
+    december = (history.dates >= np.datetime64('2025-12-01')) & (history.dates <= np.datetime64('2025-12-31'))
+    expected = history.prices[december, PRICE_INDEX['Ni']].mean()
+    assert settlement['qp_prices']['Ni'] == round(float(expected), 4)
+
+
+def test_busdaycalendar_is_accepted_as_is():
+    history = _history('2025-11-03', '2026-01-09', skip=LME_HOLIDAYS)
+    calendar = np.busdaycalendar(holidays=LME_HOLIDAYS)
+    result = qp_pricing.settle_contracts([_contract()], history, holidays=calendar)
+
+    assert result['num_final'] == 1
+
+
+def test_real_gap_keeps_settlement_provisional_despite_holidays():
+    history = _history('2025-11-03', '2026-01-09', skip=LME_HOLIDAYS + ['2025-12-10'])
+    settlement = qp_pricing.settle_contracts([_contract()], history, holidays=LME_HOLIDAYS)['settlements'][0]
+
+    assert settlement['status'] == 'provisional'
+    assert settlement['missing_days'] == 1
+
+
+def test_qp_not_yet_ended_is_provisional():
+    history = _history('2025-11-03', '2025-12-19')
+    result = qp_pricing.settle_contracts([_contract()], history, holidays=LME_HOLIDAYS)
+
+    assert result['as_of'] == '2025-12-19'
+    assert result['settlements'][0]['status'] == 'provisional'
+    assert result['settlements'][0]['missing_days'] == 0
+
+
+def test_holidays_must_be_iso_date_strings():
+    with pytest.raises(ValueError):
+        qp_pricing.trading_calendar([20251225])
+    with pytest.raises(ValueError):
+        qp_pricing.trading_calendar('2025-12-25')
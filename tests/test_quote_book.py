@@ -0,0 +1,110 @@
+"""
+Quote book incremental mark-to-market.
+Run from the repository root: python -m pytest tests
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from quote_book import BOOK_CURRENCY, QuoteBook
+from valuation_engine import build_exposures, valuation_prices, value_exposures
+
+MARKET = {'NiSO4': 3.8, 'CoSO4': 6.5, 'LCE': 14.0, 'LiOH': 15.5}
+
+
+def _lot(ni_price: float = 16.5, **overrides) -> dict:
+    lot = {
+        'gross_weight': 1000,
+        'feed_type': 'Black Mass (Processed)',
+        'assays': {'Nickel': 0.2, 'Cobalt': 0.05, 'Lithium': 0.03},
+        'metal_prices': {'Ni': ni_price, 'Co': 33.0, 'Li': 13.5},
+        'payables': {'Ni': 0.8, 'Co': 0.7, 'Li': 0.5}
+    }
+    lot.update(overrides)
+    return lot
+
+
+def _full_profit(lot: dict, prices: dict) -> float:
+    """Net profit of one lot repriced from scratch; metal prices in `prices` override the lot's."""
+    repriced = dict(lot, metal_prices={k: prices.get(k, v) for k, v in lot['metal_prices'].items()})
+    values = value_exposures(build_exposures([repriced]), valuation_prices(repriced, prices)[None, :], paired=True)
+    return round(float(values['net_profit'][0]), 2)
+
+
+def test_incremental_marks_match_full_repricing(tmp_path):
+    book = QuoteBook(str(tmp_path / 'book.json'))
+    lots = [_lot(16.5), _lot(17.0, gross_weight=2500)]
+    book.add_quotes([{'input_params': lot, 'quote_id': f"Q-{i}"} for i, lot in enumerate(lots)], MARKET)
+
+    snapshots = [
+        dict(MARKET, Ni=16.0, Co=31.0, Li=13.0, LCE=13.2),
+        {'LCE': 12.1},                      # partial: other keys keep their last mark
+        dict(MARKET, Ni=15.2, NiSO4=3.5)
+    ]
+    current = {}
+    for snapshot in snapshots:
+        current.update(snapshot)
+        result = book.mark_to_market(snapshot)
+        for lot, change in zip(lots, result['changes']):
+            assert change['net_profit'] == pytest.approx(_full_profit(lot, current), abs=0.01)
+
+
+def test_keys_never_marked_fall_back_to_each_quotes_issue_price(tmp_path):
+    book = QuoteBook(str(tmp_path / 'book.json'))
+    cheap = book.add_quote(_lot(15.0), MARKET, 'Q-cheap')
+    dear = book.add_quote(_lot(18.0), MARKET, 'Q-dear')
+
+    # Only LCE moves; Ni stays at each quote's own issue price
+    result = book.mark_to_market({'LCE': 15.0})
+    changes = {c['quote_id']: c for c in result['changes']}
+
+    assert changes['Q-cheap']['net_profit'] == pytest.approx(_full_profit(_lot(15.0), dict(MARKET, LCE=15.0)), abs=0.01)
+    assert changes['Q-dear']['net_profit'] == pytest.approx(_full_profit(_lot(18.0), dict(MARKET, LCE=15.0)), abs=0.01)
+    assert changes['Q-cheap']['change'] == changes['Q-dear']['change']
+    assert cheap['issue_profit'] != dear['issue_profit']
+
+
+def test_new_quotes_are_priced_in_full_on_their_first_mark(tmp_path):
+    book = QuoteBook(str(tmp_path / 'book.json'))
+    book.add_quote(_lot(), MARKET, 'Q-1')
+    book.mark_to_market(dict(MARKET, Ni=16.0))
+
+    late = _lot(16.5, gross_weight=4000)
+    book.add_quote(late, MARKET, 'Q-2')
+    result = book.mark_to_market({'LCE': 13.0})
+    change = next(c for c in result['changes'] if c['quote_id'] == 'Q-2')
+
+    assert change['net_profit'] == pytest.approx(_full_profit(late, dict(MARKET, Ni=16.0, LCE=13.0)), abs=0.01)
+
+
+def test_closed_quotes_are_not_marked_and_the_book_persists(tmp_path):
+    path = str(tmp_path / 'book.json')
+    book = QuoteBook(path)
+    book.add_quote(_lot(), MARKET, 'Q-1')
+    book.add_quote(_lot(), MARKET, 'Q-2')
+    book.close_quote('Q-1')
+
+    result = book.mark_to_market(dict(MARKET, LCE=12.0))
+    assert [c['quote_id'] for c in result['changes']] == ['Q-2']
+
+    reloaded = QuoteBook(path)
+    positions = {p['quote_id']: p for p in reloaded.positions(None)}
+    assert positions['Q-1']['status'] == 'closed'
+    assert positions['Q-2']['net_profit'] == result['changes'][0]['net_profit']
+    assert positions['Q-2']['currency'] == BOOK_CURRENCY
+
+
+def test_quotes_must_be_priced_in_the_book_currency(tmp_path):
+    book = QuoteBook(str(tmp_path / 'book.json'))
+    with pytest.raises(ValueError):
+        book.add_quote(_lot(currency='CAD'), MARKET)
+    quote = book.add_quote(_lot(currency='USD'), MARKET, 'Q-1')
+    with pytest.raises(ValueError):
+        book.add_quote(_lot(), MARKET, 'Q-1')
+
+    assert quote['currency'] == BOOK_CURRENCY
+    assert [q['id'] for q in book.quotes] == ['Q-1']
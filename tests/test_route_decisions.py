@@ -0,0 +1,97 @@
+"""
+Dated route rules, as-of date parsing and the feasibility matrix.
+Run from the repository root: python -m pytest tests
+"""
+
+import os
+import sys
+from datetime import date, datetime, timedelta, timezone
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import route_decisions
+
+# EU Commission Decision 2025/934 applies to whole batteries from this date
+BAN_DATE = datetime(2026, 11, 9)
+
+
+def test_dated_rule_switches_status_at_its_effective_date():
+    before, on, after = route_decisions.decide_route_dates(
+        'Germany', 'China', 'whole_batteries',
+        ['2026-11-08', '2026-11-09', date(2027, 1, 15)]
+    )
+
+    assert (before['status'], before['allowed']) == ('allowed_until_nov_2026', True)
+    assert (on['status'], on['allowed']) == ('blocked', False)
+    assert after['status'] == 'blocked'
+    assert [r['as_of'] for r in (before, on, after)] == ['2026-11-08', '2026-11-09', '2027-01-15']
+
+
+def test_countdown_warning_counts_days_from_the_as_of_date():
+    warnings = route_decisions.decide_route('Germany', 'China', 'whole_batteries', '2026-10-30')['warnings']
+    assert warnings[0] == 'EU export restriction to non-OECD takes effect Nov 9, 2026 (in 10 days)'
+
+    after = route_decisions.decide_route('Germany', 'China', 'whole_batteries', '2026-11-10')
+    assert not any('takes effect' in w for w in after['warnings'])
+
+
+def test_rules_only_apply_to_their_materials():
+    assert route_decisions.decide_route('Germany', 'China', 'processed', BAN_DATE)['allowed']
+
+
+def test_timeline_intervals_match_point_decisions():
+    timeline = route_decisions.route_timeline('Germany', 'China', 'whole_batteries')
+
+    assert [(t['from'], t['until'], t['status']) for t in timeline] == [
+        (None, '2026-11-09', 'allowed_until_nov_2026'),
+        ('2026-11-09', None, 'blocked')
+    ]
+    for interval in timeline:
+        probe = interval['from'] or '2026-01-01'
+        assert route_decisions.decide_route('Germany', 'China', 'whole_batteries', probe)['status'] == interval['status']
+
+
+def test_member_states_without_their_own_route_fall_back_to_eu_rules():
+    assert route_decisions.route_entry('Germany', 'China')[0] == 'Germany->China'
+    assert route_decisions.route_entry('Italy', 'China')[0] == 'EU->China'
+    assert route_decisions.route_timeline('Italy', 'China', 'whole_batteries')[-1]['status'] == 'blocked'
+
+
+def test_parse_as_of_accepts_dates_datetimes_and_iso_strings():
+    assert route_decisions.parse_as_of(date(2026, 11, 9)) == BAN_DATE
+    assert route_decisions.parse_as_of('2026-11-09') == BAN_DATE
+    assert route_decisions.parse_as_of('2026-11-09T13:45:00') == datetime(2026, 11, 9, 13, 45)
+    assert abs(route_decisions.parse_as_of(None) - datetime.now()) < timedelta(seconds=5)
+
+
+def test_parse_as_of_converts_aware_values_to_naive_utc():
+    aware = datetime(2026, 11, 9, 1, 0, tzinfo=timezone(timedelta(hours=2)))
+
+    assert route_decisions.parse_as_of(aware) == datetime(2026, 11, 8, 23, 0)
+    assert route_decisions.parse_as_of('2026-11-09T01:00:00+02:00') == datetime(2026, 11, 8, 23, 0)
+    # 01:00 in UTC+2 is still the day before the ban in UTC
+    assert route_decisions.decide_route('Germany', 'China', 'whole_batteries', aware)['allowed']
+
+
+@pytest.mark.parametrize('value', [20261109, 2026.11, ['2026-11-09'], 'next tuesday', '09/11/2026'])
+def test_parse_as_of_rejects_values_that_are_not_dates(value):
+    with pytest.raises(ValueError):
+        route_decisions.parse_as_of(value)
+
+
+def test_matrix_diagonal_is_domestic_and_etag_tracks_the_as_of_day():
+    before = route_decisions.feasibility_matrix('2026-11-08')
+    same_day = route_decisions.feasibility_matrix(datetime(2026, 11, 8, 18, 30))
+    after = route_decisions.feasibility_matrix('2026-11-09')
+
+    assert same_day['etag'] == before['etag']
+    assert after['etag'] != before['etag']
+
+    country = before['countries'][0]
+    for material_type in before['materials']:
+        assert before['matrix'][material_type][country][country]['status'] == 'domestic'
+    assert before['matrix']['whole_batteries']['EU']['China']['allowed']
+    assert before['matrix']['whole_batteries']['EU']['China']['next_change'] == '2026-11-09'
+    assert not after['matrix']['whole_batteries']['EU']['China']['allowed']
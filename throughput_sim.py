@@ -0,0 +1,517 @@
+"""
+Discrete-event simulation of annual logistics throughput.
+Lots arrive at each contracted lane, wait for the lane's export/import permit
+(lead times and dated route blocks from route_decisions), fill containers or
+trucks sized by calculate_transport_cost, and depart (ocean loads on the next
+weekly sailing) to be delivered after the lane's transit time. Events are
+kept in a heap, so a simulated year of tens of thousands of lots runs in a
+fraction of a second and many seeds can be compared for capacity planning.
+"""
+
+import heapq
+import logging
+import math
+import time
+from datetime import date, timedelta
+from typing import Dict, List, Any, Optional, Tuple
+
+import numpy as np
+
+from freight_rates import get_rates
+from logistics_data import calculate_transport_cost, get_route_key
+from route_decisions import decide_route, route_timeline
+from route_network import crosses_border
+
+logger = logging.getLogger(__name__)
+
+HAZMAT_MATERIALS = ('whole_batteries', 'black_mass')
+
+DEFAULT_DAYS = 365
+DEFAULT_LOT_KG = 1000
+# Lot weights are drawn uniformly within this share either side of the mean
+LOT_KG_SPREAD = 0.5
+# A partly filled container or truck departs after waiting this long
+DEFAULT_MAX_HOLD_DAYS = 14
+DEFAULT_SAILING_INTERVAL_DAYS = 7
+# Upper bound on expected lot arrivals per run, over all lanes (every lot is
+# an event held in memory; raise lot_kg for very large tonnages)
+MAX_EXPECTED_LOTS = 200000
+# Weight used to read the per-vehicle capacity of a mode's multi-vehicle tier
+_FULL_LOAD_PROBE_MT = 1000.0
+
+# Event kinds; lower values run first when events share a time
+ARRIVAL, PERMIT, HOLD, SAILING, BLOCK, DELIVERY = range(6)
+
+
+def parse_lead_time(value: Any) -> Tuple[float, float]:
+    """
+    Permit lead time range in days from a ROUTE_FEASIBILITY string.
+
+    '60-90' gives (60, 90), '30' gives (30, 30); missing or unparseable
+    values mean no permit wait.
+    """
+    if value is None:
+        return (0.0, 0.0)
+    parts = str(value).replace(' ', '').split('-')
+    try:
+        low, high = float(parts[0]), float(parts[-1])
+    except ValueError:
+        return (0.0, 0.0)
+    return (min(low, high), max(low, high))
+
+
+def _day_of(start_date: date, iso_date: str) -> float:
+    return float((date.fromisoformat(iso_date) - start_date).days)
+
+
+def blocked_day(origin: str, destination: str, material_type: str, start_date: date) -> Optional[float]:
+    """
+    First day (from start_date) a route is blocked for a material under its
+    dated rules: 0 if it is blocked already, None if it never is.
+    """
+    for interval in route_timeline(origin, destination, material_type):
+        if interval['status'] != 'blocked':
+            continue
+        if interval['until'] is not None and date.fromisoformat(interval['until']) <= start_date:
+            continue
+        if interval['from'] is None:
+            return 0.0
+        return max(0.0, _day_of(start_date, interval['from']))
+    return None
+
+
+def normalize_lanes(lanes: List[Dict[str, Any]], start_date: date) -> List[Dict[str, Any]]:
+    """
+    Validate contracted lanes and resolve their rates, permits and capacities.
+
+    Args:
+        lanes: dicts with 'origin', 'destination', 'mode', 'annual_t' (planned
+               tonnes per year) and optional 'material_type', 'is_ddr',
+               'distance_miles' (truck), 'lot_kg' (mean lot weight),
+               'fill_kg' (load that dispatches a vehicle) and
+               'permit_filed_days_ago'
+        start_date: First simulated day (for time-dependent route blocks)
+
+    Returns:
+        Lane dicts with 'permit_days' (low, high), 'blocked_day',
+        'fill_kg', 'transit_days' and 'capacity_kg'
+    """
+    normalized = []
+    for i, lane in enumerate(lanes):
+        name = lane.get('name') or f"{lane.get('origin')}->{lane.get('destination')} {lane.get('mode', 'ocean')}"
+        mode = lane.get('mode', 'ocean')
+        material_type = lane.get('material_type', 'black_mass')
+        is_ddr = bool(lane.get('is_ddr', False))
+        annual_t = float(lane.get('annual_t', 0))
+        lot_kg = float(lane.get('lot_kg') or DEFAULT_LOT_KG)
+        distance_miles = lane.get('distance_miles')
+
+        if not lane.get('origin') or not lane.get('destination'):
+            raise ValueError(f"Lane {i + 1}: origin and destination are required")
+        if mode not in ('ocean', 'truck', 'air'):
+            raise ValueError(f"Lane {name}: invalid transport mode {mode}")
+        if is_ddr and mode == 'air':
+            raise ValueError(f"Lane {name}: DDR (Damaged/Defective/Recalled) batteries prohibited from air transport")
+        if mode == 'truck' and distance_miles is None:
+            raise ValueError(f"Lane {name}: distance_miles is required for truck transport")
+        if not (math.isfinite(annual_t) and math.isfinite(lot_kg)) or annual_t <= 0 or lot_kg <= 0:
+            raise ValueError(f"Lane {name}: annual_t and lot_kg must be finite and greater than 0")
+
+        origin, destination = lane['origin'], lane['destination']
+        is_hazmat = material_type in HAZMAT_MATERIALS
+        rate_lane = get_route_key(origin, destination)
+
+        if crosses_border(origin, destination):
+            decision = decide_route(origin, destination, material_type, start_date)
+            route_status, processing_time = decision['status'], decision['processing_time']
+            lane_blocked_day = blocked_day(origin, destination, material_type, start_date)
+        else:
+            route_status, processing_time, lane_blocked_day = 'allowed', None, None
+        permit_days = parse_lead_time(processing_time)
+        filed = float(lane.get('permit_filed_days_ago') or 0)
+        permit_days = (max(0.0, permit_days[0] - filed), max(0.0, permit_days[1] - filed))
+
+        capacity_kg = None
+        if mode != 'air':
+            full = calculate_transport_cost(mode, _FULL_LOAD_PROBE_MT, is_hazmat, distance_miles, lane=rate_lane)
+            capacity_kg = float(full['capacity_per_vehicle_kg'])
+        fill_kg = float(lane['fill_kg']) if lane.get('fill_kg') else capacity_kg
+        if fill_kg is not None and capacity_kg is not None and fill_kg > capacity_kg:
+            raise ValueError(f"Lane {name}: fill_kg exceeds the {capacity_kg:,.0f} kg vehicle capacity")
+
+        rates = get_rates(mode, rate_lane)
+        if mode == 'truck':
+            transit_days = max(1.0, math.ceil(float(distance_miles) / rates['typical_miles_per_day']))
+        else:
+            transit_days = float(rates.get('transit_days', rates['typical_transit_days']))
+
+        normalized.append({
+            'name': name,
+            'origin': origin,
+            'destination': destination,
+            'mode': mode,
+            'rate_lane': rate_lane,
+            'material_type': material_type,
+            'is_hazmat': is_hazmat,
+            'annual_t': annual_t,
+            'lot_kg': lot_kg,
+            'distance_miles': float(distance_miles) if distance_miles is not None else None,
+            'route_status': route_status,
+            'permit_days': permit_days,
+            'blocked_day': lane_blocked_day,
+            'capacity_kg': capacity_kg,
+            'fill_kg': fill_kg,
+            'transit_days': transit_days
+        })
+    return normalized
+
+
+class _LaneState:
+    """Mutable per-lane counters for one simulation run."""
+
+    __slots__ = (
+        'config', 'permit_day', 'permitted', 'blocked', 'pending_kg', 'yard_kg', 'ready', 'hold_token',
+        'sailing_at', 'queue_kg', 'queue_area', 'queue_max', 'last_t', 'arrived_kg', 'shipped_kg',
+        'delivered_kg', 'in_transit_kg', 'stranded_kg', 'departures', 'full_departures', 'load_kg_total',
+        'cost', 'lots'
+    )
+
+    def __init__(self, config: Dict[str, Any], permit_day: float):
+        self.config = config
+        self.permit_day = permit_day
+        self.permitted = permit_day <= 0
+        self.blocked = config['blocked_day'] == 0.0
+        self.pending_kg = 0.0       # arrived, permit not yet approved
+        self.yard_kg = 0.0          # permitted, filling the next vehicle
+        self.ready: List[float] = []  # loaded vehicles waiting for a sailing
+        self.hold_token = 0
+        self.sailing_at = None
+        self.queue_kg = 0.0
+        self.queue_area = 0.0
+        self.queue_max = 0.0
+        self.last_t = 0.0
+        self.arrived_kg = 0.0
+        self.shipped_kg = 0.0
+        self.delivered_kg = 0.0
+        self.in_transit_kg = 0.0
+        self.stranded_kg = 0.0
+        self.departures = 0
+        self.full_departures = 0
+        self.load_kg_total = 0.0
+        self.cost = 0.0
+        self.lots = 0
+
+    def advance(self, t: float):
+        """Accumulate the time-weighted queue up to t."""
+        self.queue_area += self.queue_kg * (t - self.last_t)
+        self.last_t = t
+
+
+class ThroughputSimulation:
+    """
+    One simulated horizon over a set of lanes.
+
+    Each lane files its permit at time 0 (less any days already elapsed),
+    holds arriving lots until approval, then fills vehicles to 'fill_kg'.
+    Full vehicles dispatch at once (trucks, air) or on the next sailing
+    (ocean); a partial load dispatches after max_hold_days. From a lane's
+    block date (e.g. the EU->China ban) nothing more departs and waiting
+    material is counted as stranded. Permits are assumed to stay valid for
+    the rest of the horizon once approved.
+    """
+
+    def __init__(
+        self,
+        lanes: List[Dict[str, Any]],
+        days: int = DEFAULT_DAYS,
+        start_date: Optional[date] = None,
+        seed: Optional[int] = None,
+        max_hold_days: float = DEFAULT_MAX_HOLD_DAYS,
+        sailing_interval_days: float = DEFAULT_SAILING_INTERVAL_DAYS
+    ):
+        if days <= 0:
+            raise ValueError("days must be greater than 0")
+        if max_hold_days <= 0 or sailing_interval_days <= 0:
+            raise ValueError("max_hold_days and sailing_interval_days must be greater than 0")
+        self.start_date = start_date or date.today()
+        self.lanes = normalize_lanes(lanes, self.start_date)
+        self.days = float(days)
+        expected_lots = sum(lane['annual_t'] * 1000.0 / lane['lot_kg'] for lane in self.lanes) * self.days / 365.0
+        if expected_lots > MAX_EXPECTED_LOTS:
+            raise ValueError(
+                f"Expected {expected_lots:,.0f} lot arrivals exceeds the limit of {MAX_EXPECTED_LOTS:,}; "
+                f"increase lot_kg or shorten the horizon"
+            )
+        self.seed = seed
+        self.max_hold_days = float(max_hold_days)
+        self.sailing_interval_days = float(sailing_interval_days)
+
+    def _push(self, t: float, kind: int, lane: int, payload: Any = None):
+        self._seq += 1
+        heapq.heappush(self._events, (t, kind, self._seq, lane, payload))
+
+    def _initial_events(self, rng: np.random.Generator) -> List[Tuple]:
+        """Lot arrivals (Poisson per lane), permit approvals and route blocks."""
+        events = []
+        for i, config in enumerate(self.lanes):
+            state = self._states[i]
+            # Poisson arrivals at the lane's planned tonnage
+            mean_gap = 365.0 * config['lot_kg'] / (config['annual_t'] * 1000.0)
+            expected = int(self.days / mean_gap)
+            gaps = rng.exponential(mean_gap, size=expected + 4 * int(math.sqrt(expected)) + 10)
+            times = np.cumsum(gaps)
+            while times[-1] < self.days:
+                times = np.concatenate([times, times[-1] + np.cumsum(rng.exponential(mean_gap, size=expected + 10))])
+            times = times[times < self.days]
+            spread = config['lot_kg'] * LOT_KG_SPREAD
+            weights = rng.uniform(config['lot_kg'] - spread, config['lot_kg'] + spread, size=len(times))
+            events.extend((float(t), ARRIVAL, self._seq + k, i, float(w)) for k, (t, w) in enumerate(zip(times, weights)))
+            self._seq += len(times)
+
+            if not state.permitted:
+                self._seq += 1
+                events.append((state.permit_day, PERMIT, self._seq, i, None))
+            if config['blocked_day'] is not None and 0 < config['blocked_day'] < self.days:
+                self._seq += 1
+                events.append((config['blocked_day'], BLOCK, self._seq, i, None))
+        return events
+
+    def _dispatch(self, i: int, state: _LaneState, kg: float, t: float):
+        """Send one loaded vehicle: now, or on the next sailing for ocean."""
+        if state.config['mode'] == 'ocean':
+            state.ready.append(kg)
+            if state.sailing_at is None:
+                interval = self.sailing_interval_days
+                state.sailing_at = math.floor(t / interval) * interval + interval
+                self._push(state.sailing_at, SAILING, i)
+        else:
+            self._depart(i, state, kg, t)
+
+    def _depart(self, i: int, state: _LaneState, kg: float, t: float):
+        config = state.config
+        cost = calculate_transport_cost(
+            config['mode'], kg / 1000.0, config['is_hazmat'], config['distance_miles'], lane=config['rate_lane']
+        )['cost']
+        state.cost += cost
+        state.departures += 1
+        if config['fill_kg'] is not None and kg >= config['fill_kg'] - 1e-9:
+            state.full_departures += 1
+        state.load_kg_total += kg
+        state.shipped_kg += kg
+        state.in_transit_kg += kg
+        state.queue_kg -= kg
+        self._push(t + config['transit_days'], DELIVERY, i, kg)
+
+    def _load(self, i: int, state: _LaneState, kg: float, t: float):
+        """Add permitted material to the yard and dispatch every full vehicle."""
+        fill_kg = state.config['fill_kg']
+        if fill_kg is None:
+            # Air: each lot flies on its own
+            self._depart(i, state, kg, t)
+            return
+        was_empty = state.yard_kg <= 1e-9
+        state.yard_kg += kg
+        dispatched = False
+        while state.yard_kg >= fill_kg - 1e-9:
+            state.yard_kg -= fill_kg
+            self._dispatch(i, state, fill_kg, t)
+            dispatched = True
+        if state.yard_kg <= 1e-9:
+            state.yard_kg = 0.0
+            state.hold_token += 1
+        elif was_empty or dispatched:
+            # Full loads take the oldest material first, so what is left
+            # arrived at t and its hold timer starts now
+            state.hold_token += 1
+            self._push(t + self.max_hold_days, HOLD, i, state.hold_token)
+
+    def run(self) -> Dict[str, Any]:
+        """
+        Simulate the horizon once.
+
+        Returns:
+            dict with per-lane 'lanes' results (tonnes arrived, shipped,
+            delivered, backlog and stranded; average/max queue; departures
+            and average fill; cost), overall totals and run statistics
+        """
+        start = time.perf_counter()
+        rng = np.random.default_rng(self.seed)
+        self._seq = 0
+        self._states = []
+        for config in self.lanes:
+            low, high = config['permit_days']
+            self._states.append(_LaneState(config, float(rng.uniform(low, high)) if high > 0 else 0.0))
+        self._events = self._initial_events(rng)
+        heapq.heapify(self._events)
+
+        events = self._events
+        states = self._states
+        horizon = self.days
+        processed = 0
+        while events and events[0][0] <= horizon:
+            t, kind, _, i, payload = heapq.heappop(events)
+            state = states[i]
+            processed += 1
+            state.advance(t)
+
+            if kind == ARRIVAL:
+                state.lots += 1
+                state.arrived_kg += payload
+                if state.blocked:
+                    state.stranded_kg += payload
+                    continue
+                state.queue_kg += payload
+                if state.permitted:
+                    self._load(i, state, payload, t)
+                else:
+                    state.pending_kg += payload
+            elif kind == PERMIT:
+                state.permitted = True
+                if state.pending_kg and not state.blocked:
+                    pending, state.pending_kg = state.pending_kg, 0.0
+                    self._load(i, state, pending, t)
+            elif kind == HOLD:
+                if payload == state.hold_token and state.yard_kg > 0 and not state.blocked:
+                    kg, state.yard_kg = state.yard_kg, 0.0
+                    state.hold_token += 1
+                    self._dispatch(i, state, kg, t)
+            elif kind == SAILING:
+                state.sailing_at = None
+                if not state.blocked:
+                    loads, state.ready = state.ready, []
+                    for kg in loads:
+                        self._depart(i, state, kg, t)
+            elif kind == BLOCK:
+                state.blocked = True
+                state.stranded_kg += state.queue_kg
+                state.queue_kg = 0.0
+                state.pending_kg, state.yard_kg, state.ready = 0.0, 0.0, []
+                state.hold_token += 1
+            elif kind == DELIVERY:
+                state.in_transit_kg -= payload
+                state.delivered_kg += payload
+
+            if state.queue_kg > state.queue_max:
+                state.queue_max = state.queue_kg
+
+        elapsed = time.perf_counter() - start
+        return self._report(processed, elapsed)
+
+    def _report(self, processed: int, elapsed: float) -> Dict[str, Any]:
+        lanes = []
+        for state in self._states:
+            state.advance(self.days)
+            config = state.config
+            queue_kg = state.pending_kg + state.yard_kg + sum(state.ready)
+            avg_queue_kg = state.queue_area / self.days
+            arrival_rate_kg = state.arrived_kg / self.days
+            lanes.append({
+                'name': config['name'],
+                'origin': config['origin'],
+                'destination': config['destination'],
+                'mode': config['mode'],
+                'route_status': config['route_status'],
+                'planned_t': round(config['annual_t'] * self.days / 365.0, 1),
+                'lots': state.lots,
+                'arrived_t': round(state.arrived_kg / 1000, 1),
+                'shipped_t': round(state.shipped_kg / 1000, 1),
+                'delivered_t': round(state.delivered_kg / 1000, 1),
+                'in_transit_t': round(state.in_transit_kg / 1000, 1),
+                'backlog_t': round(queue_kg / 1000, 1),
+                'stranded_t': round(state.stranded_kg / 1000, 1),
+                'permit_approved_day': round(state.permit_day, 1) if state.permit_day < self.days else None,
+                'blocked_from_day': config['blocked_day'],
+                'avg_queue_t': round(avg_queue_kg / 1000, 1),
+                'max_queue_t': round(state.queue_max / 1000, 1),
+                # Little's law: average time material waits before departure
+                'avg_wait_days': round(avg_queue_kg / arrival_rate_kg, 1) if arrival_rate_kg else None,
+                'departures': state.departures,
+                'full_departures': state.full_departures,
+                'avg_fill_pct': round(state.load_kg_total / state.departures / config['capacity_kg'] * 100, 1)
+                if state.departures and config['capacity_kg'] else None,
+                'cost': round(state.cost, 2),
+                'cost_per_t': round(state.cost / (state.shipped_kg / 1000), 2) if state.shipped_kg else None
+            })
+
+        shipped_t = sum(lane['shipped_t'] for lane in lanes)
+        total_cost = sum(lane['cost'] for lane in lanes)
+        return {
+            'start_date': self.start_date.isoformat(),
+            'end_date': (self.start_date + timedelta(days=self.days)).isoformat(),
+            'days': self.days,
+            'seed': self.seed,
+            'lanes': lanes,
+            'planned_t': round(sum(lane['planned_t'] for lane in lanes), 1),
+            'arrived_t': round(sum(lane['arrived_t'] for lane in lanes), 1),
+            'shipped_t': round(shipped_t, 1),
+            'delivered_t': round(sum(lane['delivered_t'] for lane in lanes), 1),
+            'backlog_t': round(sum(lane['backlog_t'] for lane in lanes), 1),
+            'stranded_t': round(sum(lane['stranded_t'] for lane in lanes), 1),
+            'departures': sum(lane['departures'] for lane in lanes),
+            'total_cost': round(total_cost, 2),
+            'cost_per_t': round(total_cost / shipped_t, 2) if shipped_t else None,
+            'currency': 'USD',
+            'events': processed,
+            'elapsed_ms': round(elapsed * 1000, 3),
+            'simulated_days_per_second': round(self.days / elapsed) if elapsed else None
+        }
+
+
+def simulate_throughput(
+    lanes: List[Dict[str, Any]],
+    target_t: Optional[float] = None,
+    days: int = DEFAULT_DAYS,
+    start_date: Optional[date] = None,
+    seed: Optional[int] = None,
+    runs: int = 1,
+    max_hold_days: float = DEFAULT_MAX_HOLD_DAYS,
+    sailing_interval_days: float = DEFAULT_SAILING_INTERVAL_DAYS
+) -> Dict[str, Any]:
+    """
+    Simulate contracted lanes and check them against an annual target.
+
+    Args:
+        lanes: Contracted lanes (see normalize_lanes)
+        target_t: Tonnes that must be delivered over the horizon (defaults to
+                  the lanes' planned tonnage for the horizon)
+        days: Simulated days
+        start_date: First simulated day (defaults to today)
+        seed: Random seed for the first run; run k uses seed + k
+        runs: Independent runs (permit lead times and arrivals vary)
+        max_hold_days: Longest a partial load waits before departing
+        sailing_interval_days: Days between ocean sailings
+
+    Returns:
+        First run's detailed result plus 'target_t', 'meets_target' and, for
+        several runs, 'replications' (delivered tonnes and cost percentiles
+        and the share of runs meeting the target)
+    """
+    if runs < 1:
+        raise ValueError("runs must be at least 1")
+    simulation = ThroughputSimulation(lanes, days, start_date, seed, max_hold_days, sailing_interval_days)
+    start = time.perf_counter()
+    results = []
+    for k in range(runs):
+        simulation.seed = None if seed is None else seed + k
+        results.append(simulation.run())
+    elapsed = time.perf_counter() - start
+
+    result = results[0]
+    target = float(target_t) if target_t is not None else result['planned_t']
+    result['target_t'] = round(target, 1)
+    result['meets_target'] = result['delivered_t'] >= target
+
+    if runs > 1:
+        delivered = np.array([r['delivered_t'] for r in results])
+        cost_per_t = np.array([r['cost_per_t'] if r['cost_per_t'] is not None else np.nan for r in results])
+        result['replications'] = {
+            'runs': runs,
+            'delivered_t': {p: round(float(np.percentile(delivered, q)), 1) for p, q in (('p10', 10), ('p50', 50), ('p90', 90))},
+            'cost_per_t': {p: round(float(np.nanpercentile(cost_per_t, q)), 2) for p, q in (('p10', 10), ('p50', 50), ('p90', 90))}
+            if not np.all(np.isnan(cost_per_t)) else None,
+            'meets_target_pct': round(float(np.mean(delivered >= target)) * 100, 1),
+            'elapsed_ms': round(elapsed * 1000, 3),
+            'simulated_days_per_second': round(runs * simulation.days / elapsed) if elapsed else None
+        }
+    logger.info(f"Simulated {len(simulation.lanes)} lanes x {runs} runs over {days} days in {round(elapsed * 1000, 1)} ms")
+    return result
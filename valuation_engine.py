@@ -0,0 +1,202 @@
+"""
+Vectorized valuation kernel.
+Mirrors backend.calculate_valuation as linear price exposures so that many
+lots, destinations or price scenarios can be valued in one numpy pass.
+"""
+
+from typing import Dict, List, Any, Optional
+
+import numpy as np
+
+from backend import FACTORS
+
+# Metals in assay order (matches backend.calculate_valuation)
+METALS = ('Nickel', 'Cobalt', 'Lithium', 'Copper', 'Aluminum', 'Manganese')
+
+# Price vector layout: payable metal prices followed by product (salt) prices
+METAL_PRICE_KEYS = ('Ni', 'Co', 'Li', 'Cu', 'Al', 'Mn')
+PRICE_KEYS = METAL_PRICE_KEYS + ('NiSO4', 'CoSO4', 'LCE', 'LiOH')
+PRICE_INDEX = {key: i for i, key in enumerate(PRICE_KEYS)}
+
+# MHP payables and lithium recovery haircut used by calculate_valuation
+MHP_PAY_NI = 0.85
+MHP_PAY_CO = 0.80
+LI_RECOVERY_FACTOR = 0.90
+
+DEFAULT_NI_PRODUCT = 'Sulphates (Battery Salt)'
+DEFAULT_LI_PRODUCT = 'Carbonate (LCE)'
+
+
+def prices_vector(prices: Dict[str, float], base: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Convert a price dict (e.g. get_market_data output) into a price vector.
+
+    Args:
+        prices: Prices per kg keyed by PRICE_KEYS (extra keys are ignored)
+        base: Optional vector supplying prices missing from the dict
+
+    Returns:
+        np.ndarray of shape (len(PRICE_KEYS),)
+    """
+    vec = np.zeros(len(PRICE_KEYS)) if base is None else np.array(base, dtype=float)
+    for key, i in PRICE_INDEX.items():
+        if key in prices and prices[key] is not None:
+            vec[i] = float(prices[key])
+    return vec
+
+
+def valuation_prices(input_params: Dict[str, Any], market_data: Dict[str, float]) -> np.ndarray:
+    """
+    Build the price vector calculate_valuation would use for a lot.
+
+    Metal prices come from the lot's own metal_prices, product prices from market data.
+    """
+    vec = prices_vector(market_data)
+    metal_prices = input_params.get('metal_prices', {})
+    for key in METAL_PRICE_KEYS:
+        vec[PRICE_INDEX[key]] = float(metal_prices.get(key, 0.0))
+    return vec
+
+
+def revenue_coefficients(
+    hydromet_recovery: float = 0.95,
+    ni_product: str = DEFAULT_NI_PRODUCT,
+    li_product: str = DEFAULT_LI_PRODUCT
+) -> np.ndarray:
+    """
+    Map contained Ni/Co/Li mass (kg) to revenue exposure per price key.
+
+    Returns:
+        np.ndarray of shape (3, len(PRICE_KEYS)); row order Ni, Co, Li
+    """
+    coef = np.zeros((3, len(PRICE_KEYS)))
+    rec_li = hydromet_recovery * LI_RECOVERY_FACTOR
+
+    if ni_product == DEFAULT_NI_PRODUCT:
+        coef[0, PRICE_INDEX['NiSO4']] = hydromet_recovery * FACTORS["Ni_to_Sulphate"]
+        coef[1, PRICE_INDEX['CoSO4']] = hydromet_recovery * FACTORS["Co_to_Sulphate"]
+    else:
+        coef[0, PRICE_INDEX['Ni']] = hydromet_recovery * MHP_PAY_NI
+        coef[1, PRICE_INDEX['Co']] = hydromet_recovery * MHP_PAY_CO
+
+    if li_product == DEFAULT_LI_PRODUCT:
+        coef[2, PRICE_INDEX['LCE']] = rec_li * FACTORS["Li_to_Carbonate"]
+    else:
+        coef[2, PRICE_INDEX['LiOH']] = rec_li * FACTORS["Li_to_Hydroxide"]
+
+    return coef
+
+
+def metal_masses(input_params: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Contained metal masses for a lot, following calculate_valuation's mass balance.
+
+    Returns:
+        dict with 'masses' (np.ndarray, METALS order) and 'net_bm_weight'
+    """
+    gross_weight = float(input_params['gross_weight'])
+    net_bm_weight = gross_weight * float(input_params.get('yield_pct', 1.0))
+    assays = np.array([float(input_params['assays'].get(m, 0.0)) for m in METALS])
+
+    if input_params.get('assay_basis', 'Final Powder') == "Whole Battery":
+        masses = gross_weight * assays * float(input_params.get('mech_recovery', 1.0))
+    else:
+        masses = net_bm_weight * assays
+
+    return {'masses': masses, 'net_bm_weight': net_bm_weight}
+
+
+def fixed_opex(input_params: Dict[str, Any], net_bm_weight: float) -> float:
+    """Price-independent OPEX (pre-treatment + refining) for a lot."""
+    gross_t = float(input_params['gross_weight']) / 1000.0
+    cost_shred = gross_t * float(input_params.get('shredding_cost_per_ton', 0.0))
+    cost_electrolyte = gross_t * float(input_params.get('elec_surcharge', 0.0)) if input_params.get('has_electrolyte', False) else 0.0
+    cost_refining = (net_bm_weight / 1000.0) * float(input_params.get('refining_opex_base', 1500.0))
+    return cost_shred + cost_electrolyte + cost_refining
+
+
+def build_exposures(lots: List[Dict[str, Any]]) -> Dict[str, np.ndarray]:
+    """
+    Decompose calculate_valuation inputs into linear price exposures.
+
+    For every lot: revenue = revenue_exposure · prices,
+    material_cost = cost_exposure · prices, net_profit = revenue - material_cost - opex.
+
+    Args:
+        lots: List of calculate_valuation input_params dicts
+
+    Returns:
+        dict of arrays: 'revenue' (N, K), 'cost' (N, K), 'opex' (N,),
+        'masses' (N, 6), 'net_bm_weight' (N,)
+    """
+    n = len(lots)
+    k = len(PRICE_KEYS)
+    revenue = np.zeros((n, k))
+    cost = np.zeros((n, k))
+    opex = np.zeros(n)
+    masses = np.zeros((n, len(METALS)))
+    net_bm = np.zeros(n)
+
+    for i, params in enumerate(lots):
+        mb = metal_masses(params)
+        masses[i] = mb['masses']
+        net_bm[i] = mb['net_bm_weight']
+
+        payables = params.get('payables', {})
+        for j, key in enumerate(METAL_PRICE_KEYS):
+            cost[i, PRICE_INDEX[key]] = masses[i, j] * float(payables.get(key, 0.0))
+
+        coef = revenue_coefficients(
+            float(params.get('hydromet_recovery', 0.95)),
+            params.get('ni_product', DEFAULT_NI_PRODUCT),
+            params.get('li_product', DEFAULT_LI_PRODUCT)
+        )
+        revenue[i] = masses[i, :3] @ coef
+        opex[i] = fixed_opex(params, net_bm[i])
+
+    return {
+        'revenue': revenue,
+        'cost': cost,
+        'opex': opex,
+        'masses': masses,
+        'net_bm_weight': net_bm
+    }
+
+
+def value_exposures(
+    exposures: Dict[str, np.ndarray],
+    prices: np.ndarray,
+    paired: bool = False
+) -> Dict[str, np.ndarray]:
+    """
+    Value exposures against one or many price vectors.
+
+    Args:
+        exposures: Output of build_exposures
+        prices: (K,) vector, or (T, K) matrix of price scenarios
+        paired: If True, prices is (N, K) and row i prices lot i
+
+    Returns:
+        dict of arrays 'total_revenue', 'material_cost', 'total_opex',
+        'net_profit', 'margin_pct' with shape (N,) or (T, N)
+    """
+    prices = np.asarray(prices, dtype=float)
+    if paired:
+        revenue = np.einsum('nk,nk->n', exposures['revenue'], prices)
+        material_cost = np.einsum('nk,nk->n', exposures['cost'], prices)
+    else:
+        revenue = prices @ exposures['revenue'].T
+        material_cost = prices @ exposures['cost'].T
+
+    opex = np.broadcast_to(exposures['opex'], revenue.shape)
+    net_profit = revenue - material_cost - opex
+    with np.errstate(divide='ignore', invalid='ignore'):
+        margin_pct = np.where(revenue > 0, net_profit / revenue * 100, 0.0)
+
+    return {
+        'total_revenue': revenue,
+        'material_cost': material_cost,
+        'total_opex': opex,
+        'net_profit': net_profit,
+        'margin_pct': margin_pct
+    }